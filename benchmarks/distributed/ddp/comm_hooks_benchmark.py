@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+# Measure the effect of DDP communication hooks on CPU training with Gloo.
+#
+# This spawns the given number of processes on the local machine, trains a
+# multi-layer perceptron with DistributedDataParallel without a hook and with
+# each of the built-in hooks, and reports the step time and the number of
+# bytes each process hands to collectives per step.
+#
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.distributed.algorithms import ddp_comm_hooks
+
+
+def create_hooks(process_group):
+    # (name, state, hook); no hook means the default reducer
+    return [
+        ("no hook", None, None),
+        ("allreduce", process_group, ddp_comm_hooks.allreduce_hook),
+        ("fp16", process_group, ddp_comm_hooks.fp16_compress_hook),
+        ("powerSGD r=1", ddp_comm_hooks.PowerSGDState(process_group, matrix_approximation_rank=1),
+         ddp_comm_hooks.powerSGD_hook),
+        ("powerSGD r=4", ddp_comm_hooks.PowerSGDState(process_group, matrix_approximation_rank=4),
+         ddp_comm_hooks.powerSGD_hook),
+        ("top-k 1%", ddp_comm_hooks.TopKState(process_group, compress_ratio=0.01),
+         ddp_comm_hooks.topk_hook),
+    ]
+
+
+class CollectiveBytesCounter(object):
+    """Counts the bytes passed to all_reduce and all_gather by the hooks."""
+
+    def __init__(self):
+        self.num_bytes = 0
+        self.all_reduce = dist.all_reduce
+        self.all_gather = dist.all_gather
+
+    def __enter__(self):
+        def all_reduce(tensor, *args, **kwargs):
+            self.num_bytes += tensor.numel() * tensor.element_size()
+            return self.all_reduce(tensor, *args, **kwargs)
+
+        def all_gather(tensor_list, tensor, *args, **kwargs):
+            self.num_bytes += tensor.numel() * tensor.element_size()
+            return self.all_gather(tensor_list, tensor, *args, **kwargs)
+
+        dist.all_reduce = all_reduce
+        dist.all_gather = all_gather
+        return self
+
+    def __exit__(self, *args):
+        dist.all_reduce = self.all_reduce
+        dist.all_gather = self.all_gather
+
+
+def create_model(args):
+    layers = []
+    for _ in range(args.num_layers):
+        layers += [nn.Linear(args.hidden_size, args.hidden_size), nn.ReLU()]
+    return nn.Sequential(*layers)
+
+
+def benchmark_hook(args, process_group, state, hook):
+    torch.manual_seed(0)
+    model = nn.parallel.DistributedDataParallel(
+        create_model(args),
+        process_group=process_group,
+        bucket_cap_mb=args.bucket_cap_mb)
+    if hook is not None:
+        model.register_comm_hook(state, hook)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    inputs = torch.randn(args.batch_size, args.hidden_size)
+    target = torch.randn(args.batch_size, args.hidden_size)
+
+    measurements = []
+    with CollectiveBytesCounter() as counter:
+        for i in range(args.warmup_iterations + args.iterations):
+            if i == args.warmup_iterations:
+                counter.num_bytes = 0
+            start = time.time()
+            optimizer.zero_grad()
+            loss = nn.functional.mse_loss(model(inputs), target)
+            loss.backward()
+            optimizer.step()
+            measurements.append(time.time() - start)
+
+    if hook is None:
+        # The default reducer all-reduces every gradient once
+        num_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    else:
+        num_bytes = counter.num_bytes / args.iterations
+    return measurements[args.warmup_iterations:], num_bytes
+
+
+def run(rank, args, file_name):
+    store = dist.FileStore(file_name, args.world_size)
+    dist.init_process_group("gloo", store=store, rank=rank, world_size=args.world_size)
+    torch.set_num_threads(args.num_threads)
+    process_group = dist.distributed_c10d._get_default_group()
+
+    results = []
+    if rank == 0:
+        print("%-14s  %10s  %10s  %14s  %8s" % ("hook", "p50 step", "p90 step", "bytes/step", "ratio"))
+    baseline_bytes = None
+    for name, state, hook in create_hooks(process_group):
+        measurements, num_bytes = benchmark_hook(args, process_group, state, hook)
+        if baseline_bytes is None:
+            baseline_bytes = num_bytes
+        p50, p90 = np.percentile(measurements, [50, 90])
+        results.append({
+            "hook": name,
+            "measurements": measurements,
+            "bytes_per_step": num_bytes,
+        })
+        if rank == 0:
+            print("%-14s  %9.2fms  %9.2fms  %14d  %7.1fx" % (
+                name, p50 * 1000, p90 * 1000, num_bytes, baseline_bytes / num_bytes))
+
+    if rank == 0 and args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "pytorch_version": torch.__version__,
+                "world_size": args.world_size,
+                "model": {"hidden_size": args.hidden_size, "num_layers": args.num_layers},
+                "batch_size": args.batch_size,
+                "bucket_cap_mb": args.bucket_cap_mb,
+                "results": results,
+            }, f, indent=2)
+    dist.destroy_process_group()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDP communication hook benchmark (CPU, Gloo)")
+    parser.add_argument("--world-size", type=int, default=4)
+    parser.add_argument("--num-threads", type=int, default=1,
+                        help="intra-op threads per process")
+    parser.add_argument("--hidden-size", type=int, default=1024)
+    parser.add_argument("--num-layers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--bucket-cap-mb", type=float, default=25)
+    parser.add_argument("--warmup-iterations", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--json", type=str, metavar="PATH", help="Write file with benchmark results")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        file_name = f.name
+    try:
+        mp.spawn(run, args=(args, file_name), nprocs=args.world_size)
+    finally:
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
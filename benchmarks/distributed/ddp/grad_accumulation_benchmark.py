@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Measure the cost of buffer synchronization in DDP when accumulating
+# gradients over several micro-batches per optimizer step.
+#
+# This spawns the given number of CPU processes using Gloo, trains a
+# multi-layer perceptron with BatchNorm layers, and compares the default
+# buffer broadcast at the beginning of forward passes with
+# `defer_buffer_sync=True`, which broadcasts once per optimizer step.
+#
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+
+
+def create_model(args):
+    layers = []
+    for _ in range(args.num_layers):
+        layers += [nn.Linear(args.hidden_size, args.hidden_size), nn.BatchNorm1d(args.hidden_size), nn.ReLU()]
+    return nn.Sequential(*layers)
+
+
+def benchmark_mode(args, process_group, defer_buffer_sync):
+    torch.manual_seed(0)
+    model = nn.parallel.DistributedDataParallel(
+        create_model(args),
+        process_group=process_group,
+        defer_buffer_sync=defer_buffer_sync)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    inputs = torch.randn(args.micro_batch_size, args.hidden_size)
+
+    num_broadcasts = [0]
+    broadcast_coalesced = model._distributed_broadcast_coalesced
+
+    def count_broadcasts(*args):
+        num_broadcasts[0] += 1
+        return broadcast_coalesced(*args)
+
+    model._distributed_broadcast_coalesced = count_broadcasts
+
+    def micro_batch(measurements):
+        start = time.time()
+        model(inputs).sum().backward()
+        measurements.append(time.time() - start)
+
+    measurements = []
+    for i in range(args.warmup_steps + args.steps):
+        if i == args.warmup_steps:
+            measurements = []
+            num_broadcasts[0] = 0
+        if args.no_sync:
+            with model.no_sync():
+                for _ in range(args.micro_batches - 1):
+                    micro_batch(measurements)
+            micro_batch(measurements)
+        else:
+            for _ in range(args.micro_batches):
+                micro_batch(measurements)
+        optimizer.step()
+        optimizer.zero_grad()
+        if defer_buffer_sync:
+            start = time.time()
+            model.sync_module_states()
+            # Attribute the once-per-step broadcast to the micro-batches
+            measurements[-1] += time.time() - start
+    return measurements, num_broadcasts[0] / args.steps
+
+
+def run(rank, args, file_name):
+    store = dist.FileStore(file_name, args.world_size)
+    dist.init_process_group("gloo", store=store, rank=rank, world_size=args.world_size)
+    torch.set_num_threads(args.num_threads)
+    process_group = dist.distributed_c10d._get_default_group()
+
+    results = []
+    if rank == 0:
+        print("%-10s  %14s  %14s  %16s" % ("mode", "p50 micro-batch", "p90 micro-batch", "broadcasts/step"))
+    for name, defer_buffer_sync in [("default", False), ("deferred", True)]:
+        measurements, broadcasts_per_step = benchmark_mode(args, process_group, defer_buffer_sync)
+        p50, p90 = np.percentile(measurements, [50, 90])
+        results.append({
+            "mode": name,
+            "measurements": measurements,
+            "broadcasts_per_step": broadcasts_per_step,
+        })
+        if rank == 0:
+            print("%-10s  %13.2fms  %13.2fms  %16.1f" % (name, p50 * 1000, p90 * 1000, broadcasts_per_step))
+
+    if rank == 0 and args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "pytorch_version": torch.__version__,
+                "world_size": args.world_size,
+                "model": {"hidden_size": args.hidden_size, "num_layers": args.num_layers},
+                "micro_batch_size": args.micro_batch_size,
+                "micro_batches": args.micro_batches,
+                "no_sync": args.no_sync,
+                "results": results,
+            }, f, indent=2)
+    dist.destroy_process_group()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDP gradient accumulation benchmark (CPU, Gloo)")
+    parser.add_argument("--world-size", type=int, default=4)
+    parser.add_argument("--num-threads", type=int, default=1,
+                        help="intra-op threads per process")
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--num-layers", type=int, default=16)
+    parser.add_argument("--micro-batch-size", type=int, default=8)
+    parser.add_argument("--micro-batches", type=int, default=8,
+                        help="micro-batches per optimizer step")
+    parser.add_argument("--no-sync", action="store_true",
+                        help="accumulate gradients within DistributedDataParallel.no_sync")
+    parser.add_argument("--warmup-steps", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--json", type=str, metavar="PATH", help="Write file with benchmark results")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        file_name = f.name
+    try:
+        mp.spawn(run, args=(args, file_name), nprocs=args.world_size)
+    finally:
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
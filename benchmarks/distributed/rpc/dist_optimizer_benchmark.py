@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#
+# Measure the throughput of DistributedOptimizer steps on a parameter server
+# updated by several trainers.
+#
+# This spawns one parameter server and the given number of trainers on the
+# local machine. Each trainer looks up an embedding table on the parameter
+# server, and updates it with a DistributedOptimizer. By default, every trainer
+# has its own table, so their optimizer steps on the parameter server can run
+# concurrently. With --shared, all trainers update the same table, so their
+# steps are serialized, as they were for all tables before optimizer steps
+# were locked per parameter.
+#
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+import torch.distributed.autograd as dist_autograd
+import torch.distributed.rpc as rpc
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch import optim
+from torch.distributed.optim import DistributedOptimizer
+
+
+PS_NAME = "ps"
+
+_tables = {}
+_tables_lock = threading.Lock()
+_results = {}
+
+
+def _get_table(name, num_embeddings, embedding_dim, sparse):
+    with _tables_lock:
+        if name not in _tables:
+            _tables[name] = nn.EmbeddingBag(num_embeddings, embedding_dim, mode="sum", sparse=sparse)
+        return _tables[name]
+
+
+def _get_weight(table_rref):
+    return table_rref.local_value().weight
+
+
+def _lookup(table_rref, indices, offsets):
+    return table_rref.local_value()(indices, offsets)
+
+
+def _report(trainer, measurements):
+    _results[trainer] = measurements
+
+
+def train(trainer, args):
+    name = "table" if args.shared else "table%d" % trainer
+    table_rref = rpc.remote(
+        PS_NAME, _get_table, args=(name, args.num_embeddings, args.embedding_dim, args.sparse))
+    weight_rref = rpc.remote(PS_NAME, _get_weight, args=(table_rref,))
+    dist_optim = DistributedOptimizer(optim.SGD, [weight_rref], lr=0.01)
+
+    measurements = []
+    for i in range(args.warmup_iterations + args.iterations):
+        indices = torch.randint(args.num_embeddings, (args.batch_size * args.bag_size,))
+        offsets = torch.arange(0, indices.numel(), args.bag_size)
+        start = time.time()
+        with dist_autograd.context() as context_id:
+            output = rpc.rpc_sync(PS_NAME, _lookup, args=(table_rref, indices, offsets))
+            dist_autograd.backward(context_id, [output.sum()])
+            dist_optim.step(context_id)
+        if i >= args.warmup_iterations:
+            measurements.append(time.time() - start)
+    rpc.rpc_sync(PS_NAME, _report, args=(trainer, measurements))
+
+
+def run(rank, args):
+    os.environ["MASTER_ADDR"] = "localhost"
+    os.environ["MASTER_PORT"] = str(args.master_port)
+    world_size = args.num_trainers + 1
+    if rank == 0:
+        rpc.init_rpc(PS_NAME, rank=rank, world_size=world_size)
+    else:
+        rpc.init_rpc("trainer%d" % (rank - 1), rank=rank, world_size=world_size)
+        train(rank - 1, args)
+    # Blocks until all trainers are done
+    rpc.shutdown()
+
+    if rank == 0:
+        steps_per_second = sum(len(m) / sum(m) for m in _results.values())
+        all_measurements = [t for m in _results.values() for t in m]
+        p50, p90 = np.percentile(all_measurements, [50, 90])
+        print("%d trainers, %s tables: p50 step %.2fms, p90 step %.2fms, %.1f steps/s in total" % (
+            args.num_trainers, "shared" if args.shared else "disjoint",
+            p50 * 1000, p90 * 1000, steps_per_second))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({
+                    "pytorch_version": torch.__version__,
+                    "num_trainers": args.num_trainers,
+                    "shared": args.shared,
+                    "num_embeddings": args.num_embeddings,
+                    "embedding_dim": args.embedding_dim,
+                    "sparse": args.sparse,
+                    "steps_per_second": steps_per_second,
+                    "measurements": {str(k): v for k, v in _results.items()},
+                }, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DistributedOptimizer parameter server benchmark")
+    parser.add_argument("--num-trainers", type=int, default=8)
+    parser.add_argument("--shared", action="store_true",
+                        help="all trainers update the same embedding table")
+    parser.add_argument("--num-embeddings", type=int, default=100000)
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    parser.add_argument("--sparse", action="store_true",
+                        help="use sparse gradients")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--bag-size", type=int, default=16)
+    parser.add_argument("--warmup-iterations", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--master-port", type=int, default=29500)
+    parser.add_argument("--json", type=str, metavar="PATH", help="Write file with benchmark results")
+    args = parser.parse_args()
+    mp.spawn(run, args=(args,), nprocs=args.num_trainers + 1)
+
+
+if __name__ == "__main__":
+    main()
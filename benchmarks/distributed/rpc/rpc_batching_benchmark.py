@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+# Measure the throughput of small rpc_async calls with and without batching.
+#
+# This spawns one server and the given number of clients on the local
+# machine, using the process group RPC backend. Each client keeps a window of
+# outstanding rpc_async calls of a small Python function to the server, with
+# and then without torch.distributed.rpc.enable_batching, and the total number
+# of calls per second is reported for both.
+#
+
+import argparse
+import json
+import os
+import time
+
+import torch
+import torch.distributed.rpc as rpc
+import torch.multiprocessing as mp
+
+
+SERVER_NAME = "server"
+
+_results = {}
+
+
+def _add(a, b):
+    return a + b
+
+
+def _report(client, batched, qps):
+    _results.setdefault(batched, {})[client] = qps
+
+
+def _run_calls(args):
+    payload = torch.ones(args.tensor_size)
+    start = time.time()
+    futs = []
+    for i in range(args.num_calls):
+        futs.append(rpc.rpc_async(SERVER_NAME, _add, args=(payload, i)))
+        if len(futs) >= args.window:
+            for fut in futs:
+                fut.wait()
+            futs = []
+    for fut in futs:
+        fut.wait()
+    return args.num_calls / (time.time() - start)
+
+
+def client(rank, args):
+    for batched in [False, True]:
+        if batched:
+            rpc.enable_batching(max_batch_size=args.max_batch_size, max_delay=args.max_delay)
+        # Warm up
+        _run_calls(argparse.Namespace(**dict(vars(args), num_calls=args.window)))
+        qps = _run_calls(args)
+        if batched:
+            rpc.disable_batching()
+        rpc.rpc_sync(SERVER_NAME, _report, args=(rank, batched, qps))
+
+
+def run(rank, args):
+    os.environ["MASTER_ADDR"] = "localhost"
+    os.environ["MASTER_PORT"] = str(args.master_port)
+    world_size = args.num_clients + 1
+    options = rpc.ProcessGroupRpcBackendOptions(num_send_recv_threads=args.num_threads)
+    if rank == 0:
+        rpc.init_rpc(SERVER_NAME, rank=rank, world_size=world_size, rpc_backend_options=options)
+    else:
+        rpc.init_rpc("client%d" % rank, rank=rank, world_size=world_size, rpc_backend_options=options)
+        client(rank, args)
+    # Blocks until all clients are done
+    rpc.shutdown()
+
+    if rank == 0:
+        qps = {batched: sum(v.values()) for batched, v in _results.items()}
+        print("%d clients, window %d: %.0f calls/s unbatched, %.0f calls/s batched (%.2fx)" % (
+            args.num_clients, args.window, qps[False], qps[True], qps[True] / qps[False]))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({
+                    "pytorch_version": torch.__version__,
+                    "num_clients": args.num_clients,
+                    "window": args.window,
+                    "tensor_size": args.tensor_size,
+                    "max_batch_size": args.max_batch_size,
+                    "max_delay": args.max_delay,
+                    "qps_unbatched": qps[False],
+                    "qps_batched": qps[True],
+                }, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPC batching benchmark")
+    parser.add_argument("--num-clients", type=int, default=4)
+    parser.add_argument("--num-calls", type=int, default=20000,
+                        help="number of calls per client")
+    parser.add_argument("--window", type=int, default=256,
+                        help="number of outstanding calls per client")
+    parser.add_argument("--tensor-size", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-delay", type=float, default=0.001)
+    parser.add_argument("--num-threads", type=int, default=4,
+                        help="number of send/recv threads of each RPC agent")
+    parser.add_argument("--master-port", type=int, default=29500)
+    parser.add_argument("--json", type=str, metavar="PATH", help="Write file with benchmark results")
+    args = parser.parse_args()
+    mp.spawn(run, args=(args,), nprocs=args.num_clients + 1)
+
+
+if __name__ == "__main__":
+    main()
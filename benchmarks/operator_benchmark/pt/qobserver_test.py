@@ -69,6 +69,32 @@ qobserver_per_channel_list = op_bench.op_list(
 )
 
 
+qobserver_calibration_configs_short = op_bench.config_list(
+    attr_names=('C', 'M', 'N', 'num_batches', 'dtype', 'qscheme'),
+    attrs=(
+        (3, 512, 512, 8, torch.quint8, torch.per_tensor_affine),
+    ),
+    tags=('short',),
+)
+
+qobserver_calibration_configs_long = op_bench.cross_product_configs(
+    C=(1, 3),
+    M=(256, 1024),
+    N=(256, 1024),
+    num_batches=(8, 32),
+    dtype=(torch.quint8,),
+    qscheme=(torch.per_tensor_affine, torch.per_tensor_symmetric),
+    tags=('long',),
+)
+
+qobserver_calibration_list = op_bench.op_list(
+    attr_names=['op_name', 'op_func'],
+    attrs=[
+        ['HistogramObserver', obs.HistogramObserver],
+    ]
+)
+
+
 class QObserverBenchmark(op_bench.TorchBenchmarkBase):
     def init(self, C, M, N, dtype, qscheme, op_func):
         self.f_input = torch.rand(C, M, N)
@@ -78,6 +104,22 @@ class QObserverBenchmark(op_bench.TorchBenchmarkBase):
         return self.op_func(self.f_input)
 
 
+class QObserverCalibrationBenchmark(op_bench.TorchBenchmarkBase):
+    r"""Measures a whole calibration: observing batches whose range grows,
+    so that histograms are combined, and calculating the qparams."""
+    def init(self, C, M, N, num_batches, dtype, qscheme, op_func):
+        self.f_inputs = [torch.randn(C, M, N) * (i + 1) for i in range(num_batches)]
+        self.dtype = dtype
+        self.qscheme = qscheme
+        self.op_func = op_func
+
+    def forward(self):
+        observer = self.op_func(dtype=self.dtype, qscheme=self.qscheme)
+        for f_input in self.f_inputs:
+            observer(f_input)
+        return observer.calculate_qparams()
+
+
 op_bench.generate_pt_tests_from_op_list(
     qobserver_per_tensor_list,
     qobserver_per_tensor_configs_short + qobserver_per_tensor_configs_long,
@@ -88,6 +130,11 @@ op_bench.generate_pt_tests_from_op_list(
     qobserver_per_channel_configs_short + qobserver_per_channel_configs_long,
     QObserverBenchmark)
 
+op_bench.generate_pt_tests_from_op_list(
+    qobserver_calibration_list,
+    qobserver_calibration_configs_short + qobserver_calibration_configs_long,
+    QObserverCalibrationBenchmark)
+
 
 if __name__ == "__main__":
     op_bench.benchmark_runner.main()
@@ -0,0 +1,62 @@
+"""Compares the per-parameter and the multi-tensor (``foreach=True``)
+implementations of the optimizers in torch.optim on models with many small
+parameter tensors, e.g.
+
+    python optimizer_bench.py --num-params 1000 --param-size 256
+"""
+import argparse
+import statistics
+import timeit
+
+import torch
+
+OPTIMIZERS = {
+    'sgd': lambda params, foreach: torch.optim.SGD(params, lr=1e-3, momentum=0.9, foreach=foreach),
+    'adam': lambda params, foreach: torch.optim.Adam(params, lr=1e-3, foreach=foreach),
+    'adamw': lambda params, foreach: torch.optim.AdamW(params, lr=1e-3, foreach=foreach),
+    'rmsprop': lambda params, foreach: torch.optim.RMSprop(params, lr=1e-3, foreach=foreach),
+}
+
+
+def make_params(num_params, param_size, device):
+    params = [torch.randn(param_size, device=device, requires_grad=True) for _ in range(num_params)]
+    for p in params:
+        p.grad = torch.randn_like(p)
+    return params
+
+
+def bench(name, foreach, args):
+    params = make_params(args.num_params, args.param_size, args.device)
+    optimizer = OPTIMIZERS[name](params, foreach)
+
+    def step():
+        optimizer.step()
+        if args.device == 'cuda':
+            torch.cuda.synchronize()
+
+    for _ in range(args.warmup):
+        step()
+    runtimes = timeit.repeat(step, repeat=args.repeat, number=1)
+    return statistics.mean(runtimes) * 1000.0, statistics.stdev(runtimes) * 1000.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark multi-tensor optimizer steps')
+    parser.add_argument('--optimizers', nargs='+', default=sorted(OPTIMIZERS.keys()),
+                        choices=sorted(OPTIMIZERS.keys()))
+    parser.add_argument('--num-params', type=int, default=1000)
+    parser.add_argument('--param-size', type=int, default=256)
+    parser.add_argument('--device', default='cuda' if torch.cuda.is_available() else 'cpu')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print("{} parameters of {} elements on {}, N = {}\n".format(
+        args.num_params, args.param_size, args.device, args.repeat))
+    for name in args.optimizers:
+        results = {}
+        for foreach in [False, True]:
+            results[foreach] = bench(name, foreach, args)
+            print("{:8s} foreach={!s:5s} avg. step time: {:.3f} ms, stddev: {:.3f} ms".format(
+                name, foreach, results[foreach][0], results[foreach][1]))
+        print("{:8s} speedup: {:.2f}x\n".format(name, results[False][0] / results[True][0]))
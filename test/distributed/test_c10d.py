@@ -2762,6 +2762,253 @@ class DistributedDataParallelTest(MultiProcessTestCase):
         ddp_parameter = next(ddp_model.parameters())
         self.assertEqual(vanilla_parameter.grad, ddp_parameter.grad)
 
+    def _test_comm_hook(self, create_state, hook, atol=None):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        # Ensure initialized weights and inputs are identical across processes
+        torch.manual_seed(1337)
+
+        vanilla_model = Net()
+        ddp_model = DistributedDataParallel(
+            copy.deepcopy(vanilla_model),
+            process_group=process_group,
+            bucket_cap_mb=0.001,
+        )
+        ddp_model.register_comm_hook(create_state(process_group), hook)
+
+        mult = 2
+        batch_size = mult * self.world_size
+        input = torch.randn(batch_size, 2)
+        target = torch.randn(batch_size, 4)
+
+        for _ in range(3):
+            vanilla_model.zero_grad()
+            ddp_model.zero_grad()
+
+            # Run with entire batch against single process version
+            F.mse_loss(vanilla_model(input), target).backward()
+
+            # Run with partial batch against multi process version
+            partial_input = input.split(mult)[self.rank]
+            partial_target = target.split(mult)[self.rank]
+            F.mse_loss(ddp_model(partial_input), partial_target).backward()
+
+            for p, ddp_p in zip(vanilla_model.parameters(), ddp_model.parameters()):
+                self.assertEqual(p.grad, ddp_p.grad, atol=atol, rtol=0 if atol else None)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_allreduce_hook(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import allreduce_hook
+        self._test_comm_hook(lambda process_group: process_group, allreduce_hook)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_fp16_compress_hook(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import fp16_compress_hook
+        self._test_comm_hook(lambda process_group: process_group, fp16_compress_hook, atol=1e-3)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_powerSGD_hook(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import PowerSGDState, powerSGD_hook
+        # With a rank this large, no gradient of `Net` is worth compressing,
+        # so the result must match the exact average.
+        self._test_comm_hook(
+            lambda process_group: PowerSGDState(process_group, matrix_approximation_rank=10),
+            powerSGD_hook)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_topk_hook(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import TopKState, topk_hook
+        # Sending all values must match the exact average.
+        self._test_comm_hook(
+            lambda process_group: TopKState(process_group, compress_ratio=1.0),
+            topk_hook)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_compression_consistent(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import \
+            PowerSGDState, powerSGD_hook, TopKState, topk_hook
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        for state, hook in [
+                (PowerSGDState(process_group, matrix_approximation_rank=1), powerSGD_hook),
+                (TopKState(process_group, compress_ratio=0.1), topk_hook)]:
+            torch.manual_seed(1337)
+            ddp_model = DistributedDataParallel(
+                Net(), process_group=process_group, bucket_cap_mb=0.001)
+            ddp_model.register_comm_hook(state, hook)
+            with self.assertRaisesRegex(RuntimeError, "can only be called once"):
+                ddp_model.register_comm_hook(state, hook)
+
+            # Inputs differ across processes, but the compressed average must not.
+            input = torch.randn(4, 2) + self.rank
+            target = torch.randn(4, 4)
+            for _ in range(3):
+                ddp_model.zero_grad()
+                F.mse_loss(ddp_model(input), target).backward()
+                for p in ddp_model.parameters():
+                    self.assertIsNotNone(p.grad)
+                    grads = [torch.empty_like(p.grad) for _ in range(self.world_size)]
+                    process_group.allgather([grads], [p.grad]).wait()
+                    for grad in grads:
+                        self.assertEqual(grad, p.grad)
+            self.assertTrue(len(state.error_dict) > 0)
+
+    @requires_gloo()
+    def test_ddp_comm_hook_after_forward(self):
+        from torch.distributed.algorithms.ddp_comm_hooks import allreduce_hook
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        ddp_model = DistributedDataParallel(Net(), process_group=process_group)
+        ddp_model(torch.randn(4, 2)).sum().backward()
+        with self.assertRaisesRegex(RuntimeError, "before the first forward pass"):
+            ddp_model.register_comm_hook(process_group, allreduce_hook)
+
+    @requires_gloo()
+    def test_defer_buffer_sync(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        process_group = c10d.ProcessGroupGloo(store, self.rank, self.world_size)
+
+        torch.manual_seed(1337)
+        ddp_model = DistributedDataParallel(
+            nn.Sequential(nn.Linear(2, 4), nn.BatchNorm1d(4)),
+            process_group=process_group,
+            defer_buffer_sync=True,
+        )
+        running_mean = ddp_model.module[1].running_mean
+
+        num_broadcasts = [0]
+        broadcast_coalesced = ddp_model._distributed_broadcast_coalesced
+
+        def count_broadcasts(*args):
+            num_broadcasts[0] += 1
+            return broadcast_coalesced(*args)
+
+        ddp_model._distributed_broadcast_coalesced = count_broadcasts
+
+        def gather_running_means():
+            means = [torch.empty_like(running_mean) for _ in range(self.world_size)]
+            process_group.allgather([means], [running_mean]).wait()
+            return means
+
+        # Inputs differ across processes, so running statistics diverge as
+        # long as they are not broadcast.
+        for _ in range(3):
+            with ddp_model.no_sync():
+                for _ in range(3):
+                    ddp_model(torch.randn(4, 2) + self.rank).sum().backward()
+            ddp_model(torch.randn(4, 2) + self.rank).sum().backward()
+        self.assertEqual(num_broadcasts[0], 0)
+        means = gather_running_means()
+        self.assertNotEqual(means[0], means[1])
+
+        ddp_model.sync_module_states()
+        self.assertEqual(num_broadcasts[0], 1)
+        for mean in gather_running_means():
+            self.assertEqual(mean, means[0])
+
+
+class ZeroRedundancyOptimizerTest(MultiProcessTestCase):
+    def setUp(self):
+        super(ZeroRedundancyOptimizerTest, self).setUp()
+        self._fork_processes()
+
+    def tearDown(self):
+        super(ZeroRedundancyOptimizerTest, self).tearDown()
+        try:
+            os.remove(self.file_name)
+        except OSError:
+            pass
+
+    @property
+    def world_size(self):
+        return 2
+
+    def _init_process_group(self):
+        store = c10d.FileStore(self.file_name, self.world_size)
+        c10d.init_process_group("gloo", store=store, rank=self.rank, world_size=self.world_size)
+
+    def _create_model(self):
+        torch.manual_seed(1337)
+        return nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 2))
+
+    def _step(self, model, optimizer, iteration):
+        # The same gradients on all processes, as DDP would produce them
+        torch.manual_seed(iteration)
+        optimizer.zero_grad()
+        model(torch.randn(4, 4)).sum().backward()
+        optimizer.step()
+
+    @requires_gloo()
+    def test_step(self):
+        from torch.distributed.optim import ZeroRedundancyOptimizer
+        self._init_process_group()
+        model = self._create_model()
+        sharded_model = self._create_model()
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.1)
+        sharded_optimizer = ZeroRedundancyOptimizer(
+            sharded_model.parameters(), torch.optim.Adam, lr=0.1)
+
+        for iteration in range(3):
+            self._step(model, optimizer, iteration)
+            self._step(sharded_model, sharded_optimizer, iteration)
+            for p, sharded_p in zip(model.parameters(), sharded_model.parameters()):
+                self.assertEqual(p, sharded_p)
+
+        # Each process only keeps the state of its own parameters
+        self.assertEqual(len(sharded_optimizer.state), 0)
+        num_states = torch.tensor([len(sharded_optimizer.optim.state)])
+        c10d.all_reduce(num_states)
+        self.assertEqual(num_states.item(), len(list(model.parameters())))
+        self.assertLess(len(sharded_optimizer.optim.state), len(list(model.parameters())))
+
+    @requires_gloo()
+    def test_state_dict(self):
+        from torch.distributed.optim import ZeroRedundancyOptimizer
+        self._init_process_group()
+        model = self._create_model()
+        sharded_model = self._create_model()
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.1)
+        sharded_optimizer = ZeroRedundancyOptimizer(
+            sharded_model.parameters(), torch.optim.Adam, lr=0.1)
+        for iteration in range(2):
+            self._step(model, optimizer, iteration)
+            self._step(sharded_model, sharded_optimizer, iteration)
+
+        with self.assertRaisesRegex(RuntimeError, "consolidate_state_dict"):
+            sharded_optimizer.state_dict()
+        sharded_optimizer.consolidate_state_dict(to=0)
+        if self.rank == 0:
+            # The consolidated state can be loaded into a non-sharded optimizer
+            state_dict = sharded_optimizer.state_dict()
+            expected_state_dict = optimizer.state_dict()
+            loaded_optimizer = torch.optim.Adam(self._create_model().parameters(), lr=0.1)
+            loaded_optimizer.load_state_dict(state_dict)
+            for p, loaded_p in zip(model.parameters(), loaded_optimizer.param_groups[0]['params']):
+                self.assertEqual(optimizer.state[p], loaded_optimizer.state[loaded_p])
+            self.assertEqual(state_dict['param_groups'][0]['lr'], expected_state_dict['param_groups'][0]['lr'])
+        else:
+            with self.assertRaisesRegex(RuntimeError, "consolidate_state_dict"):
+                sharded_optimizer.state_dict()
+
+        # A non-sharded state dict can be loaded on all processes, and
+        # training continues the same.
+        state_dict = optimizer.state_dict()
+        state_dict['param_groups'][0]['lr'] = 0.05
+        optimizer.load_state_dict(state_dict)
+        reloaded_model = self._create_model()
+        reloaded_model.load_state_dict(model.state_dict())
+        reloaded_optimizer = ZeroRedundancyOptimizer(
+            reloaded_model.parameters(), torch.optim.Adam, lr=0.1)
+        reloaded_optimizer.load_state_dict(state_dict)
+        self.assertEqual(reloaded_optimizer.param_groups[0]['lr'], 0.05)
+        self._step(model, optimizer, 2)
+        self._step(reloaded_model, reloaded_optimizer, 2)
+        for p, reloaded_p in zip(model.parameters(), reloaded_model.parameters()):
+            self.assertEqual(p, reloaded_p)
+
 
 class ReducerModule(nn.Module):
     def __init__(self):
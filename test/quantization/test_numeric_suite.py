@@ -14,8 +14,10 @@ from torch.quantization._numeric_suite import (
     Shadow,
     ShadowLogger,
     compare_model_outputs,
+    compare_model_sensitivity,
     compare_model_stub,
     compare_weights,
+    select_qconfig_dict,
 )
 from torch.testing._internal.common_quantization import (
     AnnotatedConvBnReLUModel,
@@ -219,3 +221,64 @@ class TestEagerModeNumericSuite(QuantizationTestCase):
                 )
                 for k, v in act_compare_dict.items():
                     self.assertTrue(v["float"].shape == v["quantized"].shape)
+
+    def test_compare_model_sensitivity(self):
+        r"""Measure the SQNR and latency of quantized conv layers and their
+        float shadow modules
+        """
+        for qengine in supported_qengines:
+            with override_quantized_engine(qengine):
+                model_list = [
+                    AnnotatedConvModel(qengine),
+                    AnnotatedConvBnReLUModel(qengine),
+                ]
+                data = [x for x, _ in self.img_data]
+                module_swap_list = [nn.Conv2d, nn.intrinsic.modules.fused.ConvReLU2d]
+                for model in model_list:
+                    model.eval()
+                    if hasattr(model, "fuse_model"):
+                        model.fuse_model()
+                    q_model = quantize(model, default_eval_fn, self.img_data)
+                    sensitivity_dict = compare_model_sensitivity(
+                        model, q_model, module_swap_list, data
+                    )
+                    self.assertEqual(len(sensitivity_dict), 1)
+                    for k, v in sensitivity_dict.items():
+                        self.assertTrue(isinstance(dict(q_model.named_modules())[k], Shadow))
+                        self.assertGreater(v["sqnr"], 0)
+                        self.assertGreater(v["float_time"], 0)
+                        self.assertGreater(v["quantized_time"], 0)
+
+                    qconfig_dict = select_qconfig_dict(
+                        sensitivity_dict, default_qconfig, min_sqnr=float("-inf")
+                    )
+                    self.assertEqual(qconfig_dict.keys(), sensitivity_dict.keys())
+
+                # Functionals are called through their methods, not forward
+                model = ModelWithFunctionals().eval()
+                model.qconfig = torch.quantization.get_default_qconfig("fbgemm")
+                q_model = prepare(model, inplace=False)
+                q_model(data[0])
+                q_model = convert(q_model)
+                sensitivity_dict = compare_model_sensitivity(
+                    model, q_model, [nnq.FloatFunctional], data
+                )
+                self.assertEqual(len(sensitivity_dict), 6)
+                for k, v in sensitivity_dict.items():
+                    self.assertGreater(v["float_time"], 0)
+                    self.assertGreater(v["quantized_time"], 0)
+
+    def test_select_qconfig_dict(self):
+        r"""Select the modules that save the most time per noise within the budget
+        """
+        sensitivity_dict = {
+            "a": {"sqnr": 20.0, "float_time": 0.3, "quantized_time": 0.1},
+            "b": {"sqnr": 30.0, "float_time": 0.2, "quantized_time": 0.1},
+            "c": {"sqnr": 40.0, "float_time": 0.1, "quantized_time": 0.2},
+        }
+        qconfig_dict = select_qconfig_dict(sensitivity_dict, default_qconfig, min_sqnr=25)
+        self.assertEqual(qconfig_dict, {"a": None, "b": default_qconfig, "c": None})
+        qconfig_dict = select_qconfig_dict(sensitivity_dict, default_qconfig, min_sqnr=10)
+        self.assertEqual(qconfig_dict, {"a": default_qconfig, "b": default_qconfig, "c": None})
+        qconfig_dict = select_qconfig_dict(sensitivity_dict, default_qconfig, min_sqnr=50)
+        self.assertEqual(qconfig_dict, {"a": None, "b": None, "c": None})
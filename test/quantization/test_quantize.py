@@ -8,6 +8,7 @@ import torch.nn.intrinsic.qat as nniqat
 from torch.nn.utils.rnn import PackedSequence
 from torch.quantization import (
     quantize,
+    quantize_parallel,
     prepare,
     convert,
     prepare_qat,
@@ -130,6 +131,31 @@ class TestPostTrainingStatic(QuantizationTestCase):
                 quantize(model, test_only_eval_fn, self.calib_data, inplace=True)
                 checkQuantized(model)
 
+    def test_quantize_parallel(self):
+        r"""Calibrating in several processes gives the same quantization
+        parameters as calibrating in one process
+        """
+        calib_data = [(torch.rand(2, 5, dtype=torch.float), torch.randint(0, 1, (2,), dtype=torch.long))
+                      for _ in range(5)]
+        for qengine in supported_qengines:
+            with override_quantized_engine(qengine):
+                base = AnnotatedSingleLayerLinearModel(qengine)
+                base.qconfig = default_qconfig
+                ref_model = quantize(base, test_only_eval_fn, calib_data)
+                keys_before = set(list(base.state_dict().keys()))
+                model = quantize_parallel(base, test_only_eval_fn, calib_data, num_workers=2)
+                keys_after = set(list(base.state_dict().keys()))
+                self.assertEqual(keys_before, keys_after)  # simple check that nothing changed
+
+                self.checkNoPrepModules(model)
+                self.checkWrappedQuantizedLinear(model.fc1)
+                self.assertEqual(model.fc1.quant.scale, ref_model.fc1.quant.scale)
+                self.assertEqual(model.fc1.quant.zero_point, ref_model.fc1.quant.zero_point)
+                self.assertEqual(model.fc1.module.scale, ref_model.fc1.module.scale)
+                self.assertEqual(model.fc1.module.zero_point, ref_model.fc1.module.zero_point)
+                for data, _ in calib_data:
+                    self.assertEqual(model(data), ref_model(data))
+
     @skipIfNoFBGEMM
     def test_two_layers(self):
         r"""TwoLayerLinearModel has two Linear modules but we only quantize the second one
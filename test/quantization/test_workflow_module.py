@@ -317,6 +317,30 @@ class TestObserver(QuantizationTestCase):
         scripted(x)
         self.assertEqual(obs.calculate_qparams(), scripted.calculate_qparams())
 
+    def test_observer_merge(self):
+        x = torch.randn(4, 3)
+        y = torch.randn(4, 3) * 2
+        for obs_type in [MinMaxObserver, MinMaxDynamicQuantObserver, PerChannelMinMaxObserver]:
+            obs = obs_type()
+            obs(torch.cat([x, y], dim=1))
+            obs_x, obs_y = obs_type(), obs_type()
+            obs_x(x)
+            obs_y(y)
+            obs_x.merge_(obs_y)
+            self.assertEqual(obs_x.calculate_qparams(), obs.calculate_qparams())
+            # Merging with observers without statistics
+            merged = obs_type().merge_(obs_x).merge_(obs_type())
+            self.assertEqual(merged.calculate_qparams(), obs.calculate_qparams())
+
+        obs_x, obs_y = RecordingObserver(), RecordingObserver()
+        obs_x(x)
+        obs_y(y)
+        self.assertEqual(obs_x.merge_(obs_y).get_tensor_value(), [x, y])
+
+        for obs_type in [MovingAverageMinMaxObserver, MovingAveragePerChannelMinMaxObserver]:
+            with self.assertRaises(NotImplementedError):
+                obs_type().merge_(obs_type())
+
     # TODO: move this to test_quantize.py
     def test_no_qconfig_propagation(self):
         model = ModelWithNoQconfigPropagation()
@@ -329,6 +353,166 @@ class TestObserver(QuantizationTestCase):
                          "QConfig is expected to NOT propagate")
 
 
+class _ReferenceHistogramObserver(HistogramObserver):
+    r"""HistogramObserver with the original, unvectorized parameter search
+    and combination of histograms, to check that the optimized ones give
+    the same results."""
+
+    def _non_linear_param_search(self):
+        r"""Non-linear parameter search.
+
+        An approximation for L2 error minimization for selecting min/max.
+        By selecting new min/max, we filter out outliers in input distribution.
+        This follows the implementation of NormMinimization::NonlinearQuantizationParamsSearch in
+        caffe2/quantization/server/norm_minimization.cc
+        """
+        def _get_norm(delta_begin, delta_end, density, norm_type):
+            r"""
+            Compute the norm of the values uniformaly distributed between
+            delta_begin and delta_end.
+
+            norm = density * (integral_{begin, end} x^2)
+                 = density * (end^3 - begin^3) / 3
+            """
+            assert norm_type == "L2", "Only L2 norms are currently supported"
+            norm = 0.0
+            if norm_type == "L2":
+                norm = (
+                    delta_end * delta_end * delta_end
+                    - delta_begin * delta_begin * delta_begin
+                ) / 3
+            return density * norm
+
+        def _compute_quantization_error(next_start_bin, next_end_bin, norm_type):
+            r"""
+            Compute the quantization error if we use start_bin to end_bin as the
+            min and max to do the quantization.
+            """
+            bin_width = (self.max_val.item() - self.min_val.item()) / self.bins
+
+            norm = 0.0
+            dst_bin_width = bin_width * (next_end_bin - next_start_bin + 1) / self.dst_nbins
+            if dst_bin_width == 0.0:
+                return 0.0
+            for src_bin in range(self.bins):
+                # distances from the beginning of first dst_bin to the beginning and
+                # end of src_bin
+                src_bin_begin = (src_bin - next_start_bin) * bin_width
+                src_bin_end = src_bin_begin + bin_width
+
+                # which dst_bins the beginning and end of src_bin belong to?
+                dst_bin_of_begin = min(
+                    self.dst_nbins - 1, max(0.0, math.floor(src_bin_begin / dst_bin_width))
+                )
+                dst_bin_of_end = min(
+                    self.dst_nbins - 1, max(0.0, math.floor(src_bin_end / dst_bin_width))
+                )
+                dst_bin_of_begin_center = (
+                    dst_bin_of_begin * dst_bin_width + dst_bin_width / 2
+                )
+
+                density = self.histogram[src_bin] / bin_width
+                if dst_bin_of_begin == dst_bin_of_end:
+                    # if src_bin is entirely within 1 dst_bin
+                    delta_begin = src_bin_begin - dst_bin_of_begin_center
+                    delta_end = src_bin_end - dst_bin_of_begin_center
+                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
+                else:
+                    delta_begin = src_bin_begin - dst_bin_of_begin_center
+                    delta_end = dst_bin_width / 2
+                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
+
+                    norm = norm + (dst_bin_of_end - dst_bin_of_begin - 1) * _get_norm(
+                        -dst_bin_width / 2, dst_bin_width / 2, density, norm_type
+                    )
+
+                    dst_bin_of_end_center = (
+                        dst_bin_of_end * dst_bin_width + dst_bin_width / 2
+                    )
+
+                    delta_begin = -dst_bin_width / 2
+                    delta_end = src_bin_end - dst_bin_of_end_center
+                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
+            return norm
+
+        assert self.histogram.size()[0] == self.bins, "bins mistmatch"
+        bin_width = (self.max_val - self.min_val) / self.bins
+
+        # cumulative sum
+        total = sum(self.histogram)
+        cSum = torch.cumsum(self.histogram, dim=0)
+
+        stepsize = 1e-5  # granularity
+        alpha = 0.0  # lower bound
+        beta = 1.0  # upper bound
+        start_bin = 0
+        end_bin = self.bins - 1
+        norm_min = float("inf")
+
+        while alpha < beta:
+            # Find the next step
+            next_alpha = alpha + stepsize
+            next_beta = beta - stepsize
+
+            # find the left and right bins between the quantile bounds
+            l = start_bin
+            r = end_bin
+            while l < end_bin and cSum[l] < next_alpha * total:
+                l = l + 1
+            while r > start_bin and cSum[r] > next_beta * total:
+                r = r - 1
+
+            # decide the next move
+            next_start_bin = start_bin
+            next_end_bin = end_bin
+            if (l - start_bin) > (end_bin - r):
+                # move the start bin
+                next_start_bin = l
+                alpha = next_alpha
+            else:
+                # move the end bin
+                next_end_bin = r
+                beta = next_beta
+
+            if next_start_bin == start_bin and next_end_bin == end_bin:
+                continue
+
+            # calculate the quantization error using next_start_bin and next_end_bin
+            norm = _compute_quantization_error(next_start_bin, next_end_bin, "L2")
+
+            if norm > norm_min:
+                break
+            norm_min = norm
+            start_bin = next_start_bin
+            end_bin = next_end_bin
+
+        new_min = self.min_val + bin_width * start_bin
+        new_max = self.min_val + bin_width * (end_bin + 1)
+        return new_min, new_max
+
+    def _combine_histograms(self, orig_hist, new_hist, upsample_rate, downsample_rate, start_idx, Nbins):
+        # type: (Tensor, Tensor, int, int, int, int) -> Tensor
+        # First up-sample the histogram with new data by a factor of L
+        # This creates an approximate probability density thats piecwise constant
+        upsampled_histogram = new_hist.repeat_interleave(upsample_rate)
+        # Now insert the upsampled histogram into the output
+        # histogram, which is initialized with zeros.
+        # The offset at which the histogram is introduced is determined
+        # by the start index as the output histogram can cover a wider range
+        histogram_with_output_range = torch.zeros((Nbins * downsample_rate), device=orig_hist.device)
+        histogram_with_output_range[start_idx:Nbins * upsample_rate + start_idx] = upsampled_histogram
+        # Compute integral histogram, double precision is needed to ensure
+        # that there are no overflows
+        integral_histogram = torch.cumsum(histogram_with_output_range, 0,
+                                          dtype=torch.double)[downsample_rate - 1 :: downsample_rate]
+        # Finally perform interpolation
+        shifted_integral_histogram = torch.zeros((Nbins), device=orig_hist.device)
+        shifted_integral_histogram[1:Nbins] = integral_histogram[0:-1]
+        interpolated_histogram = (integral_histogram - shifted_integral_histogram) / upsample_rate
+        orig_hist = orig_hist + interpolated_histogram.to(torch.float)
+        return orig_hist
+
+
 class TestRecordHistogramObserver(QuantizationTestCase):
     # TODO: move this to quantize.py
     def test_record_observer(self):
@@ -418,6 +602,54 @@ class TestRecordHistogramObserver(QuantizationTestCase):
         self.assertEqual(myobs.bins, loaded_obs.bins)
         self.assertEqual(myobs.calculate_qparams(), loaded_obs.calculate_qparams())
 
+    def test_histogram_observer_same_as_reference(self):
+        torch.manual_seed(0)
+        for bins, upsample_rate in [(256, 128), (512, 16)]:
+            myobs = HistogramObserver(bins=bins, upsample_rate=upsample_rate)
+            ref_obs = _ReferenceHistogramObserver(bins=bins, upsample_rate=upsample_rate)
+            for i in range(8):
+                # The range grows, so histograms are combined
+                x = torch.randn(1000) * (i + 1) + i
+                myobs(x)
+                ref_obs(x)
+            self.assertEqual(myobs.min_val, ref_obs.min_val)
+            self.assertEqual(myobs.max_val, ref_obs.max_val)
+            self.assertEqual(myobs.histogram, ref_obs.histogram)
+            self.assertEqual(myobs._non_linear_param_search(), ref_obs._non_linear_param_search())
+            scale, zero_point = myobs.calculate_qparams()
+            ref_scale, ref_zero_point = ref_obs.calculate_qparams()
+            self.assertEqual(scale, ref_scale)
+            self.assertEqual(zero_point, ref_zero_point)
+
+    def test_histogram_observer_merge(self):
+        torch.manual_seed(0)
+        x = torch.randn(1000)
+        y = torch.randn(1000) * 2 + 1
+        obs_x = HistogramObserver(bins=64)
+        obs_y = HistogramObserver(bins=64)
+        obs_x(x)
+        obs_y(y)
+        merged = HistogramObserver(bins=64).merge_(obs_x).merge_(obs_y)
+        self.assertEqual(merged.min_val, torch.min(x.min(), y.min()))
+        self.assertEqual(merged.max_val, torch.max(x.max(), y.max()))
+        self.assertEqual(merged.histogram.sum(), 2000)
+
+        # Histograms of the same range are added up
+        merged = HistogramObserver(bins=64).merge_(obs_x).merge_(obs_x)
+        self.assertEqual(merged.min_val, obs_x.min_val)
+        self.assertEqual(merged.max_val, obs_x.max_val)
+        self.assertEqual(merged.histogram, 2 * obs_x.histogram)
+        self.assertEqual(merged.calculate_qparams(), obs_x.calculate_qparams())
+
+        # Redistributing a histogram over a wider range keeps the bins of its
+        # range when they line up with the new ones
+        obs = HistogramObserver(bins=4)
+        obs(torch.tensor([0.0, 0.5, 1.5, 2.0]))
+        wider = HistogramObserver(bins=4)
+        wider(torch.tensor([0.0, 4.0]))
+        wider.merge_(obs)
+        self.assertEqual(wider.histogram, torch.tensor([3.0, 2.0, 0.0, 1.0]))
+
     def test_histogram_observer_one_sided(self):
         myobs = HistogramObserver(bins=8, dtype=torch.quint8, qscheme=torch.per_tensor_affine, reduce_range=True)
         x = torch.tensor([0.0, 0.3, 1.2, 1.7])
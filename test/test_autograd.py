@@ -1,5 +1,6 @@
 import contextlib
 import gc
+import gzip
 import sys
 import math
 import tempfile
@@ -25,7 +26,8 @@ from torch.autograd.gradcheck import gradgradcheck, gradcheck
 from torch.autograd.function import once_differentiable
 from torch.autograd.profiler import (profile, format_time, EventList,
                                      FunctionEvent, FunctionEventAvg,
-                                     record_function, emit_nvtx)
+                                     KeyAveragesAggregator, ProfilerAction,
+                                     record_function, emit_nvtx, schedule)
 import torch.autograd.functional as autogradF
 from torch.utils.checkpoint import checkpoint
 from torch.testing._internal.common_utils import (TEST_MKL, TEST_WITH_ROCM, TestCase, run_tests, skipIfNoLapack,
@@ -2624,6 +2626,16 @@ class TestAutograd(TestCase):
             # if the JSON generated by export_chrome_trace is not valid, this will throw and fail the test.
             json.load(f)
 
+        with profile() as prof:
+            with record_function('name with "quotes"\\'):
+                torch.add(t1, t2)
+        with tempfile.NamedTemporaryFile(suffix=".json.gz") as f:
+            prof.export_chrome_trace(f.name)
+            with gzip.open(f.name, "rt") as trace_file:
+                trace = json.load(trace_file)
+            self.assertEqual(len(trace), len(prof.function_events))
+            self.assertIn('name with "quotes"\\', [event["name"] for event in trace])
+
         # Same test but for cuda.
         if not torch.cuda.is_available():
             return
@@ -2784,6 +2796,77 @@ class TestAutograd(TestCase):
         self.assertEqual(avg.cpu_time, 7.5)
         self.assertEqual(avg.cuda_time_total, 0)
 
+    def test_profiler_schedule(self):
+        A = ProfilerAction
+        fn = schedule(wait=1, warmup=1, active=2, repeat=2, skip_first=1)
+        self.assertEqual([fn(step) for step in range(11)], [
+            A.NONE, A.NONE, A.WARMUP, A.RECORD, A.RECORD_AND_SAVE,
+            A.NONE, A.WARMUP, A.RECORD, A.RECORD_AND_SAVE, A.NONE, A.NONE])
+        fn = schedule(wait=2, warmup=0, active=1)
+        self.assertEqual([fn(step) for step in range(6)], [
+            A.NONE, A.NONE, A.RECORD_AND_SAVE, A.NONE, A.NONE, A.RECORD_AND_SAVE])
+        with self.assertRaisesRegex(ValueError, "active"):
+            schedule(wait=1, warmup=1, active=0)
+
+        traces = []
+
+        def on_trace_ready(prof):
+            traces.append([evt.name for evt in prof.function_events])
+
+        x = torch.randn(10, 10)
+        with profile(schedule=schedule(wait=1, warmup=1, active=2),
+                     on_trace_ready=on_trace_ready) as prof:
+            for step in range(9):
+                with record_function("step_{}".format(step)):
+                    x * 2
+                self.assertEqual(torch.autograd._profiler_enabled(), step % 4 != 0)
+                prof.step()
+        # The last range is cut short by leaving the context manager
+        steps = [[name for name in trace if name.startswith("step_")] for trace in traces]
+        self.assertEqual(steps, [["step_2", "step_3"], ["step_6", "step_7"]])
+        self.assertFalse(torch.autograd._profiler_enabled())
+        self.assertEqual([evt.name for evt in prof.function_events], traces[-1])
+
+        with self.assertRaisesRegex(RuntimeError, "schedule"):
+            with profile() as prof:
+                prof.step()
+
+    def test_profiler_key_averages_aggregator(self):
+        def make_events(names):
+            return EventList([
+                FunctionEvent(id=i, name=name, thread=0, cpu_start=10 * i, cpu_end=10 * i + len(name))
+                for i, name in enumerate(names)], use_cuda=False)
+
+        aggregator = KeyAveragesAggregator()
+        aggregator.add(make_events(["a", "bb", "a"]))
+        aggregator.add(make_events(["bb", "ccc"]))
+        averages = {avg.key: avg for avg in aggregator.key_averages()}
+        self.assertEqual(aggregator.num_traces, 2)
+        self.assertEqual(averages["a"].count, 2)
+        self.assertEqual(averages["bb"].cpu_time_total, 4)
+        self.assertEqual(averages["ccc"].self_cpu_time_total, 3)
+
+        aggregator = KeyAveragesAggregator(max_entries=2)
+        aggregator.add(make_events(["a", "bb", "ccc", "dddd"]))
+        averages = {avg.key: avg for avg in aggregator.key_averages()}
+        self.assertEqual(set(averages.keys()), {"ccc", "dddd", "[other]"})
+        self.assertEqual(averages["[other]"].count, 2)
+        self.assertEqual(averages["[other]"].self_cpu_time_total, 3)
+        self.assertEqual(sum(avg.self_cpu_time_total for avg in averages.values()), 10)
+        self.assertIn("[other]", aggregator.key_averages().table())
+
+        # Used as the callback of a scheduled profiler
+        aggregator = KeyAveragesAggregator()
+        x = torch.randn(10, 10)
+        with profile(schedule=schedule(wait=1, warmup=0, active=1), on_trace_ready=aggregator) as prof:
+            for _ in range(6):
+                with record_function("foo"):
+                    x * 2
+                prof.step()
+        self.assertEqual(aggregator.num_traces, 3)
+        foo = [avg for avg in aggregator.key_averages() if avg.key == "foo"][0]
+        self.assertEqual(foo.count, 3)
+
     def test_profiler_shapes(self):
         print("")
         layer1 = torch.nn.Linear(20, 30)
@@ -13,7 +13,7 @@ import warnings
 from torch import multiprocessing as mp
 from torch.utils.data import _utils, Dataset, IterableDataset, TensorDataset, DataLoader, ConcatDataset, ChainDataset
 from torch.utils.data._utils import MP_STATUS_CHECK_INTERVAL
-from torch.utils.data.dataset import random_split
+from torch.utils.data.dataset import random_split, Subset
 from torch._utils import ExceptionWrapper
 from torch.testing._internal.common_utils import (TestCase, run_tests, TEST_NUMPY, IS_WINDOWS,
                                                   IS_PYTORCH_CI, NO_MULTIPROCESSING_SPAWN, skipIfRocm,
@@ -246,6 +246,44 @@ class TestTensorDataset(TestCase):
             self.assertEqual(t2[i], source[i][2])
             self.assertEqual(t3[i], source[i][3])
 
+    def test_getitems(self):
+        t = torch.randn(15, 10, 2)
+        l = torch.randperm(15)
+        source = TensorDataset(t, l)
+        indices = [3, 0, 14, 3, 7]
+        samples = source.__getitems__(indices)
+        self.assertEqual(len(samples), len(indices))
+        for idx, (sample, label) in zip(indices, samples):
+            self.assertEqual(t[idx], sample)
+            self.assertEqual(l[idx], label)
+        self.assertEqual(source.__getitems__([]), [])
+
+    def test_subset_getitems(self):
+        t = torch.randn(15, 10)
+        source = Subset(TensorDataset(t), [10, 2, 4, 6])
+        samples = source.__getitems__([3, 0, 1])
+        for idx, (sample,) in zip([6, 10, 2], samples):
+            self.assertEqual(t[idx], sample)
+        # falls back to `__getitem__` for datasets without `__getitems__`
+        source = Subset(list(range(10, 20)), [9, 8, 7])
+        self.assertEqual(source.__getitems__([2, 0]), [17, 19])
+
+    def test_getitems_overridden_getitem(self):
+        class NegatedTensorDataset(TensorDataset):
+            def __getitem__(self, index):
+                return tuple(-tensor[index] for tensor in self.tensors)
+
+        t = torch.randn(15, 10)
+        source = NegatedTensorDataset(t)
+        # the inherited `__getitems__` would bypass the overriding `__getitem__`
+        self.assertFalse(torch.utils.data.dataset._has_getitems(source))
+        self.assertTrue(torch.utils.data.dataset._has_getitems(TensorDataset(t)))
+        samples = Subset(source, [10, 2, 4]).__getitems__([2, 0])
+        for idx, (sample,) in zip([4, 10], samples):
+            self.assertEqual(-t[idx], sample)
+        batches = list(DataLoader(source, batch_size=4))
+        self.assertEqual(torch.cat([batch for batch, in batches], 0), -t)
+
 
 @unittest.skipIf(
     TEST_WITH_TSAN,
@@ -306,6 +344,20 @@ class TestConcatDataset(TestCase):
         with self.assertRaisesRegex(AssertionError, "does not support IterableDataset"):
             ConcatDataset([it1, d1])
 
+    def test_getitems(self):
+        result = ConcatDataset([[0, 1, 2, 3, 4],
+                                [],
+                                [5, 6, 7, 8, 9]])
+        self.assertEqual(result.__getitems__([9, 0, 5, 4, -1]), [9, 0, 5, 4, 9])
+
+        d1 = TensorDataset(torch.rand(7, 3), torch.rand(7))
+        d2 = TensorDataset(torch.rand(7, 3), torch.rand(7))
+        result = d1 + d2
+        indices = [13, 1, 7, 6, 0]
+        for idx, (sample, label) in zip(indices, result.__getitems__(indices)):
+            self.assertEqual(result[idx][0], sample)
+            self.assertEqual(result[idx][1], label)
+
 
 # takes in dummy var so this can also be used as a `worker_init_fn`
 def set_faulthander_if_available(_=None):
@@ -727,6 +779,22 @@ class BulkLoadingDataset(Dataset):
         return self.length
 
 
+class CountingGetItemsDataset(Dataset):
+    def __init__(self, length):
+        self.length = length
+        self.num_getitems_calls = 0
+
+    def __getitem__(self, idx):
+        raise RuntimeError("__getitem__ should not be called when __getitems__ is available")
+
+    def __getitems__(self, indices):
+        self.num_getitems_calls += 1
+        return [torch.tensor(idx) for idx in indices]
+
+    def __len__(self):
+        return self.length
+
+
 class BulkLoadingSampler(torch.utils.data.Sampler):
     def __init__(self, dataset, batch_size):
         self.dataset = dataset
@@ -845,7 +913,7 @@ except RuntimeError as e:
 
     def test_invalid_assign_after_init(self):
         dl = DataLoader(self.dataset)
-        for attr in ('batch_size', 'sampler', 'batch_sampler', 'drop_last', 'dataset'):
+        for attr in ('batch_size', 'sampler', 'batch_sampler', 'drop_last', 'dataset', 'persistent_workers'):
             def fn():
                 setattr(dl, attr, {})
 
@@ -871,6 +939,19 @@ except RuntimeError as e:
             self.assertEqual(samples[0].is_pinned(), TEST_CUDA)
             self.assertEqual(set(torch.cat(samples, 0).tolist()), set(range(n)))
 
+    def test_getitems(self):
+        n = 35
+        ds = CountingGetItemsDataset(n)
+        dl = DataLoader(ds, batch_size=4)
+        samples = list(dl)
+        self.assertEqual(len(samples), 9)
+        self.assertEqual(ds.num_getitems_calls, 9)
+        self.assertEqual(torch.cat(samples, 0), torch.arange(n))
+
+        for num_workers in [0, 4]:
+            dl = DataLoader(self.dataset, batch_size=5, num_workers=num_workers)
+            self._test_sequential(dl)
+
     def test_growing_dataset(self):
         dataset = [torch.ones(4) for _ in range(4)]
         dataloader_seq = DataLoader(dataset, shuffle=False)
@@ -1233,6 +1314,73 @@ except RuntimeError as e:
     def test_seqential_batch_workers(self):
         self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4))
 
+    def test_prefetch_factor(self):
+        for prefetch_factor in [1, 3, 10]:
+            self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4,
+                                             prefetch_factor=prefetch_factor))
+        with self.assertRaisesRegex(ValueError, "prefetch_factor option could only be specified in multiprocessing"):
+            DataLoader(self.dataset, prefetch_factor=3)
+        with self.assertRaisesRegex(ValueError, "prefetch_factor option should be positive"):
+            DataLoader(self.dataset, num_workers=2, prefetch_factor=0)
+
+    def test_persistent_workers(self):
+        with self.assertRaisesRegex(ValueError, "persistent_workers option needs num_workers > 0"):
+            DataLoader(self.dataset, persistent_workers=True)
+
+        dl = DataLoader(self.dataset, batch_size=2, num_workers=4, persistent_workers=True)
+        for _ in range(3):
+            self._test_sequential(dl)
+        it = dl._iterator
+        worker_pids = [w.pid for w in it._workers]
+        # abandon an epoch halfway, the next one should start from scratch
+        for i, _ in enumerate(dl):
+            if i == 3:
+                break
+        self._test_sequential(dl)
+        self.assertIs(dl._iterator, it)
+        self.assertEqual([w.pid for w in it._workers], worker_pids)
+        self.assertTrue(all(w.is_alive() for w in it._workers))
+        del dl, it
+
+    def test_ring_buffer(self):
+        with self.assertRaisesRegex(ValueError, "ring_buffer_slot_size option needs num_workers > 0"):
+            DataLoader(self.dataset, ring_buffer_slot_size=1024)
+        # 2 samples of 2 * 3 * 5 floats plus 2 labels fit into a 1 KB slot; a
+        # 16 B slot is too small for any batch, which are sent via the queue.
+        for slot_size in [1024, 16]:
+            self._test_sequential(DataLoader(self.dataset, batch_size=2, num_workers=4,
+                                             ring_buffer_slot_size=slot_size))
+            self._test_shuffle(DataLoader(self.dataset, batch_size=2, shuffle=True, num_workers=4,
+                                          ring_buffer_slot_size=slot_size))
+
+    def test_ring_buffer_put_get(self):
+        ring_buffer = _utils.ring_buffer.SharedMemoryRingBuffer(2, 1024)
+        data = {'a': torch.randn(3, 4).t(), 'b': [torch.arange(5), 'str', 1], 'c': (torch.tensor(True),)}
+        batch = ring_buffer.put(data, 0)
+        self.assertIsInstance(batch, _utils.ring_buffer._RingBufferBatch)
+        self.assertIsInstance(ring_buffer.put(data, 0), _utils.ring_buffer._RingBufferBatch)
+        # both slots are in use
+        self.assertIs(ring_buffer.put(data, 0), data)
+        result = ring_buffer.get(batch)
+        self.assertEqual(result['a'], data['a'])
+        self.assertEqual(result['b'][0], data['b'][0])
+        self.assertEqual(result['b'][1:], ['str', 1])
+        self.assertEqual(result['c'][0], data['c'][0])
+        self.assertIsInstance(result['c'], tuple)
+        # released slot can be reused
+        self.assertIsInstance(ring_buffer.put(data, 0), _utils.ring_buffer._RingBufferBatch)
+        # too large
+        large = torch.randn(1024)
+        self.assertIs(ring_buffer.put(large, 0), large)
+
+    def test_persistent_workers_iterable_dataset(self):
+        num_workers = 3
+        ds = CountingIterableDataset(20)
+        dl = DataLoader(ds, batch_size=None, num_workers=num_workers, persistent_workers=True)
+        for _ in range(3):
+            # every worker replica yields the whole range once per epoch
+            self.assertEqual(sorted(list(dl)), sorted(list(range(20)) * num_workers))
+
     def test_shuffle_workers(self):
         self._test_shuffle(DataLoader(self.dataset, shuffle=True, num_workers=4))
 
@@ -1312,6 +1460,100 @@ except RuntimeError as e:
 
         self.assertEqual(scanned_data.size(), scanned_data.unique().size())
 
+    def test_distributed_sampler(self):
+        from torch.utils.data.distributed import DistributedSampler
+
+        num_processes = 4
+        data_set = list(range(103))
+        for shuffle, lazy_shuffle in [(False, False), (True, False), (True, True)]:
+            def indices(rank, epoch, start_index=0, seed=0):
+                s = DistributedSampler(data_set, num_processes, rank, shuffle=shuffle,
+                                       seed=seed, lazy_shuffle=lazy_shuffle)
+                s.set_epoch(epoch, start_index)
+                self.assertEqual(len(s), s.num_samples - start_index)
+                return list(s)
+
+            for epoch in range(2):
+                all_indices = [indices(rank, epoch) for rank in range(num_processes)]
+                # Every sample is used, and replicas get the same number of indices
+                self.assertEqual(sorted(set(sum(all_indices, []))), data_set)
+                for rank in range(num_processes):
+                    self.assertEqual(len(all_indices[rank]), 26)
+                    # Deterministic for a given seed and epoch
+                    self.assertEqual(indices(rank, epoch), all_indices[rank])
+                    # Resuming yields the rest of the epoch
+                    self.assertEqual(indices(rank, epoch, start_index=10), all_indices[rank][10:])
+                    self.assertEqual(indices(rank, epoch, start_index=26), [])
+                if not shuffle:
+                    self.assertEqual(all_indices[0][:3], [0, 4, 8])
+                    self.assertEqual(all_indices[3][-1], 0)
+            if shuffle:
+                self.assertNotEqual(indices(0, 0), indices(0, 1))
+                self.assertNotEqual(indices(0, 0), indices(0, 0, seed=1))
+                self.assertEqual(indices(0, 1), indices(0, 0, seed=1))
+
+        s = DistributedSampler(data_set, num_processes, 0)
+        with self.assertRaisesRegex(ValueError, "start_index"):
+            s.set_epoch(0, start_index=27)
+
+    def test_dynamic_weighted_random_sampler(self):
+        from torch.utils.data import DynamicWeightedRandomSampler
+
+        # With replacement, indices are drawn according to their weights
+        s = DynamicWeightedRandomSampler([0., 1., 0., 3.], 1000, chunk_size=64)
+        indices = list(s)
+        self.assertEqual(len(indices), len(s))
+        self.assertEqual(set(indices), {1, 3})
+        self.assertGreater(indices.count(3), indices.count(1))
+        self.assertEqual(list(s), indices)
+        s.set_epoch(1)
+        self.assertNotEqual(list(s), indices)
+
+        s.update_weights([1, 2], [0., 2.])
+        self.assertEqual(set(s), {2, 3})
+
+        # Without replacement, every index is drawn once, and weights are
+        # restored at the end of each iteration.
+        weights = [float(i + 1) for i in range(20)]
+        s = DynamicWeightedRandomSampler(weights, 20, replacement=False, chunk_size=3)
+        for _ in range(2):
+            self.assertEqual(sorted(s), list(range(20)))
+        s.update_weights([5], [0.])
+        with self.assertRaisesRegex(RuntimeError, "not enough samples"):
+            list(s)
+        s = DynamicWeightedRandomSampler(weights, 19, replacement=False, chunk_size=3)
+        s.update_weights([5], [0.])
+        self.assertEqual(sorted(s), [i for i in range(20) if i != 5])
+
+        # Updates of indices already drawn take effect after the iteration
+        it = iter(s)
+        first = next(it)
+        s.update_weights([first], [0.])
+        rest = list(it)
+        self.assertNotIn(first, rest)
+        self.assertEqual(len(set(rest)), 18)
+        # Only 18 indices have a non-zero weight now
+        with self.assertRaisesRegex(RuntimeError, "not enough samples"):
+            list(s)
+
+        # Sharding across replicas
+        shards = [
+            list(DynamicWeightedRandomSampler(weights, 18, replacement=False, num_replicas=3,
+                                              rank=rank, chunk_size=4))
+            for rank in range(3)]
+        for rank, shard in enumerate(shards):
+            self.assertEqual(len(shard), 6)
+            self.assertTrue(all(i % 3 == rank for i in shard))
+        self.assertEqual(len(set(sum(shards, []))), 18)
+
+        # The tree is not padded to a power of two
+        s = DynamicWeightedRandomSampler(weights[:13], 5)
+        self.assertEqual(s._weights.numel() + s._sums.numel(), 26)
+        self.assertEqual(set(DynamicWeightedRandomSampler([2.], 5)), {0})
+
+        with self.assertRaisesRegex(ValueError, "non-negative"):
+            DynamicWeightedRandomSampler([1., -1.], 1)
+
     def _test_sampler(self, **kwargs):
         indices = range(2, 12)  # using a regular iterable
         dl = DataLoader(self.dataset, sampler=indices, batch_size=2, **kwargs)
@@ -236,6 +236,73 @@ class TestOptim(TestCase):
             scheduler_constructors
         )
 
+    def _test_foreach_matches_single_tensor(self, constructor, device='cpu'):
+        # The multi-tensor implementation should give exactly the same results
+        # as the per-parameter one, including the optimizer state.
+        def make_params():
+            torch.manual_seed(0)
+            return [torch.randn(10, 5, device=device, requires_grad=True),
+                    torch.randn(10, device=device, requires_grad=True),
+                    torch.randn(4, 3, 2, device=device)[..., 0].requires_grad_(),
+                    torch.randn(3, device=device, dtype=torch.double, requires_grad=True)]
+
+        params = make_params()
+        params_foreach = make_params()
+        optimizer = constructor(params, False)
+        optimizer_foreach = constructor(params_foreach, True)
+        for i in range(20):
+            for p, p_foreach in zip(params, params_foreach):
+                # leave one parameter without gradient every few steps
+                if i % 3 == 1 and p.dim() == 1:
+                    p.grad = p_foreach.grad = None
+                    continue
+                grad = torch.randn_like(p)
+                p.grad = grad.clone()
+                p_foreach.grad = grad.clone()
+            optimizer.step()
+            optimizer_foreach.step()
+            self.assertEqual(params, params_foreach, atol=0, rtol=0)
+            if i == 10:
+                # state should still be saved and loaded per parameter
+                optimizer_foreach.load_state_dict(deepcopy(optimizer_foreach.state_dict()))
+        self.assertEqual(optimizer.state_dict()['state'], optimizer_foreach.state_dict()['state'], atol=0, rtol=0)
+
+    def _test_flatten_parameters(self, constructor):
+        def make_model():
+            torch.manual_seed(0)
+            return torch.nn.Sequential(torch.nn.Linear(5, 10), torch.nn.ReLU(), torch.nn.Linear(10, 3))
+
+        model = make_model()
+        model_flat = make_model()
+        optimizer = constructor(model.parameters())
+        optimizer_flat = constructor(model_flat.parameters())
+        optimizer_flat.flatten_parameters()
+        params_flat = list(model_flat.parameters())
+        self.assertEqual(len(set(p.storage().data_ptr() for p in params_flat)), 1)
+        self.assertEqual(list(model.parameters()), params_flat, atol=0, rtol=0)
+
+        for i in range(10):
+            input = torch.randn(4, 5)
+            for m, opt in [(model, optimizer), (model_flat, optimizer_flat)]:
+                opt.zero_grad()
+                m(input).sum().backward()
+                opt.step()
+            self.assertEqual(list(model.parameters()), params_flat, atol=0, rtol=0)
+            if i == 5:
+                optimizer_flat.load_state_dict(deepcopy(optimizer_flat.state_dict()))
+        # parameters and gradients are still views into one buffer each
+        self.assertEqual(len(set(p.storage().data_ptr() for p in params_flat)), 1)
+        self.assertEqual(len(set(p.grad.storage().data_ptr() for p in params_flat)), 1)
+        self.assertEqual(optimizer.state_dict()['state'], optimizer_flat.state_dict()['state'], atol=0, rtol=0)
+
+    def test_flatten_parameters(self):
+        self._test_flatten_parameters(lambda params: optim.SGD(params, lr=1e-2, momentum=0.9, weight_decay=0.1))
+        self._test_flatten_parameters(lambda params: optim.Adam(params, lr=1e-2, amsgrad=True))
+        self._test_flatten_parameters(lambda params: optim.AdamW(params, lr=1e-2))
+        self._test_flatten_parameters(lambda params: optim.RMSprop(params, lr=1e-2, momentum=0.9))
+        # optimizers without a multi-tensor implementation still work on the views
+        self._test_flatten_parameters(lambda params: optim.Adagrad(params, lr=1e-2))
+
     def _build_params_dict(self, weight, bias, **kwargs):
         return [{'params': [weight]}, dict(params=[bias], **kwargs)]
 
@@ -275,9 +342,18 @@ class TestOptim(TestCase):
              lambda opt: ExponentialLR(opt, gamma=0.99),
              lambda opt: ReduceLROnPlateau(opt)]
         )
+        self._test_basic_cases(
+            lambda weight, bias: optim.SGD([weight, bias], lr=1e-3, momentum=0.9, foreach=True)
+        )
         with self.assertRaisesRegex(ValueError, "Invalid momentum value: -0.5"):
             optim.SGD(None, lr=1e-2, momentum=-0.5)
 
+    def test_sgd_foreach(self):
+        for kwargs in [dict(), dict(weight_decay=0.1), dict(momentum=0.9, dampening=0.1),
+                       dict(momentum=0.9, nesterov=True, weight_decay=0.1)]:
+            self._test_foreach_matches_single_tensor(
+                lambda params, foreach: optim.SGD(params, lr=1e-2, foreach=foreach, **kwargs))
+
     def test_sgd_sparse(self):
         self._test_rosenbrock_sparse(
             lambda params: optim.SGD(params, lr=5e-3)
@@ -286,6 +362,9 @@ class TestOptim(TestCase):
             lambda params: optim.SGD(params, lr=0.005),
             [lambda opt: StepLR(opt, gamma=0.99999, step_size=300)]
         )
+        self._test_rosenbrock_sparse(
+            lambda params: optim.SGD(params, lr=5e-3, foreach=True)
+        )
 
     def test_adam(self):
         self._test_basic_cases(
@@ -327,9 +406,17 @@ class TestOptim(TestCase):
         with self.assertRaisesRegex(ValueError, "Invalid beta parameter at index 0: 1.0"):
             optim.Adam(None, lr=1e-2, betas=(1.0, 0.0))
 
+        self._test_basic_cases(
+            lambda weight, bias: optim.Adam([weight, bias], lr=1e-3, amsgrad=True, foreach=True)
+        )
         with self.assertRaisesRegex(ValueError, "Invalid weight_decay value: -1"):
             optim.Adam(None, lr=1e-2, weight_decay=-1)
 
+    def test_adam_foreach(self):
+        for kwargs in [dict(), dict(weight_decay=0.1), dict(amsgrad=True)]:
+            self._test_foreach_matches_single_tensor(
+                lambda params, foreach: optim.Adam(params, lr=1e-2, foreach=foreach, **kwargs))
+
     def test_adamw(self):
         self._test_basic_cases(
             lambda weight, bias: optim.AdamW([weight, bias], lr=1e-3)
@@ -340,9 +427,17 @@ class TestOptim(TestCase):
                 lr=1e-3)
         )
 
+        self._test_basic_cases(
+            lambda weight, bias: optim.AdamW([weight, bias], lr=1e-3, foreach=True)
+        )
         with self.assertRaisesRegex(ValueError, "Invalid weight_decay value: -1"):
             optim.AdamW(None, lr=1e-2, weight_decay=-1)
 
+    def test_adamw_foreach(self):
+        for kwargs in [dict(), dict(amsgrad=True)]:
+            self._test_foreach_matches_single_tensor(
+                lambda params, foreach: optim.AdamW(params, lr=1e-2, foreach=foreach, **kwargs))
+
     def test_sparse_adam(self):
         self._test_rosenbrock_sparse(
             lambda params: optim.SparseAdam(params, lr=4e-2),
@@ -431,9 +526,17 @@ class TestOptim(TestCase):
                 self._build_params_dict(weight, bias, lr=1e-3),
                 lr=1e-2)
         )
+        self._test_basic_cases(
+            lambda weight, bias: optim.RMSprop([weight, bias], lr=1e-2, foreach=True)
+        )
         with self.assertRaisesRegex(ValueError, "Invalid momentum value: -1.0"):
             optim.RMSprop(None, lr=1e-2, momentum=-1.0)
 
+    def test_rmsprop_foreach(self):
+        for kwargs in [dict(), dict(weight_decay=0.1), dict(momentum=0.9, centered=True)]:
+            self._test_foreach_matches_single_tensor(
+                lambda params, foreach: optim.RMSprop(params, lr=1e-2, foreach=foreach, **kwargs))
+
     def test_asgd(self):
         self._test_basic_cases(
             lambda weight, bias: optim.ASGD([weight, bias], lr=1e-3, t0=100)
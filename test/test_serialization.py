@@ -16,7 +16,7 @@ from torch._utils import _rebuild_tensor
 from torch.serialization import check_module_version_greater_or_equal
 
 from torch.testing._internal.common_utils import TestCase, IS_WINDOWS, \
-    TEST_DILL, run_tests, download_file, BytesIOContext
+    TEST_DILL, TEST_NUMPY, run_tests, download_file, BytesIOContext
 
 # These tests were all copied from `test/test_torch.py` at some point, so see
 # the actual blame, see this revision
@@ -614,6 +614,14 @@ class TestOldSerialization(TestCase, SerializationMixin):
         self.assertEqual(i, i_loaded)
         self.assertEqual(j, j_loaded)
 
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_mmap_legacy_format(self):
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(torch.randn(3), f)
+            f.flush()
+            with self.assertRaisesRegex(RuntimeError, "mmap can only be used"):
+                torch.load(f.name, mmap=True)
+
     def test_serialization_offset_filelike(self):
         a = torch.randn(5, 5)
         b = torch.randn(1024, 1024, 512, dtype=torch.float32)
@@ -660,6 +668,85 @@ class TestSerialization(TestCase, SerializationMixin):
 
         test(io.BytesIO())
 
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_async_save(self):
+        data = self._test_serialization_data()
+        expected = copy.deepcopy(data)
+
+        def test(name_or_buffer):
+            handle = torch.serialization.async_save(data, name_or_buffer, num_threads=2)
+            # The checkpoint is a snapshot taken before returning
+            data[0].fill_(0)
+            data[1].zero_()
+            self.assertIsNone(handle.result())
+
+            if hasattr(name_or_buffer, 'seek'):
+                name_or_buffer.seek(0)
+            self.assertEqual(torch.load(name_or_buffer), expected)
+            data[0].copy_(expected[0])
+            data[1].copy_(expected[1])
+
+        with tempfile.NamedTemporaryFile() as f:
+            test(f.name)
+        test(io.BytesIO())
+
+        with self.assertRaisesRegex(ValueError, "num_threads"):
+            torch.serialization.async_save(data, io.BytesIO(), num_threads=0)
+
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_checksum(self):
+        with tempfile.NamedTemporaryFile() as f:
+            torch.serialization.async_save(torch.arange(1000.), f.name).result()
+            with open(f.name, 'r+b') as opened_file:
+                offsets = torch.serialization._get_record_offsets(opened_file)
+                offset, _ = next(offsets[name] for name in offsets if name.startswith('data/'))
+                # Corrupt the tensor data
+                opened_file.seek(offset + 100)
+                opened_file.write(b'\xff' * 8)
+            with self.assertRaisesRegex(RuntimeError, "Checksum mismatch"):
+                torch.load(f.name)
+
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    @unittest.skipIf(not TEST_NUMPY, "numpy not found")
+    def test_serialization_mmap(self):
+        data = {
+            'a': torch.randn(5, 3),
+            'b': torch.arange(10, dtype=torch.int64),
+            'c': torch.tensor([True, False, True]),
+            'd': torch.randn(4, dtype=torch.bfloat16),
+            'e': torch.empty(0),
+        }
+        data['a_view'] = data['a'][1:3]
+
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(data, f)
+            f.flush()
+
+            def test(name_or_file):
+                result = torch.load(name_or_file, mmap=True)
+                self.assertEqual(result, data)
+                # Views keep sharing their storage
+                self.assertEqual(result['a_view'].storage().data_ptr(), result['a'].storage().data_ptr())
+                result['a'].add_(1)
+                self.assertEqual(result['a_view'], data['a_view'] + 1)
+
+            test(f.name)
+            with open(f.name, 'rb') as opened_file:
+                test(opened_file)
+
+            # Writes are not propagated to the file
+            self.assertEqual(torch.load(f.name, mmap=True), data)
+            self.assertEqual(torch.load(f.name), data)
+
+            result = torch.load(f.name, mmap=True, map_location=lambda storage, loc: storage.clone())
+            self.assertEqual(result, data)
+
+        with self.assertRaisesRegex(RuntimeError, "real file"):
+            buf = io.BytesIO()
+            torch.save(data, buf)
+            buf.seek(0)
+            torch.load(buf, mmap=True)
+
     def run(self, *args, **kwargs):
         with serialization_method(use_zip=True):
             return super(TestSerialization, self).run(*args, **kwargs)
@@ -58,10 +58,10 @@ class BaseTestCase(TestCase):
             return self.skipTest("Skip the test since TensorBoard is not installed")
         self.temp_dirs = []
 
-    def createSummaryWriter(self):
+    def createSummaryWriter(self, **kwargs):
         temp_dir = str(uuid.uuid4())
         self.temp_dirs.append(temp_dir)
-        return SummaryWriter(temp_dir)
+        return SummaryWriter(temp_dir, **kwargs)
 
     def tearDown(self):
         super(BaseTestCase, self).tearDown()
@@ -115,6 +115,8 @@ class TestTensorBoardPyTorchNumpy(BaseTestCase):
         with self.createSummaryWriter() as w:
             w.add_histogram('float histogram', torch.rand((50,)))
             w.add_histogram('int histogram', torch.randint(0, 100, (50,)))
+            w.add_histograms({'float': torch.rand((50,)), 'int': torch.randint(0, 100, (50,))},
+                             percentiles=[50, 99])
 
     def test_pytorch_histogram_raw(self):
         with self.createSummaryWriter() as w:
@@ -282,6 +284,42 @@ class TestTensorBoardSummaryWriter(BaseTestCase):
 
         self.assertTrue(passed)
 
+    def test_async_summaries(self):
+        from tensorboard.backend.event_processing.event_file_loader import EventFileLoader
+        x = torch.arange(10, dtype=torch.float)
+        with self.createSummaryWriter(async_summaries=True, max_pending_summaries=2) as writer:
+            writer.add_scalar('scalar', torch.tensor(1.5), 0)
+            writer.add_histogram('hist', x, 0)
+            # The histogram is built from a snapshot of x
+            x.mul_(2)
+            writer.add_histogram('hist', x, 1)
+            writer.add_image('image', torch.zeros(3, 4, 4), 1)
+            writer.flush()
+            self.assertEqual(writer.num_dropped_summaries, 0)
+            log_dir = writer.get_logdir()
+
+        values = {}
+        for filename in os.listdir(log_dir):
+            for event in EventFileLoader(os.path.join(log_dir, filename)).Load():
+                for value in event.summary.value:
+                    values[(event.step, value.tag)] = value
+        self.assertEqual(values[(0, 'scalar')].simple_value, 1.5)
+        self.assertEqual(values[(0, 'hist')].histo.max, 9)
+        self.assertEqual(values[(1, 'hist')].histo.max, 18)
+        self.assertEqual(values[(1, 'image')].image.width, 4)
+
+    def test_async_summaries_errors(self):
+        with self.assertRaises(ValueError):
+            self.createSummaryWriter(async_summaries=True, queue_full_policy='wait')
+
+        writer = self.createSummaryWriter(async_summaries=True)
+        # The error of building the summary is raised by flush
+        writer.add_image('image', np.zeros((3, 4, 4)), dataformats='HW')
+        with self.assertRaises(AssertionError):
+            writer.flush()
+        writer.add_scalar('scalar', 1.0)
+        writer.close()
+
     def test_pathlib(self):
         import pathlib
         p = pathlib.Path('./pathlibtest' + str(uuid.uuid4()))
@@ -410,6 +448,35 @@ class TestTensorBoardSummary(BaseTestCase):
     def test_histogram_doane(self):
         self.assertTrue(compare_proto(summary.histogram('dummy', tensor_N(shape=(1024,)), bins='doane', max_bins=5), self))
 
+    def test_histogram_torch(self):
+        values = torch.arange(-50, 50, dtype=torch.float) / 10
+        for bins in [10, [-3.0, -1.0, 0.0, 0.5, 1.0, 3.0]]:
+            hist = summary.histogram('dummy', values, bins).value[0].histo
+            ref_hist = summary.histogram('dummy', values.numpy(), bins).value[0].histo
+            self.assertEqual(hist.min, ref_hist.min)
+            self.assertEqual(hist.max, ref_hist.max)
+            self.assertEqual(hist.num, ref_hist.num)
+            self.assertAlmostEqual(hist.sum, ref_hist.sum, places=4)
+            self.assertAlmostEqual(hist.sum_squares, ref_hist.sum_squares, places=4)
+            self.assertEqual(list(hist.bucket), list(ref_hist.bucket))
+            self.assertEqual(torch.tensor(hist.bucket_limit), torch.tensor(ref_hist.bucket_limit))
+
+    def test_histograms_percentiles(self):
+        values = torch.arange(101, dtype=torch.float)
+        s = summary.histograms({'tensor': values, 'array': values.numpy()}, 10, percentiles=[25, 50, 99.5])
+        summary_values = {value.tag: value for value in s.value}
+        self.assertEqual([value.tag for value in s.value][:7], [
+            'tensor', 'tensor/min', 'tensor/max', 'tensor/mean', 'tensor/std', 'tensor/p25', 'tensor/p50'])
+        for name in ['tensor', 'array']:
+            self.assertEqual(summary_values[name].histo.num, 101)
+            self.assertEqual(summary_values[name + '/min'].simple_value, 0)
+            self.assertEqual(summary_values[name + '/max'].simple_value, 100)
+            self.assertAlmostEqual(summary_values[name + '/mean'].simple_value, 50, places=4)
+            self.assertAlmostEqual(summary_values[name + '/std'].simple_value, np.std(values.numpy()), places=4)
+            self.assertAlmostEqual(summary_values[name + '/p25'].simple_value, 25, places=4)
+            self.assertAlmostEqual(summary_values[name + '/p50'].simple_value, 50, places=4)
+            self.assertAlmostEqual(summary_values[name + '/p99.5'].simple_value, 99.5, places=4)
+
     def test_custom_scalars(self):
         layout = {
             'Taiwan': {
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import json
 import torch
 import tempfile
 from torch.utils import ThroughputBenchmark
@@ -80,6 +81,52 @@ class TestThroughputBenchmark(TestCase):
         with tempfile.NamedTemporaryFile(delete=False) as f:
             self.linear_test(TwoLayerNetModule, profiler_output_path=f.name)
 
+    def processes_test(self, Module):
+        module = Module(10, 5, 15)
+        bench = ThroughputBenchmark(module)
+        for _ in range(2):
+            bench.add_input(torch.randn(8, 10), x2=torch.randn(8, 10))
+
+        stats = bench.benchmark_processes(
+            num_processes=2,
+            num_calling_threads=2,
+            num_warmup_iters=10,
+            num_iters=101,
+        )
+        print(stats)
+
+        self.assertEqual(stats.num_iters, 101)
+        percentiles = [stats.latency_percentile_ms(p) for p in (0, 50, 90, 99, 100)]
+        self.assertEqual(percentiles, sorted(percentiles))
+        edges, counts = stats.latency_histogram(num_bins=10)
+        self.assertEqual(len(edges), 11)
+        self.assertEqual(sum(counts), 101)
+        self.assertAlmostEqual(sum(stats.iters_per_second_over_time(0.01)) * 0.01, 101)
+
+        with tempfile.NamedTemporaryFile(mode="w+") as f:
+            stats.save_report(f.name)
+            report = json.load(f)
+        self.assertEqual(report['num_iters'], 101)
+        self.assertEqual(report['config']['num_processes'], 2)
+        self.assertEqual(sorted(report['latency_percentiles_ms'].keys()), ['50', '90', '99', '99.9'])
+
+    def test_script_module_processes(self):
+        self.processes_test(TwoLayerNet)
+
+    def test_module_processes(self):
+        self.processes_test(TwoLayerNetModule)
+
+    def test_processes_errors(self):
+        bench = ThroughputBenchmark(TwoLayerNetModule(10, 5, 15))
+        with self.assertRaisesRegex(RuntimeError, "add_input"):
+            bench.benchmark_processes()
+        bench.add_input(torch.randn(8, 3), torch.randn(8, 3))
+        with self.assertRaisesRegex(ValueError, "cpu_affinity"):
+            bench.benchmark_processes(num_processes=2, cpu_affinity=[[0]])
+        # Errors in the benchmark processes are re-raised
+        with self.assertRaisesRegex(RuntimeError, "benchmark process"):
+            bench.benchmark_processes(num_processes=2)
+
 
 if __name__ == '__main__':
     run_tests()
@@ -5,16 +5,27 @@ import re
 import shutil
 import random
 import tempfile
+import threading
 import unittest
+import hashlib
+import zipfile
+import io
+import socket
+import socketserver
+import subprocess
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
 import torch
 import torch.nn as nn
 import torch.utils.data
 import torch.cuda
 from torch.utils.checkpoint import checkpoint, checkpoint_sequential
 import torch.hub as hub
+from torch.utils.file_baton import FileBaton
 from torch.autograd._functions.utils import check_onnx_broadcast
 from torch.onnx.symbolic_opset9 import _prepare_onnx_paddings
-from torch.testing._internal.common_utils import skipIfRocm, load_tests, retry, IS_SANDCASTLE
+from torch.testing._internal.common_utils import skipIfRocm, load_tests, retry, IS_SANDCASTLE, IS_WINDOWS, TEST_NUMPY
 from urllib.error import HTTPError
 
 # load_tests from torch.testing._internal.common_utils is used to automatically filter tests for
@@ -574,6 +585,199 @@ class TestHub(TestCase):
             self.assertEqual(torch.hub._get_torch_home(), dirname)
 
 
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    # Serves `data` at any path, supporting single range requests. The first
+    # `num_truncated` responses are cut off after half of their body.
+    data = b''
+    num_truncated = 0
+
+    def do_GET(self):
+        start, end = 0, len(self.data)
+        range_header = self.headers.get('Range')
+        if range_header is not None:
+            match = re.match(r'bytes=(\d+)-(\d*)', range_header)
+            start = int(match.group(1))
+            if match.group(2):
+                end = int(match.group(2)) + 1
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end - 1, len(self.data)))
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+        body = self.data[start:end]
+        if _RangeRequestHandler.num_truncated > 0:
+            _RangeRequestHandler.num_truncated -= 1
+            body = body[:len(body) // 2]
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestHubDownload(TestCase):
+    def setUp(self):
+        buffer = io.BytesIO()
+        torch.save({'weight': torch.arange(20000.)}, buffer)
+        _RangeRequestHandler.data = buffer.getvalue()
+        _RangeRequestHandler.num_truncated = 0
+        self.digest = hashlib.sha256(_RangeRequestHandler.data).hexdigest()
+        self.server = _ThreadingHTTPServer(('localhost', 0), _RangeRequestHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+        self.url = 'http://localhost:{}/weights-{}.pt'.format(self.server.server_address[1], self.digest[:8])
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        shutil.rmtree(self.temp_dir)
+
+    @mock.patch.object(hub, 'DOWNLOAD_CHUNK_SIZE', 4096)
+    def test_download_url_to_file(self):
+        dst = os.path.join(self.temp_dir, 'weights')
+        for num_workers in [1, 4]:
+            for num_truncated in [0, 2]:
+                _RangeRequestHandler.num_truncated = num_truncated
+                hub.download_url_to_file(self.url, dst, self.digest[:8], progress=False,
+                                         num_workers=num_workers)
+                with open(dst, 'rb') as f:
+                    self.assertEqual(f.read(), _RangeRequestHandler.data)
+                os.remove(dst)
+
+        with self.assertRaisesRegex(RuntimeError, 'invalid hash value'):
+            hub.download_url_to_file(self.url, dst, 'deadbeef', progress=False, num_workers=4)
+        _RangeRequestHandler.num_truncated = 10
+        with self.assertRaisesRegex(IOError, 'connection closed'):
+            hub.download_url_to_file(self.url, dst, progress=False, max_retries=2)
+        # No partial or temporary files are left behind
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    @mock.patch.object(hub, 'DOWNLOAD_CHUNK_SIZE', 4096)
+    def test_load_state_dict_from_url(self):
+        for _ in range(2):
+            state_dict = hub.load_state_dict_from_url(
+                self.url, model_dir=self.temp_dir, progress=False, check_hash=True, num_workers=4)
+            self.assertEqual(state_dict['weight'], torch.arange(20000.))
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(self.url)])
+
+    @unittest.skipIf(IS_WINDOWS, "process IDs are not checked on Windows")
+    def test_load_state_dict_from_url_stale_lock(self):
+        # A lock left behind by a process killed while downloading
+        p = subprocess.Popen([sys.executable, '-c', 'pass'])
+        p.wait()
+        lock_file = os.path.join(self.temp_dir, os.path.basename(self.url) + '.lock')
+        with open(lock_file, 'w') as f:
+            f.write('{} {}'.format(socket.gethostname(), p.pid))
+        state_dict = hub.load_state_dict_from_url(self.url, model_dir=self.temp_dir, progress=False)
+        self.assertEqual(state_dict['weight'], torch.arange(20000.))
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(self.url)])
+
+        # Locks of other hosts are stale once they have not been modified for a while
+        baton = FileBaton(lock_file, stale_seconds=60)
+        with open(lock_file, 'w') as f:
+            f.write('other-host {}'.format(os.getpid()))
+        self.assertFalse(baton._remove_if_stale())
+        os.utime(lock_file, (time.time() - 120, time.time() - 120))
+        baton.wait()
+        self.assertFalse(os.path.exists(lock_file))
+
+    @unittest.skipIf(not TEST_NUMPY, "numpy not found")
+    def test_load_state_dict_from_url_mmap(self):
+        buffer = io.BytesIO()
+        torch.save({'weight': torch.arange(20000.)}, buffer, _use_new_zipfile_serialization=True)
+        _RangeRequestHandler.data = buffer.getvalue()
+        with mock.patch.object(torch, 'load', wraps=torch.load) as load:
+            state_dict = hub.load_state_dict_from_url(self.url, model_dir=self.temp_dir, progress=False)
+            self.assertFalse(load.call_args[1]['mmap'])
+            self.assertEqual(state_dict['weight'], torch.arange(20000.))
+            # zipfile checkpoints are mapped from the cached file, not extracted
+            state_dict = hub.load_state_dict_from_url(self.url, model_dir=self.temp_dir, progress=False,
+                                                      mmap=True)
+            self.assertTrue(load.call_args[1]['mmap'])
+        self.assertEqual(state_dict['weight'], torch.arange(20000.))
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(self.url)])
+
+
+class TestHubCache(TestCase):
+    def setUp(self):
+        self.hub_dir = tempfile.mkdtemp()
+        self.old_hub_dir = hub.hub_dir
+        hub.set_dir(self.hub_dir)
+        self.commit_hash = 'a' * 40
+        self.num_downloads = 0
+        self.downloads_lock = threading.Lock()
+
+    def tearDown(self):
+        hub.set_dir(self.old_hub_dir)
+        shutil.rmtree(self.hub_dir)
+
+    def _get_commit_hash(self, repo_owner, repo_name, branch):
+        return self.commit_hash
+
+    def _download_url_to_file(self, url, dst, hash_prefix=None, progress=True):
+        with self.downloads_lock:
+            self.num_downloads += 1
+        # Github archives hold the repo in a folder named after the branch
+        with zipfile.ZipFile(dst, 'w') as f:
+            f.writestr('repo-master/hubconf.py',
+                       'dependencies = []\n\ndef commit():\n    return {!r}\n'.format(self.commit_hash))
+
+    def _load_commit(self, force_reload=False):
+        return hub.load('owner/repo', 'commit', force_reload=force_reload, verbose=False)
+
+    def test_cache_by_commit(self):
+        with mock.patch.object(hub, '_get_commit_hash', self._get_commit_hash), \
+                mock.patch.object(hub, 'download_url_to_file', self._download_url_to_file):
+            self.assertEqual(self._load_commit(), 'a' * 40)
+            self.assertEqual(self._load_commit(), 'a' * 40)
+            self.assertEqual(self._load_commit(force_reload=True), 'a' * 40)
+            self.assertEqual(self.num_downloads, 1)
+
+            self.commit_hash = 'b' * 40
+            old_repo_dir = os.path.join(self.hub_dir, 'owner_repo_master', 'a' * 40)
+            self.assertEqual(hub._get_cache_or_reload('owner/repo', False, False), old_repo_dir)
+            new_repo_dir = hub._get_cache_or_reload('owner/repo', True, False)
+            self.assertEqual(new_repo_dir, os.path.join(self.hub_dir, 'owner_repo_master', 'b' * 40))
+            self.assertEqual(self.num_downloads, 2)
+            # Older snapshots are left intact
+            self.assertTrue(os.path.exists(os.path.join(old_repo_dir, 'hubconf.py')))
+
+            # Concurrent reloads share one download
+            self.commit_hash = 'c' * 40
+            threads = [threading.Thread(target=hub._get_cache_or_reload, args=('owner/repo', True, False))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(self.num_downloads, 3)
+            self.assertEqual(hub._get_cache_or_reload('owner/repo', False, False),
+                             os.path.join(self.hub_dir, 'owner_repo_master', 'c' * 40))
+            # Snapshots older than the previous one are removed
+            self.assertFalse(os.path.exists(old_repo_dir))
+            self.assertFalse(os.path.exists(os.path.join(self.hub_dir, 'owner_repo_master.lock')))
+
+    @unittest.skipIf(IS_WINDOWS, "process IDs are not checked on Windows")
+    def test_cache_stale_lock(self):
+        # A lock left behind by a process killed while updating the cache
+        p = subprocess.Popen([sys.executable, '-c', 'pass'])
+        p.wait()
+        lock_file = os.path.join(self.hub_dir, 'owner_repo_master.lock')
+        with open(lock_file, 'w') as f:
+            f.write('{} {}'.format(socket.gethostname(), p.pid))
+        with mock.patch.object(hub, '_get_commit_hash', self._get_commit_hash), \
+                mock.patch.object(hub, 'download_url_to_file', self._download_url_to_file):
+            self.assertEqual(self._load_commit(), 'a' * 40)
+        self.assertFalse(os.path.exists(lock_file))
+
+
 class TestHipify(TestCase):
     def test_import_hipify(self):
         from torch.utils.hipify import hipify_python # noqa
@@ -1,8 +1,10 @@
+import gzip
 import itertools
+import json
 import torch
 
 from collections import defaultdict, namedtuple
-from operator import attrgetter
+from enum import Enum
 
 try:
     # Available in Python >= 3.2
@@ -45,43 +47,40 @@ class EventList(list):
         """
         if self.cpu_children_populated:
             return
-        events = sorted(
-            self,
-            key=attrgetter("thread"),
-        )
-        threads = itertools.groupby(events, key=attrgetter("thread"))
+        starts, ends, threads = _event_columns(self)
 
-        # For each thread we keep a stack of current nested parents.
+        # Sort the intervals of each thread by their start time, outermost
+        # first. For each thread we keep a stack of current nested parents.
         # We maintain the invariant that each interval is a subset of all other
         # intervals lower in the stack.
         #
-        # First we sort the intervals by their start time. Then we iterate over them.
-        # Every time we see a new interval we remove several parents from
-        # the top until we restore the invariant. Then parent child relationship
-        # if recorded if the stack is not empty.
-        # Finally we add new interval to the list
+        # Then we iterate over the intervals. Every time we see a new interval
+        # we remove several parents from the top until we restore the
+        # invariant. Then parent child relationship if recorded if the stack is
+        # not empty. Finally we add new interval to the list
         #
         # Algorithm has O(N * log(N)) complexity where N is number of
-        # intervals
-        for thread_id, thread_events in threads:
-            thread_events = sorted(
-                thread_events,
-                key=lambda event: [event.cpu_interval.start, -event.cpu_interval.end],
-            )
-            current_events = []
-            cur_end = 0
-            for event in thread_events:
-                while len(current_events) > 0:
-                    parent = current_events[-1]
-                    if event.cpu_interval.start >= parent.cpu_interval.end or \
-                            event.cpu_interval.end > parent.cpu_interval.end:
-                        # this can't be a parent
-                        current_events.pop()
-                    else:
-                        parent.append_cpu_child(event)
-                        break
-
-                current_events.append(event)
+        # intervals. It works on plain lists of the interval bounds rather than
+        # on the events, as attribute lookups dominate for large traces.
+        order = sorted(range(len(self)), key=lambda i: (threads[i], starts[i], -ends[i]))
+        current_events = []
+        current_thread = None
+        for i in order:
+            if threads[i] != current_thread:
+                current_thread = threads[i]
+                current_events = []
+            start = starts[i]
+            end = ends[i]
+            while len(current_events) > 0:
+                parent = current_events[-1]
+                if start >= ends[parent] or end > ends[parent]:
+                    # this can't be a parent
+                    current_events.pop()
+                else:
+                    self[parent].append_cpu_child(self[i])
+                    break
+
+            current_events.append(i)
 
         self._cpu_children_populated = True
 
@@ -114,58 +113,15 @@ class EventList(list):
         The checkpoint can be later loaded and inspected under ``chrome://tracing`` URL.
 
         Arguments:
-            path (str): Path where the trace will be written.
+            path (str): Path where the trace will be written. If it ends with
+                ``.gz``, the trace is gzip-compressed.
         """
-        import os
-        with open(path, 'w') as f:
-            chrome_events = []
-            next_id = 0
-            # Use file IO over using json.dump since JSON dumping is very slow and
-            # this technique is proven to give a 4x speedup.
-            f.write("[")
-            for evt in self:
-                f.write('{"name": "%s", '
-                        '"ph": "X", '
-                        '"ts": %s, '
-                        '"dur": %s, '
-                        '"tid": %s, '
-                        '"pid": "CPU functions", '
-                        '"args": {}}, ' % (evt.name, evt.cpu_interval.start,
-                                           evt.cpu_interval.elapsed_us(), evt.thread))
-                for k in evt.kernels:
-                    # 's' and 'f' draw Flow arrows from
-                    # the CPU launch to the GPU kernel
-                    f.write('{"name": "%s", '
-                            '"ph": "s", '
-                            '"ts": %s, '
-                            '"tid": %s, '
-                            '"pid": "CPU functions", '
-                            '"id": %s, '
-                            '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (evt.name, evt.cpu_interval.start,
-                                               evt.thread, next_id))
-                    f.write('{"name": "%s", '
-                            '"ph": "f", '
-                            '"ts": %s, '
-                            '"tid": %s, '
-                            '"pid": "CUDA functions", '
-                            '"id": %s, '
-                            '"cat": "cpu_to_cuda", '
-                            '"args": {}}, ' % (k.name, k.interval.start, k.device, next_id))
-                    f.write('{"name": "%s", '
-                            '"ph": "X", '
-                            '"ts": %s, '
-                            '"dur": %s, '
-                            '"tid": %s, '
-                            '"pid": "CUDA functions", '
-                            '"args": {}}, ' % (k.name, k.interval.start,
-                                               k.interval.elapsed_us(), k.device))
-                    next_id += 1
-
-            # remove trailing whitespace and comma
-            f.seek(f.tell() - 2, os.SEEK_SET)
-            f.truncate()
-            f.write("]")
+        if path.endswith('.gz'):
+            with gzip.open(path, 'wt') as f:
+                _write_chrome_trace(self, f)
+        else:
+            with open(path, 'w') as f:
+                _write_chrome_trace(self, f)
 
     def key_averages(self, group_by_input_shapes=False):
         """Averages all function events over their keys.
@@ -205,6 +161,207 @@ class EventList(list):
         return total_stat
 
 
+def _event_columns(events):
+    # Returns the start times, end times and threads of `events` as separate
+    # lists, which are much faster to work on than the events themselves.
+    intervals = [evt.cpu_interval for evt in events]
+    starts = [interval.start for interval in intervals]
+    ends = [interval.end for interval in intervals]
+    threads = [evt.thread for evt in events]
+    return starts, ends, threads
+
+
+# Number of events that are formatted before they are written out together.
+_CHROME_TRACE_CHUNK_SIZE = 10000
+
+
+def _write_chrome_trace(events, f):
+    # Formats the events in chunks and streams them to `f`, so that memory use
+    # does not grow with the size of the trace. Use string formatting over
+    # json.dump since JSON dumping is very slow; only the names are escaped,
+    # once per distinct name.
+    quoted_names = {}
+
+    def quote(name):
+        quoted = quoted_names.get(name)
+        if quoted is None:
+            quoted = quoted_names[name] = json.dumps(name)
+        return quoted
+
+    f.write("[")
+    chunk = []
+    first_chunk = True
+    next_id = 0
+    for evt in events:
+        name = quote(evt.name)
+        start = evt.cpu_interval.start
+        chunk.append('{"name": %s, '
+                     '"ph": "X", '
+                     '"ts": %s, '
+                     '"dur": %s, '
+                     '"tid": %s, '
+                     '"pid": "CPU functions", '
+                     '"args": {}}' % (name, start, evt.cpu_interval.elapsed_us(), evt.thread))
+        for k in evt.kernels:
+            kernel_name = quote(k.name)
+            # 's' and 'f' draw Flow arrows from
+            # the CPU launch to the GPU kernel
+            chunk.append('{"name": %s, '
+                         '"ph": "s", '
+                         '"ts": %s, '
+                         '"tid": %s, '
+                         '"pid": "CPU functions", '
+                         '"id": %s, '
+                         '"cat": "cpu_to_cuda", '
+                         '"args": {}}' % (name, start, evt.thread, next_id))
+            chunk.append('{"name": %s, '
+                         '"ph": "f", '
+                         '"ts": %s, '
+                         '"tid": %s, '
+                         '"pid": "CUDA functions", '
+                         '"id": %s, '
+                         '"cat": "cpu_to_cuda", '
+                         '"args": {}}' % (kernel_name, k.interval.start, k.device, next_id))
+            chunk.append('{"name": %s, '
+                         '"ph": "X", '
+                         '"ts": %s, '
+                         '"dur": %s, '
+                         '"tid": %s, '
+                         '"pid": "CUDA functions", '
+                         '"args": {}}' % (kernel_name, k.interval.start,
+                                          k.interval.elapsed_us(), k.device))
+            next_id += 1
+        if len(chunk) >= _CHROME_TRACE_CHUNK_SIZE:
+            f.write(("" if first_chunk else ", ") + ", ".join(chunk))
+            first_chunk = False
+            chunk = []
+    if len(chunk) > 0:
+        f.write(("" if first_chunk else ", ") + ", ".join(chunk))
+    f.write("]")
+
+
+class ProfilerAction(Enum):
+    """What a :class:`profile` with a schedule does during a step."""
+    NONE = 0
+    WARMUP = 1
+    RECORD = 2
+    RECORD_AND_SAVE = 3
+
+
+def schedule(wait, warmup, active, repeat=0, skip_first=0):
+    """Returns a schedule for :class:`profile` that, after skipping the first
+    :attr:`skip_first` steps, cycles through :attr:`wait` steps that are not
+    profiled, :attr:`warmup` steps that are profiled but whose results are
+    discarded, and :attr:`active` steps that are profiled, :attr:`repeat` times
+    (or forever if :attr:`repeat` is zero). The results of each cycle are saved
+    at the end of its last active step.
+
+    For example, ``schedule(wait=k - 1, warmup=0, active=1)`` profiles every
+    k-th step.
+
+    Returns:
+        A function mapping a step number to a :class:`ProfilerAction`.
+    """
+    if wait < 0 or warmup < 0 or repeat < 0 or skip_first < 0:
+        raise ValueError("wait, warmup, repeat and skip_first should be non-negative")
+    if active < 1:
+        raise ValueError("active should be a positive integer, but got {}".format(active))
+    num_steps = wait + warmup + active
+
+    def schedule_fn(step):
+        if step < skip_first:
+            return ProfilerAction.NONE
+        step -= skip_first
+        if repeat > 0 and step // num_steps >= repeat:
+            return ProfilerAction.NONE
+        mod_step = step % num_steps
+        if mod_step < wait:
+            return ProfilerAction.NONE
+        elif mod_step < wait + warmup:
+            return ProfilerAction.WARMUP
+        elif mod_step < num_steps - 1:
+            return ProfilerAction.RECORD
+        return ProfilerAction.RECORD_AND_SAVE
+
+    return schedule_fn
+
+
+class KeyAveragesAggregator(object):
+    """Accumulates :meth:`EventList.key_averages` over many traces, without
+    keeping their events alive.
+
+    An instance can be passed as :attr:`on_trace_ready` of a :class:`profile`
+    with a schedule, to aggregate each trace as soon as it is recorded.
+
+    Arguments:
+        group_by_input_shapes (bool, optional): whether to group events by
+            (event name, input shapes) rather than just by event name.
+            Default: ``False``.
+        max_entries (int, optional): if given, bounds the number of keys the
+            table holds. When more keys are seen, the ones with the smallest
+            self CPU time are merged into a single ``[other]`` entry, so the
+            totals stay exact. Default: ``None``.
+
+    Example:
+        >>> aggregator = torch.autograd.profiler.KeyAveragesAggregator(max_entries=100)
+        >>> with torch.autograd.profiler.profile(
+        >>>         schedule=torch.autograd.profiler.schedule(wait=9, warmup=0, active=1),
+        >>>         on_trace_ready=aggregator) as prof:
+        >>>     for batch in data:
+        >>>         train_step(batch)
+        >>>         prof.step()
+        >>> print(aggregator.key_averages().table(sort_by="self_cpu_time_total"))
+    """
+    def __init__(self, group_by_input_shapes=False, max_entries=None):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries should be a positive integer, but got {}".format(max_entries))
+        self.group_by_input_shapes = group_by_input_shapes
+        self.max_entries = max_entries
+        self.num_traces = 0
+        self._use_cuda = False
+        self._stats = {}
+        self._other = None
+
+    def __call__(self, prof):
+        self.add(prof.function_events)
+
+    def add(self, events):
+        """Adds the events of the :class:`EventList` :attr:`events` to the
+        averages."""
+        events.populate_cpu_children()
+        self._use_cuda = self._use_cuda or events._use_cuda
+        for evt in events:
+            key = evt.key
+            if self.group_by_input_shapes:
+                key = (key, str(evt.input_shapes))
+            if key not in self._stats:
+                self._stats[key] = FunctionEventAvg()
+            self._stats[key].add(evt, self.group_by_input_shapes)
+        self.num_traces += 1
+        if self.max_entries is not None and len(self._stats) > self.max_entries:
+            self._evict(len(self._stats) - self.max_entries)
+
+    def _evict(self, count):
+        if self._other is None:
+            self._other = FunctionEventAvg()
+            self._other.key = '[other]'
+        keys = sorted(self._stats.keys(), key=lambda key: self._stats[key].self_cpu_time_total)
+        for key in keys[:count]:
+            avg = self._stats.pop(key)
+            self._other.cpu_time_total += avg.cpu_time_total
+            self._other.cuda_time_total += avg.cuda_time_total
+            self._other.self_cpu_time_total += avg.self_cpu_time_total
+            self._other.count += avg.count
+
+    def key_averages(self):
+        """Returns an :class:`EventList` containing :class:`FunctionEventAvg`
+        objects for the events added so far."""
+        averages = list(self._stats.values())
+        if self._other is not None:
+            averages.append(self._other)
+        return EventList(averages, use_cuda=self._use_cuda)
+
+
 class profile(object):
     """Context manager that manages autograd profiler state and holds a summary of results.
     Under the hood it just records events of functions being executed in C++ and
@@ -231,6 +388,19 @@ class profile(object):
             self cpu time might be artificially increased because of the shape
             collection.
 
+        schedule (callable, optional): A function mapping a step number to a
+            :class:`ProfilerAction`, e.g., one returned by :func:`schedule`.
+            If given, the training loop should call :meth:`step` at the end of
+            each step, and only the steps the schedule selects are profiled.
+            Each time a range of profiled steps ends, its events are stored in
+            :attr:`function_events` (replacing the previous ones) and
+            :attr:`on_trace_ready` is called. Default: ``None``.
+
+        on_trace_ready (callable, optional): Called with this profiler as its
+            only argument each time the events of a range of profiled steps are
+            available, e.g., to export or aggregate them
+            (see :class:`KeyAveragesAggregator`). Default: ``None``.
+
     .. warning:
         This context managers should not be called recursively, i.e. no nested
         instances are allowed
@@ -260,7 +430,8 @@ class profile(object):
         -----------------------------------  ---------------  ---------------  ---------------
 
     """
-    def __init__(self, enabled=True, use_cuda=False, record_shapes=False):
+    def __init__(self, enabled=True, use_cuda=False, record_shapes=False, schedule=None,
+                 on_trace_ready=None):
         self.enabled = enabled
         self.use_cuda = use_cuda
         self.function_events = None
@@ -268,6 +439,10 @@ class profile(object):
             return
         self.entered = False
         self.record_shapes = record_shapes
+        self.schedule = schedule
+        self.on_trace_ready = on_trace_ready
+        self.step_num = 0
+        self.recording = False
 
     def __enter__(self):
         if not self.enabled:
@@ -275,18 +450,55 @@ class profile(object):
         if self.entered:
             raise RuntimeError("autograd profiler traces are not reentrant")
         self.entered = True
+        if self.schedule is None or self.schedule(self.step_num) != ProfilerAction.NONE:
+            self._start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.enabled:
+            return
+        if self.recording:
+            records = self._stop()
+            # Save a range of profiled steps that is cut short, but not warmup
+            if self.schedule is None or self.schedule(self.step_num) != ProfilerAction.WARMUP:
+                self._save(records)
+        return False
+
+    def _start(self):
         profiler_kind = torch.autograd.ProfilerState.CUDA if self.use_cuda \
             else torch.autograd.ProfilerState.CPU
         config = torch.autograd.ProfilerConfig(profiler_kind, self.record_shapes)
         torch.autograd._enable_profiler(config)
-        return self
+        self.recording = True
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def _stop(self):
+        self.recording = False
+        return torch.autograd._disable_profiler()
+
+    def _save(self, records):
+        self.function_events = EventList(parse_cpu_trace(records), use_cuda=self.use_cuda)
+        if self.on_trace_ready is not None:
+            self.on_trace_ready(self)
+
+    def step(self):
+        """Signals the end of a step to a profiler with a :attr:`schedule`,
+        starting or stopping to profile as the schedule says."""
         if not self.enabled:
             return
-        records = torch.autograd._disable_profiler()
-        self.function_events = EventList(parse_cpu_trace(records), use_cuda=self.use_cuda)
-        return False
+        if self.schedule is None:
+            raise RuntimeError("step() can only be called on a profiler with a schedule")
+        prev_action = self.schedule(self.step_num)
+        self.step_num += 1
+        action = self.schedule(self.step_num)
+        recording_actions = (ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE)
+        if prev_action == ProfilerAction.RECORD_AND_SAVE or \
+                (prev_action == ProfilerAction.RECORD and action not in recording_actions):
+            self._save(self._stop())
+        elif prev_action == ProfilerAction.WARMUP and action != ProfilerAction.WARMUP:
+            # Warmup events are discarded
+            self._stop()
+        if action != ProfilerAction.NONE and not self.recording:
+            self._start()
 
     def __repr__(self):
         if self.function_events is None:
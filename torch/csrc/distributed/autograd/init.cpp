@@ -102,6 +102,10 @@ PyObject* dist_autograd_init(PyObject* /* unused */) {
       },
       py::return_value_policy::reference);
 
+  module.def("_has_valid_context", []() {
+    return DistAutogradContainer::getInstance().hasValidContext();
+  });
+
   module.def(
       "_init",
       [](int64_t worker_id) { DistAutogradContainer::init(worker_id); },
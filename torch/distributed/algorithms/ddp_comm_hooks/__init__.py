@@ -0,0 +1,12 @@
+"""
+:mod:`torch.distributed.algorithms.ddp_comm_hooks` contains communication
+hooks for :class:`~torch.nn.parallel.DistributedDataParallel`, which can be
+registered with
+:meth:`~torch.nn.parallel.DistributedDataParallel.register_comm_hook` to
+change how gradients are communicated across processes, e.g., to compress
+them on bandwidth-bound clusters.
+"""
+from .grad_bucket import CommFuture, GradBucket
+from .default_hooks import allreduce_hook, fp16_compress_hook
+from .powerSGD_hook import PowerSGDState, powerSGD_hook
+from .topk_hook import TopKState, topk_hook
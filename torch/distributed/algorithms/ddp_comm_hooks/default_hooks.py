@@ -0,0 +1,36 @@
+import torch
+import torch.distributed as dist
+
+from .grad_bucket import CommFuture
+
+
+def allreduce_hook(process_group, bucket):
+    r"""Averages the gradients of :attr:`bucket` with an all-reduce, which is
+    what :class:`~torch.nn.parallel.DistributedDataParallel` does without a
+    communication hook.
+
+    Example::
+        >>> ddp_model.register_comm_hook(process_group, allreduce_hook)
+    """
+    tensor = bucket.tensor.div_(process_group.size())
+    work = dist.all_reduce(tensor, group=process_group, async_op=True)
+    return CommFuture([work], value=tensor)
+
+
+def fp16_compress_hook(process_group, bucket):
+    r"""Casts the gradients of :attr:`bucket` to ``torch.float16`` and
+    averages them with an all-reduce, which halves the communicated bytes of
+    ``torch.float32`` gradients. The result is cast back to the dtype of the
+    gradients.
+
+    Example::
+        >>> ddp_model.register_comm_hook(process_group, fp16_compress_hook)
+    """
+    # Divide before casting, so that the sum cannot overflow
+    compressed = bucket.tensor.div_(process_group.size()).to(torch.float16)
+    work = dist.all_reduce(compressed, group=process_group, async_op=True)
+
+    def decompress():
+        return bucket.tensor.copy_(compressed)
+
+    return CommFuture([work], then=decompress)
@@ -0,0 +1,57 @@
+from torch._utils import _unflatten_dense_tensors
+
+
+class GradBucket(object):
+    r"""A bucket of gradients that a communication hook reduces.
+
+    Attributes:
+        index (int): Position of the bucket in the order in which buckets are
+            reduced, which is the same on all processes and in all iterations,
+            so it can be used as a key for per-bucket state.
+        tensor (Tensor): A 1D tensor holding the local gradients of
+            :attr:`parameters` back to back. The hook may modify it in place.
+        parameters (list of Tensor): The parameters whose gradients are in
+            :attr:`tensor`.
+    """
+    def __init__(self, index, tensor, parameters):
+        self.index = index
+        self.tensor = tensor
+        self.parameters = parameters
+
+    def get_per_parameter_tensors(self):
+        r"""Returns views into :attr:`tensor` with the shapes of
+        :attr:`parameters`."""
+        return _unflatten_dense_tensors(self.tensor, self.parameters)
+
+
+class CommFuture(object):
+    r"""The result of a communication hook: the gradients of its bucket,
+    averaged across processes, as a 1D tensor like :attr:`GradBucket.tensor`.
+
+    Arguments:
+        works (list): Async work handles of the collectives the result depends
+            on, as returned by ``torch.distributed`` functions with
+            ``async_op=True``.
+        value (Tensor, optional): The result, valid once :attr:`works` are
+            done.
+        then (callable, optional): If given instead of :attr:`value`, called
+            without arguments once :attr:`works` are done, to compute the
+            result.
+    """
+    def __init__(self, works=(), value=None, then=None):
+        if (value is None) == (then is None):
+            raise ValueError("Exactly one of value and then should be given")
+        self._works = list(works)
+        self._value = value
+        self._then = then
+        self._done = False
+
+    def wait(self):
+        r"""Waits for the collectives and returns the result."""
+        if not self._done:
+            for work in self._works:
+                work.wait()
+            if self._then is not None:
+                self._value = self._then()
+            self._done = True
+        return self._value
@@ -0,0 +1,139 @@
+import torch
+import torch.distributed as dist
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+
+from .grad_bucket import CommFuture
+
+
+class PowerSGDState(object):
+    r"""State of :func:`powerSGD_hook`.
+
+    Arguments:
+        process_group (ProcessGroup): The process group to communicate over.
+        matrix_approximation_rank (int, optional): Rank of the approximation
+            of each gradient matrix. Higher ranks are more accurate but
+            communicate more. Default: ``1``.
+        use_error_feedback (bool, optional): Whether to add the approximation
+            error of each iteration to the gradients of the next one, which is
+            needed to converge to the same accuracy as without compression.
+            Default: ``True``.
+        random_seed (int, optional): Seed of the initial low-rank factors,
+            which must be the same on all processes. Default: ``0``.
+    """
+    def __init__(self, process_group, matrix_approximation_rank=1, use_error_feedback=True,
+                 random_seed=0):
+        if matrix_approximation_rank < 1:
+            raise ValueError("matrix_approximation_rank should be a positive integer, but got {}".format(
+                matrix_approximation_rank))
+        self.process_group = process_group
+        self.matrix_approximation_rank = matrix_approximation_rank
+        self.use_error_feedback = use_error_feedback
+        self.generator = torch.Generator()
+        self.generator.manual_seed(random_seed)
+        # Approximation error of each bucket, keyed by bucket index
+        self.error_dict = {}
+        # The Q factors of each bucket, reused as the starting point of the
+        # next iteration (one step of power iteration per iteration)
+        self.q_memory_dict = {}
+
+
+def _orthogonalize(matrix, epsilon=1e-8):
+    # Orthonormalizes the columns of `matrix` in place with Gram-Schmidt.
+    num_cols = matrix.shape[1]
+    for i in range(num_cols):
+        col = matrix[:, i:i + 1]
+        col.div_(col.norm() + epsilon)
+        if i + 1 < num_cols:
+            rest = matrix[:, i + 1:]
+            rest.sub_(torch.sum(col * rest, dim=0) * col)
+
+
+def powerSGD_hook(state, bucket):
+    r"""Averages the gradients of :attr:`bucket` in a compressed form, using
+    the low-rank approximation of PowerSGD (https://arxiv.org/abs/1905.13727).
+
+    Each gradient with two or more dimensions is viewed as an ``n x m`` matrix
+    ``M`` (flattening all but the first dimension), and approximated as
+    ``P Q^T`` with ``P`` of shape ``n x r`` and ``Q`` of shape ``m x r``, where
+    ``r`` is ``state.matrix_approximation_rank``:
+
+    1. ``P = M Q`` is computed with the ``Q`` of the previous iteration, and
+       all-reduced across processes, then orthogonalized.
+    2. ``Q = M^T P`` is computed and averaged across processes.
+    3. ``M`` is replaced by the average approximation ``P Q^T``.
+
+    This communicates ``r (n + m)`` instead of ``n m`` values per matrix.
+    Gradients for which this is not smaller, such as biases, are all-reduced
+    uncompressed in a single batch. With ``state.use_error_feedback``, the
+    difference between the local gradient matrices and their approximation
+    is added to the gradients of the next iteration.
+
+    Example::
+        >>> state = PowerSGDState(process_group, matrix_approximation_rank=2)
+        >>> ddp_model.register_comm_hook(state, powerSGD_hook)
+    """
+    process_group = state.process_group
+    world_size = process_group.size()
+    rank = state.matrix_approximation_rank
+    input_tensor = bucket.tensor
+
+    if state.use_error_feedback:
+        if bucket.index in state.error_dict:
+            input_tensor.add_(state.error_dict[bucket.index])
+        input_tensor_cp = input_tensor.clone()
+
+    def is_compressible(tensor):
+        if tensor.dim() < 2:
+            return False
+        n, m = tensor.shape[0], tensor.numel() // tensor.shape[0]
+        return rank * (n + m) < n * m
+
+    tensors = bucket.get_per_parameter_tensors()
+    uncompressed = [tensor for tensor in tensors if not is_compressible(tensor)]
+    matrices = [tensor.view(tensor.shape[0], -1) for tensor in tensors if is_compressible(tensor)]
+
+    works = []
+    if uncompressed:
+        uncompressed_flat = _flatten_dense_tensors(uncompressed).div_(world_size)
+        works.append(dist.all_reduce(uncompressed_flat, group=process_group, async_op=True))
+    if matrices:
+        if bucket.index not in state.q_memory_dict:
+            qs_flat = torch.randn(sum(matrix.shape[1] * rank for matrix in matrices),
+                                  generator=state.generator)
+            state.q_memory_dict[bucket.index] = qs_flat.to(input_tensor)
+        qs_flat = state.q_memory_dict[bucket.index]
+        qs = [q.view(matrix.shape[1], rank) for q, matrix in zip(
+            qs_flat.split([matrix.shape[1] * rank for matrix in matrices]), matrices)]
+        ps_flat = input_tensor.new_empty(sum(matrix.shape[0] * rank for matrix in matrices))
+        ps = [p.view(matrix.shape[0], rank) for p, matrix in zip(
+            ps_flat.split([matrix.shape[0] * rank for matrix in matrices]), matrices)]
+        for matrix, p, q in zip(matrices, ps, qs):
+            torch.matmul(matrix, q, out=p)
+        # The sum is orthogonalized, so it does not need to be averaged
+        works.append(dist.all_reduce(ps_flat, group=process_group, async_op=True))
+
+    def decompress():
+        if matrices:
+            for p in ps:
+                _orthogonalize(p)
+            for matrix, p, q in zip(matrices, ps, qs):
+                torch.matmul(matrix.t(), p, out=q)
+            dist.all_reduce(qs_flat, group=process_group)
+            qs_flat.div_(world_size)
+            for matrix, p, q in zip(matrices, ps, qs):
+                torch.matmul(p, q.t(), out=matrix)
+        if uncompressed:
+            for tensor, reduced in zip(uncompressed, _unflatten_dense_tensors(uncompressed_flat, uncompressed)):
+                tensor.copy_(reduced)
+
+        if state.use_error_feedback:
+            error = state.error_dict.setdefault(bucket.index, torch.empty_like(input_tensor))
+            torch.sub(input_tensor_cp, input_tensor, out=error)
+            # Gradients that were communicated exactly have no error to feed
+            # back, only their local deviation from the average.
+            for tensor in _unflatten_dense_tensors(error, tensors):
+                if not is_compressible(tensor):
+                    tensor.zero_()
+        return input_tensor
+
+    return CommFuture(works, then=decompress)
@@ -0,0 +1,72 @@
+import torch
+import torch.distributed as dist
+
+from .grad_bucket import CommFuture
+
+
+class TopKState(object):
+    r"""State of :func:`topk_hook`.
+
+    Arguments:
+        process_group (ProcessGroup): The process group to communicate over.
+        compress_ratio (float, optional): Fraction of the gradient values of a
+            bucket each process sends. Default: ``0.01``.
+        use_error_feedback (bool, optional): Whether to add the values that
+            were not sent in an iteration to the gradients of the next one.
+            Default: ``True``.
+    """
+    def __init__(self, process_group, compress_ratio=0.01, use_error_feedback=True):
+        if not 0 < compress_ratio <= 1:
+            raise ValueError("compress_ratio should be in (0, 1], but got {}".format(compress_ratio))
+        self.process_group = process_group
+        self.compress_ratio = compress_ratio
+        self.use_error_feedback = use_error_feedback
+        # Values that were not sent, keyed by bucket index
+        self.error_dict = {}
+
+
+def topk_hook(state, bucket):
+    r"""Averages a sparsified version of the gradients of :attr:`bucket`:
+    every process only sends its ``k`` gradient values with the largest
+    magnitude and their indices, where ``k`` is ``state.compress_ratio`` times
+    the number of values of the bucket. The sent values of all processes are
+    summed up and divided by the number of processes, and all other values
+    are zero. With ``state.use_error_feedback``, the values that were not sent
+    are added to the gradients of the next iteration, so that they are sent
+    eventually.
+
+    As values and ``torch.int64`` indices are all-gathered, this communicates
+    ``k`` times the world size values and indices per process, which is only
+    smaller than an all-reduce for small ratios.
+
+    Example::
+        >>> state = TopKState(process_group, compress_ratio=0.001)
+        >>> ddp_model.register_comm_hook(state, topk_hook)
+    """
+    process_group = state.process_group
+    world_size = process_group.size()
+    tensor = bucket.tensor
+
+    if state.use_error_feedback and bucket.index in state.error_dict:
+        tensor.add_(state.error_dict[bucket.index])
+    k = max(1, int(tensor.numel() * state.compress_ratio))
+    _, indices = tensor.abs().topk(k, sorted=False)
+    values = tensor[indices]
+    if state.use_error_feedback:
+        error = state.error_dict.setdefault(bucket.index, torch.empty_like(tensor))
+        error.copy_(tensor).index_fill_(0, indices, 0)
+
+    all_values = [torch.empty_like(values) for _ in range(world_size)]
+    all_indices = [torch.empty_like(indices) for _ in range(world_size)]
+    works = [
+        dist.all_gather(all_values, values, group=process_group, async_op=True),
+        dist.all_gather(all_indices, indices, group=process_group, async_op=True),
+    ]
+
+    def decompress():
+        tensor.zero_()
+        for rank_values, rank_indices in zip(all_values, all_indices):
+            tensor.index_add_(0, rank_indices, rank_values)
+        return tensor.div_(world_size)
+
+    return CommFuture(works, then=decompress)
@@ -1,33 +1,73 @@
 import torch.distributed.rpc as rpc
 import torch.distributed.autograd as dist_autograd
 
+import weakref
 from collections import defaultdict
-from threading import Lock
+from threading import Lock, RLock
 
 
 class _LocalOptimizer:
-    # Ideally we would only need to share a lock for instances of
-    # _LocalOptimizer that deal with the same parameters. We are
-    # making a simplifying assumption here that if there is more
-    # than one instance of _LocalOptimizer per worker, they will
-    # be optimizing the same parameters (e.g. each data parallel
-    # trainer will create its own instance of _LocalOptimizer but
-    # they will all optimize the same parameters on each worker)
-    global_lock = Lock()
+    # Instances of _LocalOptimizer may optimize the same parameters (e.g. each
+    # data parallel trainer creates its own instance of _LocalOptimizer for
+    # the same parameters on each worker) or disjoint ones (e.g. trainers
+    # updating different embedding tables on a parameter server). Steps of
+    # instances sharing a parameter are serialized by a lock per parameter,
+    # while steps on disjoint parameters run concurrently. A step acquires
+    # the locks of all of its parameters in the order of their ids, so that
+    # concurrent steps cannot deadlock.
+    #
+    # The locks are kept by id(param), along with a weak reference to the
+    # parameter whose callback drops the entry once the parameter is freed,
+    # so that the registry does not grow with every optimizer ever created
+    # and a reused id never maps to the lock of a freed parameter. (A
+    # WeakKeyDictionary would compare colliding tensors with __eq__.) The
+    # callback may run during a garbage collection in a thread that holds
+    # _param_locks_lock, hence the RLock.
+    _param_locks = {}
+    _param_locks_lock = RLock()
 
     def __init__(self, optim_cls, local_params_rref, *args, **kwargs):
+        params = [rref.local_value() for rref in local_params_rref]
         self.optim = optim_cls(
-            [rref.local_value() for rref in local_params_rref],
+            params,
             *args,
             **kwargs)
+        self._param_ids = {id(param) for param in params}
+        unique_params = {id(param): param for param in params}
+        self._locks = [
+            _LocalOptimizer._get_param_lock(unique_params[param_id])
+            for param_id in sorted(self._param_ids)]
+
+    @staticmethod
+    def _get_param_lock(param):
+        param_id = id(param)
+
+        def remove(ref):
+            with _LocalOptimizer._param_locks_lock:
+                entry = _LocalOptimizer._param_locks.get(param_id)
+                if entry is not None and entry[0] is ref:
+                    del _LocalOptimizer._param_locks[param_id]
+
+        with _LocalOptimizer._param_locks_lock:
+            entry = _LocalOptimizer._param_locks.get(param_id)
+            if entry is None or entry[0]() is not param:
+                entry = (weakref.ref(param, remove), Lock())
+                _LocalOptimizer._param_locks[param_id] = entry
+            return entry[1]
 
     def step(self, autograd_ctx_id):
         all_local_grads = dist_autograd.get_gradients(autograd_ctx_id)
 
-        with _LocalOptimizer.global_lock:
+        for lock in self._locks:
+            lock.acquire()
+        try:
             for param, grad in all_local_grads.items():
-                param.grad = grad
+                if id(param) in self._param_ids:
+                    param.grad = grad
             self.optim.step()
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
 
 
 def _new_local_optimizer(optim_cls, local_params_rref, *args, **kwargs):
@@ -66,8 +106,10 @@ class DistributedOptimizer:
     Concurrent calls to
     :meth:`~torch.distributed.optim.DistributedOptimizer.step`,
     either from the same or different clients, will
-    be serialized on each worker -- as each worker's optimizer can only work
-    on one set of gradients at a time. However, there is no guarantee that
+    be serialized on each worker for the parameters they have in common --
+    as each parameter can only be updated with one set of gradients at a
+    time. Steps of optimizers with disjoint parameters on a worker run
+    concurrently. However, there is no guarantee that
     the full forward-backward-optimizer sequence will execute for one client
     at a time. This means that the gradients being applied may not correspond
     to the latest forward pass executed on a given worker. Also, there is no
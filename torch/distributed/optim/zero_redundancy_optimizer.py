@@ -0,0 +1,254 @@
+import ctypes
+import io
+from itertools import chain
+
+import torch
+import torch.distributed as dist
+from torch.distributed.distributed_c10d import _get_global_rank
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+from torch.optim import Optimizer
+from torch.optim._multi_tensor import _group_by_device_and_dtype
+
+
+def _broadcast_object(obj, src_rank, group, device):
+    r"""Broadcasts ``obj``, which may contain tensors, from the process with
+    global rank ``src_rank`` to all processes of ``group``, and returns it on
+    all of them. Tensors are received on the CPU."""
+    if dist.get_rank() == src_rank:
+        buffer = io.BytesIO()
+        torch.save(obj, buffer)
+        data = torch.ByteTensor(torch.ByteStorage.from_buffer(buffer.getvalue())).to(device)
+        length = torch.tensor([data.numel()], dtype=torch.long, device=device)
+        dist.broadcast(length, src=src_rank, group=group)
+        dist.broadcast(data, src=src_rank, group=group)
+        return obj
+
+    length = torch.zeros(1, dtype=torch.long, device=device)
+    dist.broadcast(length, src=src_rank, group=group)
+    data = torch.empty(int(length.item()), dtype=torch.uint8, device=device)
+    dist.broadcast(data, src=src_rank, group=group)
+    data = data.cpu()
+    return torch.load(io.BytesIO(ctypes.string_at(data.data_ptr(), data.numel())), map_location='cpu')
+
+
+class ZeroRedundancyOptimizer(Optimizer):
+    r"""
+    Wraps an arbitrary :class:`optim.Optimizer <torch.optim.Optimizer>` and
+    shards its state across the processes of a group, as in stage 1 of the
+    Zero Redundancy Optimizer (ZeRO) technique.
+
+    Each parameter is assigned to one process, balancing the number of
+    elements per process, and each process only keeps the optimizer state of,
+    and computes the update for, its own parameters. After every
+    :meth:`step`, the updated parameters are broadcast from their owner to
+    all other processes, with one coalesced broadcast per process, device and
+    dtype. Thus, with stateful optimizers such as
+    :class:`~torch.optim.Adam`, the memory used for optimizer state on each
+    process drops by a factor of the world size.
+
+    It is meant to be used along with
+    :class:`~torch.nn.parallel.DistributedDataParallel`, which makes the
+    (averaged) gradients of all parameters available on all processes.
+
+    Args:
+        params (iterable): an iterable of :class:`torch.Tensor` s or
+            :class:`dict` s giving all parameters, the same on all processes
+            and in the same order. They are sharded across processes.
+        optimizer_class (optim.Optimizer): the class of the local optimizer.
+        group (ProcessGroup, optional): the process group to shard across.
+            (default: the default process group)
+        defaults: any trailing arguments, which are forwarded to the local
+            optimizer.
+
+    Example::
+
+        >>> import torch.nn as nn
+        >>> from torch.distributed.optim import ZeroRedundancyOptimizer
+        >>> from torch.nn.parallel import DistributedDataParallel as DDP
+        >>>
+        >>> model = nn.Sequential(*[nn.Linear(2000, 2000).to(rank) for _ in range(20)])
+        >>> ddp = DDP(model, device_ids=[rank])
+        >>> opt = ZeroRedundancyOptimizer(
+        >>>     ddp.parameters(),
+        >>>     optimizer_class=torch.optim.Adam,
+        >>>     lr=0.01
+        >>> )
+        >>> ddp(inputs).sum().backward()
+        >>> opt.step()
+
+    .. note::
+        :attr:`state` of this optimizer is always empty. The state of the
+        local shard is held by the local optimizer :attr:`optim`. Use
+        :meth:`consolidate_state_dict` and :meth:`state_dict` to gather the
+        complete state on one process.
+
+    .. warning::
+        :meth:`step` must be called on all processes of the group, and the
+        local optimizer must evaluate the closure (if any) exactly once, so
+        that all processes run the same collectives.
+    """
+
+    def __init__(self, params, optimizer_class, group=None, **defaults):
+        self.group = group if group is not None else dist.group.WORLD
+        self.world_size = dist.get_world_size(self.group)
+        self.rank = dist.get_rank(self.group)
+        self._optimizer_class = optimizer_class
+        # The parameters owned by each rank, and their number of elements
+        self._partition = [[] for _ in range(self.world_size)]
+        self._partition_numel = [0] * self.world_size
+        self._local_param_groups = []
+        self._all_state = None
+        super(ZeroRedundancyOptimizer, self).__init__(params, defaults)
+
+        self.optim = optimizer_class(self._local_param_groups, **defaults)
+        self._device = self.param_groups[0]['params'][0].device
+
+    def _global_rank(self, rank):
+        if self.group is dist.group.WORLD:
+            return rank
+        return _get_global_rank(self.group, rank)
+
+    def add_param_group(self, param_group):
+        r"""Add a param group to the :class:`Optimizer` s `param_groups`, and
+        its shard to the local optimizer.
+
+        Arguments:
+            param_group (dict): Specifies what Tensors should be optimized along with group
+            specific optimization options.
+        """
+        super(ZeroRedundancyOptimizer, self).add_param_group(param_group)
+        group = self.param_groups[-1]
+        local_group = {k: v for k, v in group.items() if k != 'params'}
+        # Assign the largest parameters first, each to the rank with the
+        # fewest elements so far. This only depends on the parameter shapes,
+        # so it's the same on all processes.
+        for p in sorted(group['params'], key=lambda p: p.numel(), reverse=True):
+            rank = self._partition_numel.index(min(self._partition_numel))
+            self._partition[rank].append(p)
+            self._partition_numel[rank] += p.numel()
+        # Keep the order of `param_groups` in the local group
+        local_ids = {id(p) for p in self._partition[self.rank]}
+        local_group['params'] = [p for p in group['params'] if id(p) in local_ids]
+
+        if hasattr(self, 'optim'):
+            self.optim.add_param_group(local_group)
+        else:
+            self._local_param_groups.append(local_group)
+
+    def step(self, closure=None):
+        r"""Performs a single optimization step on the local shard, and
+        broadcasts the updated parameters to all processes.
+
+        Arguments:
+            closure (callable): A closure that reevaluates the model and
+                returns the loss. Optional for most optimizers.
+        """
+        # Hyperparameters may have been changed in `param_groups`, e.g., by a
+        # learning rate scheduler.
+        for group, local_group in zip(self.param_groups, self.optim.param_groups):
+            for k, v in group.items():
+                if k != 'params':
+                    local_group[k] = v
+
+        if closure is not None:
+            loss = self.optim.step(closure)
+        else:
+            loss = self.optim.step()
+        self._broadcast_params()
+        return loss
+
+    def _broadcast_params(self):
+        with torch.no_grad():
+            works = []
+            for rank, params in enumerate(self._partition):
+                for bucket in _group_by_device_and_dtype(params):
+                    if rank == self.rank:
+                        flat = _flatten_dense_tensors(bucket)
+                    else:
+                        flat = torch.empty(sum(p.numel() for p in bucket),
+                                           dtype=bucket[0].dtype, device=bucket[0].device)
+                    work = dist.broadcast(flat, src=self._global_rank(rank), group=self.group, async_op=True)
+                    works.append((work, rank, flat, bucket))
+            for work, rank, flat, bucket in works:
+                work.wait()
+                if rank != self.rank:
+                    for p, tensor in zip(bucket, _unflatten_dense_tensors(flat, bucket)):
+                        p.copy_(tensor)
+
+    def consolidate_state_dict(self, to=0):
+        r"""Gathers the optimizer state of all shards on the process of rank
+        :attr:`to` in the group, so that :meth:`state_dict` can be called
+        there. This must be called on all processes of the group.
+
+        Arguments:
+            to (int): the rank in the group that receives the state.
+                (default: 0)
+        """
+        # Parameters are identified by their position in `param_groups`,
+        # which is the same on all processes.
+        indices = {id(p): i for i, p in enumerate(chain(*(g['params'] for g in self.param_groups)))}
+        local_state = {indices[k]: v for k, v in self.optim.state_dict()['state'].items()}
+
+        all_state = {}
+        for rank in range(self.world_size):
+            state = _broadcast_object(
+                local_state if rank == self.rank else None,
+                self._global_rank(rank),
+                self.group,
+                self._device)
+            if self.rank == to:
+                all_state.update(state)
+        self._all_state = all_state if self.rank == to else None
+
+    def state_dict(self):
+        r"""Returns the complete state of the optimizer as a :class:`dict`, in
+        the format of :meth:`torch.optim.Optimizer.state_dict`, so that it can
+        also be loaded into a non-sharded ``optimizer_class``.
+
+        This can only be called on the process given to the last
+        :meth:`consolidate_state_dict`, and returns the state as of then.
+        """
+        if self._all_state is None:
+            raise RuntimeError(
+                "Optimizer state has not been consolidated on rank {}. Call "
+                "consolidate_state_dict(to={}) on all ranks first.".format(self.rank, self.rank))
+        state_dict = super(ZeroRedundancyOptimizer, self).state_dict()
+        params = list(chain(*(g['params'] for g in self.param_groups)))
+        state_dict['state'] = {id(params[i]): v for i, v in self._all_state.items()}
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        r"""Loads the optimizer state, keeping the state of the local shard.
+
+        Arguments:
+            state_dict (dict): optimizer state. Should be an object returned
+                from a call to :meth:`state_dict`, of this or of a non-sharded
+                ``optimizer_class``.
+        """
+        groups = self.param_groups
+        saved_groups = state_dict['param_groups']
+        if len(groups) != len(saved_groups):
+            raise ValueError("loaded state dict has a different number of "
+                             "parameter groups")
+        if any(len(g['params']) != len(s['params']) for g, s in zip(groups, saved_groups)):
+            raise ValueError("loaded state dict contains a parameter group "
+                             "that doesn't match the size of optimizer's group")
+
+        id_map = {old_id: p for old_id, p in
+                  zip(chain(*(g['params'] for g in saved_groups)),
+                      chain(*(g['params'] for g in groups)))}
+        local_ids = {id(p) for p in chain(*(g['params'] for g in self.optim.param_groups))}
+        local_state_dict = {
+            'state': {id(id_map[k]): v for k, v in state_dict['state'].items()
+                      if k in id_map and id(id_map[k]) in local_ids},
+            'param_groups': [],
+        }
+        for group, saved_group, local_group in zip(groups, saved_groups, self.optim.param_groups):
+            for k, v in saved_group.items():
+                if k != 'params':
+                    group[k] = v
+            packed = {k: v for k, v in saved_group.items() if k != 'params'}
+            packed['params'] = [id(p) for p in local_group['params']]
+            local_state_dict['param_groups'].append(packed)
+        self.optim.load_state_dict(local_state_dict)
+        self._all_state = None
@@ -4,9 +4,11 @@ import functools
 import logging
 import numbers
 import threading
+import time
 
 import torch
 import torch.distributed as dist
+import torch.distributed.autograd as dist_autograd
 from torch.jit import Future  # noqa F401
 
 from . import (
@@ -30,8 +32,10 @@ from . import (
 from .internal import (
     PythonUDF,
     RPCExecMode,
+    _handle_exception,
     _internal_rpc_pickler,
     _build_rpc_profiling_key,
+    _run_batch,
 )
 
 from .constants import UNSET_RPC_TIMEOUT
@@ -238,6 +242,8 @@ def shutdown(graceful=True):
         >>> # wait for worker 0 to finish work, and then shutdown.
         >>> rpc.shutdown()
     """
+    # Send the calls that are still waiting for their batch to fill up.
+    disable_batching()
     if graceful:
         _wait_all_workers()
         _delete_all_user_rrefs()
@@ -477,6 +483,215 @@ def remote(to, func, args=None, kwargs=None):
 
     return rref
 
+class _BatchedFuture(object):
+    r"""
+    The Future returned by ``rpc_async`` for a call that is sent in a batch.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._exception = None
+
+    def _set_result(self, value):
+        self._value = value
+        self._done.set()
+
+    def _set_exception(self, exception):
+        self._exception = exception
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self):
+        self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        _handle_exception(self._value)
+        return self._value
+
+
+class _PendingBatch(object):
+    def __init__(self, dst_worker_info, rpc_timeout, deadline):
+        self.dst_worker_info = dst_worker_info
+        self.rpc_timeout = rpc_timeout
+        self.deadline = deadline
+        self.python_udfs = []
+        self.futures = []
+
+
+class _RpcBatcher(object):
+    r"""
+    Coalesces the Python UDF calls of ``rpc_async`` to the same destination and
+    with the same timeout into a single RPC message, which is sent as soon as
+    ``max_batch_size`` calls are pending, or the first of them has been pending
+    for ``max_delay`` seconds. The callee runs them with ``_run_batch`` and
+    returns all results at once, which are then set on the futures of the
+    individual calls.
+    """
+
+    def __init__(self, max_batch_size, max_delay):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        # (destination worker id, timeout) -> _PendingBatch, in the order of
+        # their deadlines, as all batches have the same `max_delay`.
+        self._pending = collections.OrderedDict()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._flush_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, dst_worker_info, python_udf, rpc_timeout):
+        r"""
+        Adds a call to the batch of its destination, and returns its future,
+        or None if the batcher has been stopped.
+        """
+        future = _BatchedFuture()
+        with self._cond:
+            if self._stopped:
+                return None
+            key = (dst_worker_info.id, rpc_timeout)
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = _PendingBatch(dst_worker_info, rpc_timeout, time.time() + self.max_delay)
+                self._pending[key] = batch
+                self._cond.notify()
+            batch.python_udfs.append(python_udf)
+            batch.futures.append(future)
+            if len(batch.futures) < self.max_batch_size:
+                return future
+            del self._pending[key]
+        self._send(batch)
+        return future
+
+    def stop(self):
+        r"""
+        Sends all pending batches and stops the background thread.
+        """
+        with self._cond:
+            self._stopped = True
+            batches = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify()
+        for batch in batches:
+            self._send(batch)
+        self._thread.join()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending:
+                        key, batch = next(iter(self._pending.items()))
+                        delay = batch.deadline - time.time()
+                        if delay <= 0:
+                            del self._pending[key]
+                            break
+                        self._cond.wait(delay)
+                    elif self._stopped:
+                        return
+                    else:
+                        self._cond.wait()
+            self._send(batch)
+
+    def _send(self, batch):
+        futures = batch.futures
+        try:
+            (pickled_python_udf, tensors) = _default_pickler.serialize(
+                PythonUDF(_run_batch, (batch.python_udfs,), None)
+            )
+            fut = _invoke_rpc_python_udf(
+                batch.dst_worker_info, pickled_python_udf, tensors, batch.rpc_timeout
+            )
+        except Exception as e:
+            for future in futures:
+                future._set_exception(e)
+            return
+
+        def fan_out(fut):
+            try:
+                results = fut.wait()
+            except Exception as e:
+                for future in futures:
+                    future._set_exception(e)
+                return
+            for future, result in zip(futures, results):
+                future._set_result(result)
+
+        fut._then(fan_out)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+@_require_initialized
+def enable_batching(max_batch_size=64, max_delay=0.001):
+    r"""
+    Enables batching of :meth:`~torch.distributed.rpc.rpc_async` calls of
+    Python functions. Calls to the same destination worker (with the same
+    timeout) are coalesced into a single RPC message, which is sent as soon as
+    ``max_batch_size`` calls are pending, or the first of them has been pending
+    for ``max_delay`` seconds. The callee runs the functions of a batch in
+    order, on one thread of its RPC thread pool, and sends all results back in
+    one message. This saves per-message overhead for workloads that issue
+    many small ``rpc_async`` calls, at the cost of up to ``max_delay`` seconds
+    of added latency.
+
+    :meth:`~torch.distributed.rpc.rpc_sync`,
+    :meth:`~torch.distributed.rpc.remote`, builtin operators, TorchScript
+    functions and calls made while the autograd profiler is enabled or within
+    a :class:`~torch.distributed.autograd.context` are never batched.
+
+    Arguments:
+        max_batch_size (int): the maximum number of calls in a batch.
+                              (default: ``64``)
+        max_delay (float): the maximum time in seconds that a call waits for
+                           its batch to fill up. (default: ``0.001``)
+
+    .. warning ::
+        The futures returned by batched ``rpc_async`` calls only support
+        ``wait()`` and ``done()``. A call that takes long to run on the callee
+        delays the results of the calls after it in its batch.
+
+    Example::
+        >>> # On worker 0:
+        >>> import torch.distributed.rpc as rpc
+        >>> rpc.init_rpc("worker0", rank=0, world_size=2)
+        >>> rpc.enable_batching(max_batch_size=32, max_delay=0.0005)
+        >>> futs = [rpc.rpc_async("worker1", min, args=(i, 2)) for i in range(100)]
+        >>> results = [fut.wait() for fut in futs]
+        >>> rpc.disable_batching()
+        >>> rpc.shutdown()
+    """
+    if max_batch_size < 1:
+        raise ValueError(
+            "max_batch_size should be a positive integer, but got {}".format(max_batch_size)
+        )
+    if max_delay < 0:
+        raise ValueError("max_delay should be non-negative, but got {}".format(max_delay))
+    global _batcher
+    with _batcher_lock:
+        old_batcher, _batcher = _batcher, _RpcBatcher(max_batch_size, max_delay)
+    if old_batcher is not None:
+        old_batcher.stop()
+
+
+def disable_batching():
+    r"""
+    Disables batching of :meth:`~torch.distributed.rpc.rpc_async` calls, after
+    sending all pending batches. This is also done by
+    :meth:`~torch.distributed.rpc.shutdown`.
+    """
+    global _batcher
+    with _batcher_lock:
+        old_batcher, _batcher = _batcher, None
+    if old_batcher is not None:
+        old_batcher.stop()
+
+
 def _invoke_rpc(to, func, rpc_type, args=None, kwargs=None, rpc_timeout=UNSET_RPC_TIMEOUT):
     if not callable(func):
         raise TypeError("function should be callable.")
@@ -520,10 +735,21 @@ def _invoke_rpc(to, func, rpc_type, args=None, kwargs=None, rpc_timeout=UNSET_RP
                 dst_worker_info.name, torch.jit._qualified_name(func), args, kwargs, rpc_timeout
             )
         else:
-            (pickled_python_udf, tensors) = _default_pickler.serialize(
-                PythonUDF(func, args, kwargs)
-            )
-            fut = _invoke_rpc_python_udf(dst_worker_info, pickled_python_udf, tensors, rpc_timeout)
+            python_udf = PythonUDF(func, args, kwargs)
+            batcher = _batcher
+            fut = None
+            # Batches are sent from other threads, which do not have the
+            # calling thread's distributed autograd context.
+            if (
+                batcher is not None
+                and rpc_type == RPCExecMode.ASYNC
+                and not should_profile
+                and not dist_autograd._has_valid_context()
+            ):
+                fut = batcher.add(dst_worker_info, python_udf, rpc_timeout)
+            if fut is None:
+                (pickled_python_udf, tensors) = _default_pickler.serialize(python_udf)
+                fut = _invoke_rpc_python_udf(dst_worker_info, pickled_python_udf, tensors, rpc_timeout)
         if should_profile:
             assert torch.autograd._profiler_enabled()
             assert rf is not None
@@ -658,6 +884,10 @@ def rpc_async(to, func, args=None, kwargs=None, timeout=UNSET_RPC_TIMEOUT):
         contents of those tensors stay intact until the returned Future
         completes.
 
+    .. note ::
+        Calls of Python functions can be coalesced into fewer RPC messages
+        with :meth:`~torch.distributed.rpc.enable_batching`.
+
     Example::
         Make sure that ``MASTER_ADDRESS`` and ``MASTER_PORT`` are set properly
         on both workers. Refer to :meth:`~torch.distributed.init_process_group`
@@ -1,10 +1,13 @@
 import collections
 import copyreg
 from enum import Enum
+import importlib
 import io
 import pickle
+import struct
 import threading
 import traceback
+import types
 
 import torch
 import torch.distributed as dist
@@ -19,6 +22,30 @@ class RPCExecMode(Enum):
     ASYNC = "async"
     REMOTE = "remote"
 
+# Serialized data starting with this prefix is in the format of
+# `_InternalRPCPickler._serialize_fast`. Pickle data never starts with it, as
+# 0xff isn't a pickle opcode.
+_FAST_PATH_MAGIC = b"\xffRPC"
+
+# Codes of the values supported by `_InternalRPCPickler._serialize_fast`,
+# which are also their `struct` format characters, except for None ("n"), which
+# takes no space, strings ("s"), which are prefixed with their length, and
+# tensors ("t"), which are put into the tensor table.
+_FAST_PATH_CODES = {
+    type(None): "n",
+    bool: "?",
+    int: "q",
+    float: "d",
+    str: "s",
+    torch.Tensor: "t",
+}
+
+_FAST_PATH_HEADER = struct.Struct("<4sccIII")
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
 class _InternalRPCPickler:
     r"""
     This class provides serialize() and deserialize() interfaces to serialize
@@ -28,11 +55,23 @@ class _InternalRPCPickler:
     tables, this serialization format is consistent with builtin operator and args
     using JIT pickler. This format will make tensor handling in C++ much easier,
     e.g. attach tensor to distributed autograd graph in C++
+
+    Python UDFs of module level functions whose args are a tuple of tensors,
+    ``None``, bools, ints, floats and strings, without kwargs, as well as such
+    values and flat tuples and lists of them, are serialized without pickle
+    by :meth:`_serialize_fast`, which puts tensors into the tensor table
+    directly. Everything else is pickled, with a pickler cached per thread.
     """
 
     def __init__(self):
         self._dispatch_table = copyreg.dispatch_table.copy()
         self._dispatch_table[torch.Tensor] = self._tensor_reducer
+        # Function -> "module:qualname", or None if it can't be found by name
+        self._function_names = {}
+        # "module:qualname" -> function
+        self._functions = {}
+        # Pickler and buffer of each thread
+        self._thread_local = threading.local()
 
     @classmethod
     def _tensor_receiver(cls, tensor_index):
@@ -53,12 +92,155 @@ class _InternalRPCPickler:
         rref_fork_data = rref._serialize()
         return (_InternalRPCPickler._rref_receiver, (rref_fork_data, ))
 
-    def serialize(self, obj):
+    def _resolve_function(self, name):
+        # Subclasses may not call `__init__`
+        functions = self.__dict__.setdefault("_functions", {})
+        func = functions.get(name)
+        if func is None:
+            module_name, qualname = name.split(":")
+            func = importlib.import_module(module_name)
+            for attr in qualname.split("."):
+                func = getattr(func, attr)
+            functions[name] = func
+        return func
+
+    def _function_name(self, func):
+        function_names = self.__dict__.setdefault("_function_names", {})
+        try:
+            return function_names[func]
+        except KeyError:
+            pass
+        # Only cache module level functions, as e.g. bound methods and local
+        # functions are created anew on every access or call.
+        if not isinstance(func, (types.FunctionType, types.BuiltinFunctionType)):
+            return None
+        module_name = getattr(func, "__module__", None)
+        qualname = getattr(func, "__qualname__", None)
+        if module_name is None or qualname is None or "<" in qualname:
+            return None
+        name = "{}:{}".format(module_name, qualname)
+        try:
+            if self._resolve_function(name) is not func:
+                name = None
+        except Exception:
+            name = None
+        function_names[func] = name
+        return name
+
+    def _serialize_fast(self, obj):
         r"""
-        Serialize non tensor data into binary string, tensor data into
-        tensor table
+        Serializes ``obj`` without pickle if it's of a supported form (see the
+        class docstring), or returns None.
+
+        The format is a header (magic, kind, container, number of values,
+        number of strings and length of the function name), the codes of the
+        values, the lengths of the strings, the function name, and the values
+        packed with ``struct``.
         """
-        f = io.BytesIO()
+        func_name = b""
+        obj_type = type(obj)
+        if obj_type is PythonUDF:
+            if obj.kwargs is None:
+                kind = b"U"
+            elif type(obj.kwargs) is dict and not obj.kwargs:
+                kind = b"K"
+            else:
+                return None
+            if type(obj.args) is not tuple:
+                return None
+            name = self._function_name(obj.func)
+            if name is None:
+                return None
+            try:
+                func_name = name.encode("utf-8")
+            except UnicodeEncodeError:
+                # E.g., lone surrogates, which pickle handles
+                return None
+            container, values = b"T", obj.args
+        elif obj_type is tuple:
+            kind, container, values = b"V", b"T", obj
+        elif obj_type is list:
+            kind, container, values = b"V", b"L", obj
+        else:
+            kind, container, values = b"V", b"1", (obj,)
+
+        codes = []
+        fmt = ["<"]
+        packed_values = []
+        string_lengths = []
+        tensors = []
+        for value in values:
+            code = _FAST_PATH_CODES.get(type(value))
+            if code is None:
+                return None
+            if code == "t":
+                tensors.append(value)
+            elif code == "s":
+                try:
+                    value = value.encode("utf-8")
+                except UnicodeEncodeError:
+                    return None
+                string_lengths.append(len(value))
+                fmt.append("%ds" % len(value))
+                packed_values.append(value)
+            elif code != "n":
+                if code == "q" and not _INT64_MIN <= value <= _INT64_MAX:
+                    return None
+                fmt.append(code)
+                packed_values.append(value)
+            codes.append(code)
+
+        data = b"".join([
+            _FAST_PATH_HEADER.pack(
+                _FAST_PATH_MAGIC, kind, container, len(codes), len(string_lengths), len(func_name)),
+            "".join(codes).encode("ascii"),
+            struct.pack("<%dI" % len(string_lengths), *string_lengths),
+            func_name,
+            struct.pack("".join(fmt), *packed_values),
+        ])
+        return (data, tensors)
+
+    def _deserialize_fast(self, binary_data, tensor_table):
+        _, kind, container, num_codes, num_strings, func_name_len = \
+            _FAST_PATH_HEADER.unpack_from(binary_data)
+        offset = _FAST_PATH_HEADER.size
+        codes = binary_data[offset:offset + num_codes].decode("ascii")
+        offset += num_codes
+        string_lengths = iter(struct.unpack_from("<%dI" % num_strings, binary_data, offset))
+        offset += 4 * num_strings
+        func_name = binary_data[offset:offset + func_name_len].decode("utf-8")
+        offset += func_name_len
+
+        fmt = ["<"]
+        for code in codes:
+            if code == "s":
+                fmt.append("%ds" % next(string_lengths))
+            elif code not in "nt":
+                fmt.append(code)
+        packed_values = iter(struct.unpack_from("".join(fmt), binary_data, offset))
+        tensors = iter(tensor_table)
+        values = []
+        for code in codes:
+            if code == "n":
+                values.append(None)
+            elif code == "t":
+                values.append(next(tensors))
+            elif code == "s":
+                values.append(next(packed_values).decode("utf-8"))
+            else:
+                values.append(next(packed_values))
+
+        if container == b"1":
+            return values[0]
+        if container == b"L":
+            return values
+        values = tuple(values)
+        if kind == b"V":
+            return values
+        func = self._resolve_function(func_name)
+        return PythonUDF(func, values, None if kind == b"U" else {})
+
+    def _create_pickler(self, f):
         p = pickle.Pickler(f)
         p.dispatch_table = self._dispatch_table
 
@@ -69,7 +251,39 @@ class _InternalRPCPickler:
         # compiled yet, it is not good place to acces rpc.RRef inside _InternalRPCPickler constructor,
         # so puting rref's dispatch table here
         p.dispatch_table[dist.rpc.RRef] = self._rref_reducer
+        return p
 
+    def serialize(self, obj):
+        r"""
+        Serialize non tensor data into binary string, tensor data into
+        tensor table
+        """
+        result = self._serialize_fast(obj)
+        if result is not None:
+            return result
+
+        local = self.__dict__.get("_thread_local")
+        if local is None:
+            # Subclasses may not call `__init__`
+            local = self.__dict__.setdefault("_thread_local", threading.local())
+        if getattr(local, "in_use", False):
+            # Nested call while this thread's pickler is in use
+            f = io.BytesIO()
+            return self._dump(self._create_pickler(f), f, obj)
+
+        if not hasattr(local, "pickler"):
+            local.buffer = io.BytesIO()
+            local.pickler = self._create_pickler(local.buffer)
+        local.in_use = True
+        try:
+            local.buffer.seek(0)
+            local.buffer.truncate()
+            local.pickler.clear_memo()
+            return self._dump(local.pickler, local.buffer, obj)
+        finally:
+            local.in_use = False
+
+    def _dump(self, p, f, obj):
         # save _thread_local_tensor_tables.send_tables if it is in nested call
         global _thread_local_tensor_tables
         if hasattr(_thread_local_tensor_tables, "send_tables"):
@@ -78,15 +292,16 @@ class _InternalRPCPickler:
             old_send_tables = None
         _thread_local_tensor_tables.send_tables = []
 
-        p.dump(obj)
-
-        # restore _thread_local_tensor_tables.send_tables if return
-        # from nested call, otherwise clean up the table
-        tensors = _thread_local_tensor_tables.send_tables
-        if old_send_tables is not None:
-            _thread_local_tensor_tables.send_tables = old_send_tables
-        else:
-            del _thread_local_tensor_tables.send_tables
+        try:
+            p.dump(obj)
+        finally:
+            # restore _thread_local_tensor_tables.send_tables if return
+            # from nested call, otherwise clean up the table
+            tensors = _thread_local_tensor_tables.send_tables
+            if old_send_tables is not None:
+                _thread_local_tensor_tables.send_tables = old_send_tables
+            else:
+                del _thread_local_tensor_tables.send_tables
 
         return (f.getvalue(), tensors)
 
@@ -94,6 +309,14 @@ class _InternalRPCPickler:
         r"""
         Deserilize binary string + tensor table to original obj
         """
+        if binary_data[:len(_FAST_PATH_MAGIC)] == _FAST_PATH_MAGIC:
+            try:
+                return self._deserialize_fast(binary_data, tensor_table)
+            except AttributeError as e:
+                return AttributeError(str(e) + """ Default RPC pickler does not serialize
+            function code. Ensure that UDFs are defined on both caller and
+            callee modules.""")
+
         # save _thread_local_tensor_tables.recv_tables if it is in nested call
         global _thread_local_tensor_tables
         if hasattr(_thread_local_tensor_tables, "recv_tables"):
@@ -153,6 +376,18 @@ def _run_function(python_udf):
     return result
 
 
+def _run_batch(python_udfs):
+    r"""
+    Runs the Python UDFs of a batch of ``rpc_async`` calls, which are sent as
+    a single message when batching is enabled (see
+    ``torch.distributed.rpc.api._RpcBatcher``), in order.
+
+    Returns the list of their return values, where a ``RemoteException`` takes
+    the place of the return value of each function that raised.
+    """
+    return [_run_function(python_udf) for python_udf in python_udfs]
+
+
 def _handle_exception(result):
     if isinstance(result, RemoteException):
         raise result.exception_type(result.msg)
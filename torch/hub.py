@@ -1,6 +1,9 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
+import collections
+import concurrent.futures
 import errno
 import hashlib
+import http.client
 import os
 import re
 import shutil
@@ -10,7 +13,8 @@ import torch
 import warnings
 import zipfile
 
-from urllib.request import urlopen
+from torch.utils.file_baton import FileBaton
+from urllib.request import Request, urlopen
 from urllib.parse import urlparse  # noqa: F401
 
 try:
@@ -58,7 +62,13 @@ ENV_XDG_CACHE_HOME = 'XDG_CACHE_HOME'
 DEFAULT_CACHE_DIR = '~/.cache'
 VAR_DEPENDENCY = 'dependencies'
 MODULE_HUBCONF = 'hubconf.py'
-READ_DATA_CHUNK = 8192
+CACHED_COMMIT_FILE = 'commit'
+READ_DATA_CHUNK = 1024 * 1024
+# Lock files of processes on other hosts that have not been modified for this
+# many seconds are taken to be left behind by a killed process.
+LOCK_STALE_SECONDS = 60 * 60
+# Size of the ranges fetched by each worker of a parallel download
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 hub_dir = None
 
 
@@ -128,45 +138,131 @@ def _parse_repo_info(github):
     return repo_owner, repo_name, branch
 
 
-def _get_cache_or_reload(github, force_reload, verbose=True):
-    # Parse github repo information
-    repo_owner, repo_name, branch = _parse_repo_info(github)
-    # Github allows branch name with slash '/',
-    # this causes confusion with path on both Linux and Windows.
-    # Backslash is not allowed in Github branch name so no need to
-    # to worry about it.
-    normalized_br = branch.replace('/', '_')
-    # Github renames folder repo-v1.x.x to repo-1.x.x
-    # We don't know the repo name before downloading the zip file
-    # and inspect name from it.
-    # To check if cached repo exists, we need to normalize folder names.
-    repo_dir = os.path.join(hub_dir, '_'.join([repo_owner, repo_name, normalized_br]))
+def _get_commit_hash(repo_owner, repo_name, branch):
+    # Resolves a branch, tag or commit to the full hash of its commit
+    url = 'https://api.github.com/repos/{}/{}/commits/{}'.format(repo_owner, repo_name, branch)
+    with urlopen(Request(url, headers={'Accept': 'application/vnd.github.VERSION.sha'})) as r:
+        commit_hash = r.read().decode('ascii').strip()
+    if not re.match(r'^[0-9a-f]{40}$', commit_hash):
+        raise ValueError('unexpected commit hash: {}'.format(commit_hash))
+    return commit_hash
 
-    use_cache = (not force_reload) and os.path.exists(repo_dir)
 
-    if use_cache:
+def _read_cached_repo_dir(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CACHED_COMMIT_FILE)) as f:
+            key = f.read().strip()
+    except (IOError, OSError):
+        return None
+    repo_dir = os.path.join(cache_dir, key)
+    if not key or not os.path.isdir(repo_dir):
+        return None
+    return repo_dir
+
+
+def _update_cache(repo_owner, repo_name, branch, cache_dir, verbose):
+    # Caches of older versions held the repo itself in `cache_dir`
+    if os.path.exists(os.path.join(cache_dir, MODULE_HUBCONF)):
+        shutil.rmtree(cache_dir)
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    previous_repo_dir = _read_cached_repo_dir(cache_dir)
+
+    try:
+        key = _get_commit_hash(repo_owner, repo_name, branch)
+    except (IOError, OSError, ValueError) as e:
+        # E.g. the API is rate limited. Key the snapshot by the hash of its
+        # archive instead.
+        warnings.warn('Failed to look up the commit of {}/{}:{} ({}), downloading the repo'
+                      .format(repo_owner, repo_name, branch, e))
+        key = None
+
+    if key is not None and os.path.isdir(os.path.join(cache_dir, key)):
         if verbose:
-            sys.stderr.write('Using cache found in {}\n'.format(repo_dir))
+            sys.stderr.write('Using cache found in {}\n'.format(os.path.join(cache_dir, key)))
     else:
-        cached_file = os.path.join(hub_dir, normalized_br + '.zip')
-        _remove_if_exists(cached_file)
-
+        cached_file = os.path.join(cache_dir, (key or 'archive') + '.zip')
         url = _git_archive_link(repo_owner, repo_name, branch)
         sys.stderr.write('Downloading: \"{}\" to {}\n'.format(url, cached_file))
-        download_url_to_file(url, cached_file, progress=False)
-
-        with zipfile.ZipFile(cached_file) as cached_zipfile:
-            extraced_repo_name = cached_zipfile.infolist()[0].filename
-            extracted_repo = os.path.join(hub_dir, extraced_repo_name)
-            _remove_if_exists(extracted_repo)
-            # Unzip the code and rename the base folder
-            cached_zipfile.extractall(hub_dir)
+        try:
+            download_url_to_file(url, cached_file, progress=False)
+            if key is None:
+                sha256 = hashlib.sha256()
+                with open(cached_file, 'rb') as f:
+                    for buffer in iter(lambda: f.read(READ_DATA_CHUNK), b''):
+                        sha256.update(buffer)
+                key = 'sha256_' + sha256.hexdigest()
+
+            repo_dir = os.path.join(cache_dir, key)
+            if not os.path.isdir(repo_dir):
+                # Extract into a temporary directory, and rename the base
+                # folder, so that the snapshot only appears once complete.
+                extract_dir = tempfile.mkdtemp(dir=cache_dir)
+                try:
+                    with zipfile.ZipFile(cached_file) as cached_zipfile:
+                        extraced_repo_name = cached_zipfile.infolist()[0].filename.split('/')[0]
+                        cached_zipfile.extractall(extract_dir)
+                    os.rename(os.path.join(extract_dir, extraced_repo_name), repo_dir)
+                finally:
+                    shutil.rmtree(extract_dir)
+        finally:
+            _remove_if_exists(cached_file)
+
+    # Point the cache to the snapshot
+    fd, commit_file = tempfile.mkstemp(dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        f.write(key)
+    os.replace(commit_file, os.path.join(cache_dir, CACHED_COMMIT_FILE))
+
+    # Remove older snapshots (and temporary directories left behind by
+    # interrupted updates), keeping the previous one for processes that may
+    # still be using it.
+    keep = {key}
+    if previous_repo_dir is not None:
+        keep.add(os.path.basename(previous_repo_dir))
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return os.path.join(cache_dir, key)
 
-        _remove_if_exists(cached_file)
-        _remove_if_exists(repo_dir)
-        shutil.move(extracted_repo, repo_dir)  # rename the repo
 
-    return repo_dir
+def _get_cache_or_reload(github, force_reload, verbose=True):
+    # Parse github repo information
+    repo_owner, repo_name, branch = _parse_repo_info(github)
+    # Github allows branch name with slash '/',
+    # this causes confusion with path on both Linux and Windows.
+    # Backslash is not allowed in Github branch name so no need to
+    # to worry about it.
+    normalized_br = branch.replace('/', '_')
+    # The cache of a branch holds snapshots of the repo, each in a directory
+    # named after its commit hash, and a file with the name of the latest
+    # snapshot. Snapshots are never modified once they are complete, so
+    # processes can keep using one while the cache is updated; each update
+    # keeps the snapshot it replaces and removes older ones. Updates are
+    # serialized by a lock file next to the cache, and processes that wait
+    # for another one's update use its result instead of updating again. The
+    # lock file of a process killed while updating is removed by the next
+    # process waiting for it (see LOCK_STALE_SECONDS).
+    cache_dir = os.path.join(hub_dir, '_'.join([repo_owner, repo_name, normalized_br]))
+
+    while True:
+        if not force_reload:
+            repo_dir = _read_cached_repo_dir(cache_dir)
+            if repo_dir is not None:
+                if verbose:
+                    sys.stderr.write('Using cache found in {}\n'.format(repo_dir))
+                return repo_dir
+
+        baton = FileBaton(cache_dir + '.lock', stale_seconds=LOCK_STALE_SECONDS)
+        if baton.try_acquire():
+            try:
+                return _update_cache(repo_owner, repo_name, branch, cache_dir, verbose)
+            finally:
+                baton.release()
+        # Another process is updating the cache
+        baton.wait()
+        force_reload = False
 
 
 def _check_module_exists(name):
@@ -261,8 +357,8 @@ def list(github, force_reload=False):
         github (string): a string with format "repo_owner/repo_name[:tag_name]" with an optional
             tag/branch. The default branch is `master` if not specified.
             Example: 'pytorch/vision[:hub]'
-        force_reload (bool, optional): whether to discard the existing cache and force a fresh download.
-            Default is `False`.
+        force_reload (bool, optional): whether to look up the latest commit of the branch, and download
+            it unless it's cached already, instead of using the cache. Default is `False`.
     Returns:
         entrypoints: a list of available entrypoint names
 
@@ -295,8 +391,8 @@ def help(github, model, force_reload=False):
             tag/branch. The default branch is `master` if not specified.
             Example: 'pytorch/vision[:hub]'
         model (string): a string of entrypoint name defined in repo's hubconf.py
-        force_reload (bool, optional): whether to discard the existing cache and force a fresh download.
-            Default is `False`.
+        force_reload (bool, optional): whether to look up the latest commit of the branch, and download
+            it unless it's cached already, instead of using the cache. Default is `False`.
     Example:
         >>> print(torch.hub.help('pytorch/vision', 'resnet18', force_reload=True))
     """
@@ -330,8 +426,8 @@ def load(github, model, *args, **kwargs):
             Example: 'pytorch/vision[:hub]'
         model (string): a string of entrypoint name defined in repo's hubconf.py
         *args (optional): the corresponding args for callable `model`.
-        force_reload (bool, optional): whether to force a fresh download of github repo unconditionally.
-            Default is `False`.
+        force_reload (bool, optional): whether to look up the latest commit of the branch, and download
+            it unless it's cached already, instead of using the cache. Default is `False`.
         verbose (bool, optional): If False, mute messages about hitting local caches. Note that the message
             about first download is cannot be muted.
             Default is `True`.
@@ -366,9 +462,104 @@ def load(github, model, *args, **kwargs):
     return model
 
 
-def download_url_to_file(url, dst, hash_prefix=None, progress=True):
+def _urlopen_range(url, start=0, end=None):
+    # Requests bytes [start, end) of the object at `url`. Servers that don't
+    # support ranges respond with the whole object and status 200 instead of
+    # 206.
+    headers = {}
+    if start > 0 or end is not None:
+        headers['Range'] = 'bytes={}-{}'.format(start, '' if end is None else end - 1)
+    return urlopen(Request(url, headers=headers))
+
+
+def _get_content_length(meta):
+    if hasattr(meta, 'getheaders'):
+        content_length = meta.getheaders("Content-Length")
+    else:
+        content_length = meta.get_all("Content-Length")
+    if content_length is not None and len(content_length) > 0:
+        return int(content_length[0])
+    return None
+
+
+def _download_sequential(url, u, f, on_data, file_size, accepts_ranges, max_retries):
+    retries = 0
+    while True:
+        try:
+            while True:
+                buffer = u.read(READ_DATA_CHUNK)
+                if len(buffer) == 0:
+                    break
+                f.write(buffer)
+                on_data(buffer)
+            if file_size is None or f.tell() >= file_size:
+                return
+            raise IOError('connection closed after {} of {} bytes'.format(f.tell(), file_size))
+        except (IOError, http.client.HTTPException):
+            if not accepts_ranges or retries >= max_retries:
+                raise
+            retries += 1
+        finally:
+            u.close()
+        # Resume where the failed request stopped
+        u = _urlopen_range(url, f.tell())
+        if u.getcode() != 206:
+            u.close()
+            raise IOError('server did not resume the download of {}'.format(url))
+
+
+def _download_range(url, start, end, max_retries):
+    retries = 0
+    while True:
+        try:
+            u = _urlopen_range(url, start, end)
+            try:
+                if u.getcode() != 206:
+                    raise IOError('server ignored the range request for {}'.format(url))
+                data = u.read(end - start)
+            finally:
+                u.close()
+            if len(data) == end - start:
+                return data
+            raise IOError('got {} of {} bytes of a range'.format(len(data), end - start))
+        except (IOError, http.client.HTTPException):
+            if retries >= max_retries:
+                raise
+            retries += 1
+
+
+def _download_parallel(url, f, on_data, file_size, num_workers, max_retries):
+    # Ranges are fetched concurrently, but written and hashed in order, as
+    # soon as all ranges before them have arrived. At most 2 * num_workers
+    # ranges are held in memory.
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(num_workers) as executor:
+        try:
+            for start in range(0, file_size, DOWNLOAD_CHUNK_SIZE):
+                end = min(start + DOWNLOAD_CHUNK_SIZE, file_size)
+                pending.append(executor.submit(_download_range, url, start, end, max_retries))
+                if len(pending) >= 2 * num_workers:
+                    data = pending.popleft().result()
+                    f.write(data)
+                    on_data(data)
+            while pending:
+                data = pending.popleft().result()
+                f.write(data)
+                on_data(data)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def download_url_to_file(url, dst, hash_prefix=None, progress=True, num_workers=1, max_retries=3):
     r"""Download object at the given URL to a local path.
 
+    If ``hash_prefix`` is given, the SHA256 hash is computed while
+    downloading, so the file is not read again to check it. If the server
+    supports range requests, a download that fails midway is resumed from
+    where it stopped, and with ``num_workers > 1``, ranges of the file are
+    fetched in parallel.
+
     Args:
         url (string): URL of the object to download
         dst (string): Full path where object will be saved, e.g. `/tmp/temporary_file`
@@ -376,22 +567,20 @@ def download_url_to_file(url, dst, hash_prefix=None, progress=True):
             Default: None
         progress (bool, optional): whether or not to display a progress bar to stderr
             Default: True
+        num_workers (int, optional): number of concurrent range requests, if the server supports them.
+            Default: 1
+        max_retries (int, optional): number of times a failed request is resumed or retried, if the
+            server supports range requests.
+            Default: 3
 
     Example:
         >>> torch.hub.download_url_to_file('https://s3.amazonaws.com/pytorch/models/resnet18-5c106cde.pth', '/tmp/temporary_file')
 
     """
-    file_size = None
-    # We use a different API for python2 since urllib(2) doesn't recognize the CA
-    # certificates in older Python
     u = urlopen(url)
     meta = u.info()
-    if hasattr(meta, 'getheaders'):
-        content_length = meta.getheaders("Content-Length")
-    else:
-        content_length = meta.get_all("Content-Length")
-    if content_length is not None and len(content_length) > 0:
-        file_size = int(content_length[0])
+    file_size = _get_content_length(meta)
+    accepts_ranges = (meta.get('Accept-Ranges') or '').strip().lower() == 'bytes'
 
     # We deliberately save it in a temp file and move it after
     # download is complete. This prevents a local working checkpoint
@@ -405,15 +594,19 @@ def download_url_to_file(url, dst, hash_prefix=None, progress=True):
             sha256 = hashlib.sha256()
         with tqdm(total=file_size, disable=not progress,
                   unit='B', unit_scale=True, unit_divisor=1024) as pbar:
-            while True:
-                buffer = u.read(8192)
-                if len(buffer) == 0:
-                    break
-                f.write(buffer)
+
+            def on_data(buffer):
                 if hash_prefix is not None:
                     sha256.update(buffer)
                 pbar.update(len(buffer))
 
+            if num_workers > 1 and accepts_ranges and file_size is not None and \
+                    file_size > DOWNLOAD_CHUNK_SIZE:
+                u.close()
+                _download_parallel(url, f, on_data, file_size, num_workers, max_retries)
+            else:
+                _download_sequential(url, u, f, on_data, file_size, accepts_ranges, max_retries)
+
         f.close()
         if hash_prefix is not None:
             digest = sha256.hexdigest()
@@ -432,7 +625,8 @@ def _download_url_to_file(url, dst, hash_prefix=None, progress=True):
             _download_url_to_file will be removed in after 1.3 release')
     download_url_to_file(url, dst, hash_prefix, progress)
 
-def load_state_dict_from_url(url, model_dir=None, map_location=None, progress=True, check_hash=False):
+def load_state_dict_from_url(url, model_dir=None, map_location=None, progress=True, check_hash=False,
+                             num_workers=1, mmap=False):
     r"""Loads the Torch serialized object at the given URL.
 
     If downloaded file is a zip file, it will be automatically
@@ -456,6 +650,20 @@ def load_state_dict_from_url(url, model_dir=None, map_location=None, progress=Tr
             digits of the SHA256 hash of the contents of the file. The hash is used to
             ensure unique names and to verify the contents of the file.
             Default: False
+        num_workers (int, optional): number of concurrent range requests of the download, if the server
+            supports them. See :func:`download_url_to_file`.
+            Default: 1
+        mmap (bool, optional): whether to memory-map checkpoints saved by :func:`torch.save` in the zipfile
+            format straight from the cached file instead of reading them into memory (see the :attr:`mmap`
+            argument of :func:`torch.load`). It is ignored for checkpoints in the legacy format.
+            Default: False
+
+    .. note::
+        Processes that load the same URL into the same `model_dir` at the same time share a single
+        download: one of them downloads (and verifies) the file, while the others wait for it. If a
+        process is killed while downloading, the ``.lock`` file it leaves next to the cached file is
+        removed by the next process on the same host, or, from other hosts sharing `model_dir`, once it
+        is older than ``torch.hub.LOCK_STALE_SECONDS``.
 
     Example:
         >>> state_dict = torch.hub.load_state_dict_from_url('https://s3.amazonaws.com/pytorch/models/resnet18-5c106cde.pth')
@@ -482,21 +690,56 @@ def load_state_dict_from_url(url, model_dir=None, map_location=None, progress=Tr
     parts = urlparse(url)
     filename = os.path.basename(parts.path)
     cached_file = os.path.join(model_dir, filename)
-    if not os.path.exists(cached_file):
-        sys.stderr.write('Downloading: "{}" to {}\n'.format(url, cached_file))
-        hash_prefix = HASH_REGEX.search(filename).group(1) if check_hash else None
-        download_url_to_file(url, cached_file, hash_prefix, progress=progress)
+    while not os.path.exists(cached_file):
+        baton = FileBaton(cached_file + '.lock', stale_seconds=LOCK_STALE_SECONDS)
+        if baton.try_acquire():
+            try:
+                # The file may have been downloaded by another process since
+                # we last checked.
+                if not os.path.exists(cached_file):
+                    sys.stderr.write('Downloading: "{}" to {}\n'.format(url, cached_file))
+                    hash_prefix = HASH_REGEX.search(filename).group(1) if check_hash else None
+                    download_url_to_file(url, cached_file, hash_prefix, progress=progress,
+                                         num_workers=num_workers)
+            finally:
+                baton.release()
+        else:
+            # Another process is downloading the file. If it fails, we try
+            # ourselves.
+            baton.wait()
 
     # Note: extractall() defaults to overwrite file if exists. No need to clean up beforehand.
     #       We deliberately don't handle tarfile here since our legacy serialization format was in tar.
     #       E.g. resnet18-5c106cde.pth which is widely used.
-    if zipfile.is_zipfile(cached_file):
+    #       Checkpoints written by torch.save in the zipfile format are zip files too, but hold more than one
+    #       record; they are loaded as they are.
+    if _is_legacy_zip_format(cached_file):
         with zipfile.ZipFile(cached_file) as cached_zipfile:
             members = cached_zipfile.infolist()
-            if len(members) != 1:
-                raise RuntimeError('Only one file(not dir) is allowed in the zipfile')
             cached_zipfile.extractall(model_dir)
             extraced_name = members[0].filename
             cached_file = os.path.join(model_dir, extraced_name)
 
-    return torch.load(cached_file, map_location=map_location)
+    return torch.load(cached_file, map_location=map_location, mmap=mmap and _can_mmap(cached_file))
+
+
+def _is_legacy_zip_format(filename):
+    # A zip file wrapping a single checkpoint, as opposed to a checkpoint
+    # written by torch.save in the zipfile format.
+    if not zipfile.is_zipfile(filename):
+        return False
+    with zipfile.ZipFile(filename) as f:
+        members = f.infolist()
+    if len(members) == 1 and not members[0].filename.endswith('/'):
+        return True
+    if any(member.filename.endswith('/data.pkl') for member in members):
+        return False
+    raise RuntimeError('Only one file(not dir) is allowed in the zipfile')
+
+
+def _can_mmap(filename):
+    # Only checkpoints in the zipfile format can be mapped. The cached file is
+    # only ever replaced by renaming a new download over it, so mappings of it
+    # stay valid.
+    with open(filename, 'rb') as f:
+        return torch.serialization._is_zipfile(f)
@@ -1151,7 +1151,12 @@ class Module(object):
 
         for p in self.parameters():
             if p.grad is not None:
-                p.grad.detach_()
+                if p.grad.grad_fn is not None:
+                    p.grad.detach_()
+                else:
+                    # may be a view, e.g. into a flat gradient buffer,
+                    # which cannot be detached in place
+                    p.grad.requires_grad_(False)
                 p.grad.zero_()
 
     def share_memory(self):
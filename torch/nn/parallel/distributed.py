@@ -10,6 +10,8 @@ import torch.distributed as dist
 if dist.is_available():
     from torch.distributed.distributed_c10d import _get_default_group
 
+from torch._utils import _unflatten_dense_tensors
+from torch.autograd import Variable
 from ..modules import Module
 from .replicate import replicate
 from .scatter_gather import scatter_kwargs, gather
@@ -30,6 +32,129 @@ def _find_tensors(obj):
     return []
 
 
+class _CommHookReducer(object):
+    r"""
+    Reduces gradients with a communication hook registered with
+    :meth:`DistributedDataParallel.register_comm_hook`, in place of the
+    default reducer. Like it, this launches the hook for each bucket as soon as
+    all gradients of the bucket are ready, in the same bucket order on all
+    processes, and writes the results back to the gradients at the end of the
+    backward pass.
+    """
+    def __init__(self, parameters, bucket_indices, state, hook):
+        self.parameters = parameters
+        self.bucket_indices = bucket_indices
+        self.state = state
+        self.hook = hook
+        self.bucket_of_parameter = {}
+        for bucket_index, indices in enumerate(bucket_indices):
+            for index in indices:
+                self.bucket_of_parameter[index] = bucket_index
+        self.expect_autograd_hooks = False
+
+        # Keep the grad accumulators alive, so that the hooks registered on
+        # them are run in all iterations.
+        self.grad_accumulators = []
+        for index, parameter in enumerate(parameters):
+            grad_accumulator = parameter.expand_as(parameter).grad_fn.next_functions[0][0]
+            grad_accumulator.register_hook(self._make_autograd_hook(index))
+            self.grad_accumulators.append(grad_accumulator)
+
+    def prepare_for_backward(self, outputs):
+        if self.expect_autograd_hooks:
+            raise RuntimeError(
+                "Expected to have finished reduction in the prior iteration before "
+                "starting a new one. This error indicates that your module has "
+                "parameters that were not used in producing loss. You can enable "
+                "unused parameter detection by passing the keyword argument "
+                "`find_unused_parameters=True` to "
+                "`torch.nn.parallel.DistributedDataParallel`; otherwise, make sure "
+                "all `forward` function outputs participate in calculating loss.")
+        self.expect_autograd_hooks = True
+        self.pending = [len(indices) for indices in self.bucket_indices]
+        self.ready = [False] * len(self.parameters)
+        self.futures = [None] * len(self.bucket_indices)
+        self.next_bucket = 0
+        self.callback_queued = False
+        self.unused_parameters = []
+        if outputs:
+            used = self._find_used_parameters(outputs)
+            self.unused_parameters = [
+                index for index, parameter in enumerate(self.parameters) if id(parameter) not in used]
+
+    @staticmethod
+    def _find_used_parameters(outputs):
+        # Returns the ids of the leaf variables the graph of `outputs` reaches.
+        used = set()
+        seen = set()
+        stack = [output.grad_fn for output in outputs if output.grad_fn is not None]
+        while stack:
+            fn = stack.pop()
+            if fn in seen:
+                continue
+            seen.add(fn)
+            if hasattr(fn, 'variable'):
+                used.add(id(fn.variable))
+            stack.extend(next_fn for next_fn, _ in fn.next_functions if next_fn is not None)
+        return used
+
+    def _make_autograd_hook(self, index):
+        def autograd_hook(*unused):
+            if not self.expect_autograd_hooks:
+                return
+            if not self.callback_queued:
+                self.callback_queued = True
+                Variable._execution_engine.queue_callback(self._finalize_backward)
+                # Parameters that are not part of the graph are ready right
+                # away, with zero gradients.
+                for unused_index in self.unused_parameters:
+                    self._mark_parameter_ready(unused_index)
+            self._mark_parameter_ready(index)
+        return autograd_hook
+
+    def _mark_parameter_ready(self, index):
+        if self.ready[index]:
+            raise RuntimeError(
+                "Expected to mark a variable ready only once. This error is caused by "
+                "use of a module parameter outside the `forward` function.")
+        self.ready[index] = True
+        bucket_index = self.bucket_of_parameter[index]
+        self.pending[bucket_index] -= 1
+        # Buckets are reduced in order, so that the collectives that hooks
+        # launch match across processes.
+        while self.next_bucket < len(self.bucket_indices) and self.pending[self.next_bucket] == 0:
+            self._launch_bucket(self.next_bucket)
+            self.next_bucket += 1
+
+    def _launch_bucket(self, bucket_index):
+        from torch.distributed.algorithms.ddp_comm_hooks import GradBucket
+        parameters = [self.parameters[index] for index in self.bucket_indices[bucket_index]]
+        tensor = torch.cat([
+            (parameter.grad if parameter.grad is not None else torch.zeros_like(parameter)).reshape(-1)
+            for parameter in parameters])
+        self.futures[bucket_index] = self.hook(self.state, GradBucket(bucket_index, tensor, parameters))
+
+    def _finalize_backward(self):
+        self.expect_autograd_hooks = False
+        if self.next_bucket < len(self.bucket_indices):
+            raise RuntimeError(
+                "Expected to have gradients for all parameters at the end of the "
+                "backward pass, but some were not computed. You can enable unused "
+                "parameter detection by passing the keyword argument "
+                "`find_unused_parameters=True` to "
+                "`torch.nn.parallel.DistributedDataParallel`.")
+        with torch.no_grad():
+            for bucket_index, future in enumerate(self.futures):
+                result = future.wait()
+                parameters = [self.parameters[index] for index in self.bucket_indices[bucket_index]]
+                for parameter, grad in zip(parameters, _unflatten_dense_tensors(result, parameters)):
+                    if parameter.grad is None:
+                        parameter.grad = grad
+                    else:
+                        parameter.grad.copy_(grad)
+        self.futures = None
+
+
 class DistributedDataParallel(Module):
     r"""Implements distributed data parallelism that is based on
     ``torch.distributed`` package at the module level.
@@ -166,6 +291,15 @@ class DistributedDataParallel(Module):
         broadcast_buffers (bool): flag that enables syncing (broadcasting) buffers of
                           the module at beginning of the forward function.
                           (default: ``True``)
+        defer_buffer_sync (bool): if ``True``, buffers (and, for single-process
+                                  multi-device modules, parameters of the
+                                  replicas) are not synchronized in the forward
+                                  function, but only when
+                                  :meth:`sync_module_states` is called, which
+                                  should be once per optimizer step. This saves
+                                  a broadcast for every forward pass when
+                                  accumulating gradients over several
+                                  micro-batches. (default: ``False``)
         process_group: the process group to be used for distributed data
                        all-reduction. If ``None``, the default process group, which
                        is created by ```torch.distributed.init_process_group```,
@@ -212,7 +346,7 @@ class DistributedDataParallel(Module):
                  output_device=None, dim=0, broadcast_buffers=True,
                  process_group=None, bucket_cap_mb=25,
                  find_unused_parameters=False,
-                 check_reduction=False):
+                 check_reduction=False, defer_buffer_sync=False):
 
         super(DistributedDataParallel, self).__init__()
 
@@ -259,6 +393,7 @@ class DistributedDataParallel(Module):
         self.dim = dim
         self.module = module
         self.broadcast_buffers = broadcast_buffers
+        self.defer_buffer_sync = defer_buffer_sync
         self.find_unused_parameters = find_unused_parameters
         self.require_backward_grad_sync = True
         self.require_forward_param_sync = True
@@ -392,6 +527,15 @@ class DistributedDataParallel(Module):
             self.process_group,
             expect_sparse_gradient)
 
+        # Used in place of the reducer once a communication hook is registered
+        self._bucket_parameters = parameters[0]
+        self._bucket_indices = list(reversed(bucket_indices))
+        self._expect_sparse_gradient = expect_sparse_gradient
+        self._comm_hook_reducer = None
+        # Once the reducer has been prepared for a backward pass, a hook can
+        # no longer replace it.
+        self._forward_called = False
+
         # passing a handle to torch.nn.SyncBatchNorm layer
         self._passing_sync_batchnorm_handle(self._module_copies)
 
@@ -400,6 +544,7 @@ class DistributedDataParallel(Module):
         attrs = copy.copy(self.__dict__)
         del attrs['process_group']
         del attrs['reducer']
+        del attrs['_comm_hook_reducer']
         return attrs
 
     def __setstate__(self, state):
@@ -408,6 +553,7 @@ class DistributedDataParallel(Module):
         super(DistributedDataParallel, self).__setstate__(state)
         self.__dict__.setdefault('require_forward_param_sync', True)
         self.__dict__.setdefault('require_backward_grad_sync', True)
+        self.__dict__.setdefault('defer_buffer_sync', False)
         self._ddp_init_helper()
 
     def _check_default_group(self):
@@ -448,8 +594,108 @@ class DistributedDataParallel(Module):
         finally:
             self.require_backward_grad_sync = old_require_backward_grad_sync
 
+    def register_comm_hook(self, state, hook):
+        r"""
+        Registers a communication hook, which replaces the all-reduce that
+        averages the gradients across processes, e.g., to compress them. See
+        :mod:`torch.distributed.algorithms.ddp_comm_hooks` for built-in hooks.
+
+        The hook is called as ``hook(state, bucket)`` for each
+        :class:`~torch.distributed.algorithms.ddp_comm_hooks.GradBucket` of
+        gradients as soon as they have all been computed during the backward
+        pass, in the same order on all processes. It should launch its
+        collectives asynchronously, and return a
+        :class:`~torch.distributed.algorithms.ddp_comm_hooks.CommFuture`,
+        whose result is written to the gradients of the bucket at the end of
+        the backward pass.
+
+        Arguments:
+            state (object): Passed to the hook on every call, e.g., the process
+                group, or an object holding state across iterations, such as
+                the error feedback of compression hooks.
+            hook (callable): The communication hook.
+
+        .. warning::
+            A hook can only be registered once, before the first forward pass.
+            It is not supported with multiple devices per process or sparse
+            gradients, and it is not preserved when the module is pickled.
+
+        Example::
+
+            >>> from torch.distributed.algorithms.ddp_comm_hooks import fp16_compress_hook
+            >>> ddp = torch.nn.parallel.DistributedDataParallel(model, process_group=pg)
+            >>> ddp.register_comm_hook(pg, fp16_compress_hook)
+        """
+        if self._comm_hook_reducer is not None:
+            raise RuntimeError("register_comm_hook can only be called once")
+        if self._forward_called:
+            raise RuntimeError("register_comm_hook must be called before the first forward pass")
+        if self.device_ids and len(self.device_ids) > 1:
+            raise RuntimeError("Communication hooks are not supported with multiple devices per process")
+        if any(self._expect_sparse_gradient[0]):
+            raise RuntimeError("Communication hooks are not supported with sparse gradients")
+        self._comm_hook_reducer = _CommHookReducer(
+            self._bucket_parameters, self._bucket_indices, state, hook)
+
+    def sync_module_states(self):
+        r"""
+        Broadcasts the buffers of the module from the process with rank 0 to
+        all other processes, and, for single-process multi-device modules, the
+        parameters and buffers of the module to its replicas on the other
+        devices, with one coalesced broadcast each. This must be called on all
+        processes.
+
+        With ``defer_buffer_sync=True``, this is the only place where buffers
+        and replicas are synchronized, and it should be called after every
+        optimizer step, so that all micro-batches of an accumulation window
+        are computed with the same states. Otherwise, it can be used to
+        synchronize buffers outside of the forward pass, e.g., before
+        evaluating or saving the model.
+
+        Example::
+
+            >>> ddp = torch.nn.parallel.DistributedDataParallel(model, pg, defer_buffer_sync=True)
+            >>> for micro_batches in batches:
+            ...     with ddp.no_sync():
+            ...         for input in micro_batches[:-1]:
+            ...             ddp(input).sum().backward()  # no broadcast, no all-reduce
+            ...     ddp(micro_batches[-1]).sum().backward()  # all-reduce gradients
+            ...     optimizer.step()
+            ...     optimizer.zero_grad()
+            ...     ddp.sync_module_states()  # broadcast buffers once per step
+        """
+        with torch.no_grad():
+            if self.broadcast_buffers and len(self.modules_buffers[0]) > 0:
+                # The process with rank 0 is considered the authoritative copy.
+                self._distributed_broadcast_coalesced(
+                    self.modules_buffers[0],
+                    self.broadcast_bucket_size)
+
+            if self.device_ids and len(self.device_ids) > 1:
+                # Parameters and buffers go to the replicas in one broadcast,
+                # instead of one for each as in `_sync_params`.
+                num_params = len(self.modules_params[0])
+                states = list(self.modules_params[0])
+                if self.broadcast_buffers:
+                    states += self.modules_buffers[0]
+                result = torch.cuda.comm.broadcast_coalesced(
+                    states,
+                    self.device_ids,
+                    self.broadcast_bucket_size)
+                for tensors, module_params, module_buffers in zip(
+                        result[1:], self.modules_params[1:], self.modules_buffers[1:]):
+                    for tensor, param in zip(tensors[:num_params], module_params):
+                        param.set_(tensor)
+                        # See `_sync_params`.
+                        if param.grad is not None:
+                            param.grad.detach_()
+                            param.grad.zero_()
+                    for tensor, buffer in zip(tensors[num_params:], module_buffers):
+                        buffer.set_(tensor)
+
     def forward(self, *inputs, **kwargs):
-        if self.require_forward_param_sync:
+        self._forward_called = True
+        if self.require_forward_param_sync and not self.defer_buffer_sync:
             self._sync_params()
 
         if self.device_ids:
@@ -469,10 +715,14 @@ class DistributedDataParallel(Module):
             # because we need to figure out which parameters were used during
             # this forward pass, to ensure we short circuit reduction for any
             # unused parameters. Only if `find_unused_parameters` is set.
+            if self._comm_hook_reducer is not None:
+                reducer = self._comm_hook_reducer
+            else:
+                reducer = self.reducer
             if self.find_unused_parameters:
-                self.reducer.prepare_for_backward(list(_find_tensors(output)))
+                reducer.prepare_for_backward(list(_find_tensors(output)))
             else:
-                self.reducer.prepare_for_backward([])
+                reducer.prepare_for_backward([])
         else:
             self.require_forward_param_sync = False
 
@@ -1,5 +1,5 @@
 from ..modules import Module
-from typing import Any, Optional, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 from .common_types import _devices_t, _device_t
 
 T_co = TypeVar('T_co', covariant=True)
@@ -13,6 +13,7 @@ class DistributedDataParallel(Module[T_co]):
     output_device: _device_t = ...
     broadcast_buffers: bool = ...
     check_reduction: bool = ...
+    defer_buffer_sync: bool = ...
     broadcast_bucket_size: float = ...
     bucket_bytes_cap: float = ...
 
@@ -20,7 +21,11 @@ class DistributedDataParallel(Module[T_co]):
     def __init__(self, module: Module[T_co], device_ids: Optional[_devices_t] = ...,
                  output_device: Optional[_device_t] = ..., dim: int = ...,
                  broadcast_buffers: bool = ..., process_group: Optional[Any] = ..., bucket_cap_mb: float = ...,
-                 check_reduction: bool = ...) -> None: ...
+                 check_reduction: bool = ..., defer_buffer_sync: bool = ...) -> None: ...
+
+    def register_comm_hook(self, state: Any, hook: Callable[[Any, Any], Any]) -> None: ...
+
+    def sync_module_states(self) -> None: ...
 
     def forward(self, *inputs: Any, **kwargs: Any) -> T_co: ...
 
@@ -0,0 +1,192 @@
+r"""Helpers for the multi-tensor (``foreach=True``) implementations of the
+optimizers in :mod:`torch.optim`.
+
+In this mode, an optimizer splits the parameters of a param group that have a
+gradient into buckets of the same device and dtype, and applies its update to
+each bucket with a few elementwise operations over 1D buffers that hold all
+tensors of the bucket back to back, instead of several small operations per
+parameter. Elementwise operations on such a buffer are equivalent to operating
+on each tensor individually, so results are identical to the per-parameter
+implementation.
+
+Optimizer state tensors are kept as views into these buffers, so that
+``state_dict()`` and ``load_state_dict()`` work exactly as before.
+
+If the parameters themselves have been packed into such buffers by
+:meth:`Optimizer.flatten_parameters`, their gradients are moved into one as
+well, and the update of a whole bucket is applied to the parameter buffer at
+once.
+"""
+
+from collections import OrderedDict
+
+import torch
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
+
+
+def _group_by_device_and_dtype(params, key_fn=None):
+    r"""Splits ``params`` into lists of parameters with the same device and
+    dtype, and, if given, the same value of ``key_fn(param)``."""
+    buckets = OrderedDict()
+    for p in params:
+        key = (p.device, p.dtype)
+        if key_fn is not None:
+            key += (key_fn(p),)
+        buckets.setdefault(key, []).append(p)
+    return list(buckets.values())
+
+
+def _flatten(tensors):
+    r"""Returns a 1D tensor with the values of ``tensors`` back to back.
+
+    .. warning:: If ``tensors`` has a single contiguous element, the result is
+        a view of it rather than a copy, so it must not be modified in place.
+    """
+    return _flatten_dense_tensors(tensors)
+
+
+def _unflatten(flat, tensors):
+    r"""Views ``flat`` as a list of tensors with the shapes of ``tensors``."""
+    return _unflatten_dense_tensors(flat, tensors)
+
+
+def _flat_state_cache(optimizer):
+    # Not part of `Optimizer.__getstate__`, so it is dropped when the optimizer
+    # is pickled or copied, and rebuilt on the next step.
+    return optimizer.__dict__.setdefault('_flat_state_cache', {})
+
+
+def _set_flat_state(optimizer, params, name, flat):
+    r"""Makes ``optimizer.state[p][name]`` of each of ``params`` a view into
+    the 1D tensor ``flat``."""
+    cache = _flat_state_cache(optimizer)
+    ids = tuple(id(p) for p in params)
+    # Drop buffers of other buckets sharing some of these parameters, as their
+    # state is not a view into them anymore.
+    for key in list(cache.keys()):
+        if key[0] == name and not set(key[1:]).isdisjoint(ids):
+            del cache[key]
+    views = _unflatten(flat, params)
+    for p, view in zip(params, views):
+        optimizer.state[p][name] = view
+    cache[(name,) + ids] = (flat, [view.data_ptr() for view in views])
+
+
+def _get_flat_state(optimizer, params, name):
+    r"""Returns a 1D tensor holding ``optimizer.state[p][name]`` of each of
+    ``params`` back to back, with those state entries being views into it.
+    Missing entries are initialized to zeros.
+
+    The buffer is cached across steps, and is only rebuilt (copying the
+    current values) if the state entries are not views into it anymore, e.g.,
+    after ``load_state_dict()``.
+    """
+    cache = _flat_state_cache(optimizer)
+    key = (name,) + tuple(id(p) for p in params)
+    if key in cache:
+        flat, data_ptrs = cache[key]
+        # The cache keeps `flat` alive, so no other tensor can be allocated at
+        # these addresses.
+        if all(name in optimizer.state[p] and optimizer.state[p][name].data_ptr() == data_ptr
+               for p, data_ptr in zip(params, data_ptrs)):
+            return flat
+
+    if all(name not in optimizer.state[p] for p in params):
+        flat = torch.zeros(sum(p.numel() for p in params), dtype=params[0].dtype, device=params[0].device)
+    else:
+        flat = torch.cat([
+            optimizer.state[p][name].reshape(-1) if name in optimizer.state[p] else p.new_zeros(p.numel())
+            for p in params])
+    _set_flat_state(optimizer, params, name, flat)
+    return flat
+
+
+class _FlatParams(object):
+    r"""A buffer holding a bucket of parameters back to back, as created by
+    :meth:`Optimizer.flatten_parameters`, and the one of their gradients."""
+    __slots__ = ['params', 'param_ptrs', 'grads', 'grad_ptrs']
+
+    def __init__(self, params, param_ptrs):
+        self.params = params
+        self.param_ptrs = param_ptrs
+        self.grads = None
+        self.grad_ptrs = None
+
+
+def _flat_param_buffers(optimizer):
+    # Like `_flat_state_cache`, this is dropped when the optimizer is pickled
+    # or copied, after which parameters are updated one by one again.
+    return optimizer.__dict__.setdefault('_flat_param_buffers', {})
+
+
+def _flatten_parameters(optimizer):
+    buffers = _flat_param_buffers(optimizer)
+    for group in optimizer.param_groups:
+        for bucket in _group_by_device_and_dtype(group['params']):
+            flat = torch.cat([p.detach().reshape(-1) for p in bucket])
+            views = _unflatten(flat, bucket)
+            for p, view in zip(bucket, views):
+                p.data = view
+            buffers[tuple(id(p) for p in bucket)] = _FlatParams(flat, [view.data_ptr() for view in views])
+            if all(p.grad is not None and not p.grad.is_sparse for p in bucket):
+                _get_flat_grads(optimizer, bucket)
+        if 'foreach' in group:
+            group['foreach'] = True
+
+
+def _find_flat_params(optimizer, params):
+    buffers = _flat_param_buffers(optimizer)
+    key = tuple(id(p) for p in params)
+    entry = buffers.get(key)
+    if entry is None:
+        return None
+    if [p.data_ptr() for p in params] != entry.param_ptrs:
+        # Some parameter data has been reassigned since.
+        del buffers[key]
+        return None
+    return entry
+
+
+def _get_flat_params(optimizer, params):
+    r"""Returns a 1D tensor with the values of ``params`` back to back. This is
+    their flat buffer if they have one, or else a copy, so it must not be
+    modified in place."""
+    entry = _find_flat_params(optimizer, params)
+    if entry is None:
+        return _flatten(params)
+    return entry.params
+
+
+def _get_flat_grads(optimizer, params):
+    r"""Returns a 1D tensor with the (dense) gradients of ``params`` back to
+    back. This must not be modified in place.
+
+    If ``params`` have a flat buffer, their gradients are moved into one as
+    well the first time (and whenever they have been replaced since, e.g., set
+    to ``None`` and recomputed), so that later backward passes accumulate
+    into it in place.
+    """
+    grads = [p.grad for p in params]
+    entry = _find_flat_params(optimizer, params)
+    if entry is None:
+        return _flatten(grads)
+    if entry.grads is None or [g.data_ptr() for g in grads] != entry.grad_ptrs:
+        flat = torch.cat([g.reshape(-1) for g in grads])
+        views = _unflatten(flat, params)
+        for p, view in zip(params, views):
+            p.grad = view
+        entry.grads = flat
+        entry.grad_ptrs = [view.data_ptr() for view in views]
+    return entry.grads
+
+
+def _update_params(optimizer, params, update, *flat_tensors):
+    r"""Calls ``update(param, *tensors)`` once on the flat buffer of ``params``
+    and the 1D ``flat_tensors`` if the parameters have one, or else on each
+    parameter and the matching views of ``flat_tensors``."""
+    entry = _find_flat_params(optimizer, params)
+    if entry is not None:
+        update(entry.params, *flat_tensors)
+    else:
+        for p, *tensors in zip(params, *(_unflatten(t, params) for t in flat_tensors)):
+            update(p, *tensors)
@@ -1,6 +1,8 @@
 import math
 import torch
 from .optimizer import Optimizer
+from ._multi_tensor import (_group_by_device_and_dtype, _get_flat_params, _get_flat_grads, _get_flat_state,
+                            _update_params)
 
 
 class Adam(Optimizer):
@@ -20,6 +22,10 @@ class Adam(Optimizer):
         amsgrad (boolean, optional): whether to use the AMSGrad variant of this
             algorithm from the paper `On the Convergence of Adam and Beyond`_
             (default: False)
+        foreach (boolean, optional): whether to use the multi-tensor
+            implementation, which updates all parameters of a group that share
+            a device and dtype with a few operations on flattened buffers,
+            instead of several operations per parameter (default: False)
 
     .. _Adam\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -28,7 +34,7 @@ class Adam(Optimizer):
     """
 
     def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8,
-                 weight_decay=0, amsgrad=False):
+                 weight_decay=0, amsgrad=False, foreach=False):
         if not 0.0 <= lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if not 0.0 <= eps:
@@ -40,13 +46,14 @@ class Adam(Optimizer):
         if not 0.0 <= weight_decay:
             raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
         defaults = dict(lr=lr, betas=betas, eps=eps,
-                        weight_decay=weight_decay, amsgrad=amsgrad)
+                        weight_decay=weight_decay, amsgrad=amsgrad, foreach=foreach)
         super(Adam, self).__init__(params, defaults)
 
     def __setstate__(self, state):
         super(Adam, self).__setstate__(state)
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
+            group.setdefault('foreach', False)
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -62,6 +69,10 @@ class Adam(Optimizer):
                 loss = closure()
 
         for group in self.param_groups:
+            if group['foreach']:
+                self._multi_tensor_step(group)
+                continue
+
             for p in group['params']:
                 if p.grad is None:
                     continue
@@ -111,3 +122,46 @@ class Adam(Optimizer):
                 p.addcdiv_(exp_avg, denom, value=-step_size)
 
         return loss
+
+    def _multi_tensor_step(self, group):
+        params = [p for p in group['params'] if p.grad is not None]
+        for p in params:
+            if p.grad.is_sparse:
+                raise RuntimeError('Adam does not support sparse gradients, please consider SparseAdam instead')
+            state = self.state[p]
+            if len(state) == 0:
+                state['step'] = 0
+            state['step'] += 1
+
+        amsgrad = group['amsgrad']
+        beta1, beta2 = group['betas']
+
+        # Parameters in a bucket share the bias corrections as well.
+        for bucket in _group_by_device_and_dtype(params, lambda p: self.state[p]['step']):
+            step = self.state[bucket[0]]['step']
+            bias_correction1 = 1 - beta1 ** step
+            bias_correction2 = 1 - beta2 ** step
+
+            grad = _get_flat_grads(self, bucket)
+            if group['weight_decay'] != 0:
+                grad = grad.add(_get_flat_params(self, bucket), alpha=group['weight_decay'])
+
+            exp_avg = _get_flat_state(self, bucket, 'exp_avg')
+            exp_avg_sq = _get_flat_state(self, bucket, 'exp_avg_sq')
+
+            # Decay the first and second moment running average coefficient
+            exp_avg.mul_(beta1).add_(grad, alpha=1 - beta1)
+            exp_avg_sq.mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+            if amsgrad:
+                max_exp_avg_sq = _get_flat_state(self, bucket, 'max_exp_avg_sq')
+                # Maintains the maximum of all 2nd moment running avg. till now
+                torch.max(max_exp_avg_sq, exp_avg_sq, out=max_exp_avg_sq)
+                # Use the max. for normalizing running avg. of gradient
+                denom = (max_exp_avg_sq.sqrt() / math.sqrt(bias_correction2)).add_(group['eps'])
+            else:
+                denom = (exp_avg_sq.sqrt() / math.sqrt(bias_correction2)).add_(group['eps'])
+
+            step_size = group['lr'] / bias_correction1
+
+            _update_params(self, bucket, lambda p, exp_avg, denom: p.addcdiv_(exp_avg, denom, value=-step_size),
+                           exp_avg, denom)
@@ -4,6 +4,7 @@ from torch._six import container_abcs
 import torch
 from copy import deepcopy
 from itertools import chain
+from ._multi_tensor import _flatten_parameters
 
 
 class _RequiredParameter(object):
@@ -156,12 +157,46 @@ class Optimizer(object):
             update_group(g, ng) for g, ng in zip(groups, saved_groups)]
         self.__setstate__({'state': state, 'param_groups': param_groups})
 
+    def flatten_parameters(self):
+        r"""Packs the parameters of each parameter group into contiguous buffers.
+
+        The parameters of each group are split by device and dtype, and each
+        such bucket is copied into a single 1D buffer, the original parameters
+        becoming views into it. Once all parameters of a bucket have a (dense)
+        gradient, the gradients are moved into one buffer as well, into which
+        later backward passes accumulate in place. For optimizers with a
+        multi-tensor implementation (see their ``foreach`` argument, which this
+        turns on), the optimizer state is kept in such buffers too, and each
+        bucket is updated with a handful of large elementwise operations.
+
+        :meth:`state_dict` and :meth:`load_state_dict` keep their usual
+        per-parameter format.
+
+        .. note::
+            Reassigning the ``.data`` of a parameter afterwards (e.g., by moving
+            the model to another device) makes its bucket fall back to per
+            parameter updates. Setting gradients to ``None`` makes them be
+            moved into a new buffer at the next :meth:`step`.
+
+        .. note::
+            A bucket is only updated through its flat buffers at a
+            :meth:`step` where every parameter in it has a gradient. Otherwise
+            (e.g., some parameters were unused in the backward pass) it
+            silently falls back to per parameter updates for that step.
+        """
+        _flatten_parameters(self)
+
     def zero_grad(self):
         r"""Clears the gradients of all optimized :class:`torch.Tensor` s."""
         for group in self.param_groups:
             for p in group['params']:
                 if p.grad is not None:
-                    p.grad.detach_()
+                    if p.grad.grad_fn is not None:
+                        p.grad.detach_()
+                    else:
+                        # may be a view, e.g. into a flat gradient buffer,
+                        # which cannot be detached in place
+                        p.grad.requires_grad_(False)
                     p.grad.zero_()
 
     def step(self, closure):
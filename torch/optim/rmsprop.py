@@ -1,5 +1,7 @@
 import torch
 from .optimizer import Optimizer
+from ._multi_tensor import (_group_by_device_and_dtype, _get_flat_params, _get_flat_grads, _get_flat_state,
+                            _update_params)
 
 
 class RMSprop(Optimizer):
@@ -28,10 +30,15 @@ class RMSprop(Optimizer):
         centered (bool, optional) : if ``True``, compute the centered RMSProp,
             the gradient is normalized by an estimation of its variance
         weight_decay (float, optional): weight decay (L2 penalty) (default: 0)
+        foreach (bool, optional): whether to use the multi-tensor
+            implementation, which updates all parameters of a group that share
+            a device and dtype with a few operations on flattened buffers,
+            instead of several operations per parameter (default: False)
 
     """
 
-    def __init__(self, params, lr=1e-2, alpha=0.99, eps=1e-8, weight_decay=0, momentum=0, centered=False):
+    def __init__(self, params, lr=1e-2, alpha=0.99, eps=1e-8, weight_decay=0, momentum=0, centered=False,
+                 foreach=False):
         if not 0.0 <= lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if not 0.0 <= eps:
@@ -43,7 +50,8 @@ class RMSprop(Optimizer):
         if not 0.0 <= alpha:
             raise ValueError("Invalid alpha value: {}".format(alpha))
 
-        defaults = dict(lr=lr, momentum=momentum, alpha=alpha, eps=eps, centered=centered, weight_decay=weight_decay)
+        defaults = dict(lr=lr, momentum=momentum, alpha=alpha, eps=eps, centered=centered, weight_decay=weight_decay,
+                        foreach=foreach)
         super(RMSprop, self).__init__(params, defaults)
 
     def __setstate__(self, state):
@@ -51,6 +59,7 @@ class RMSprop(Optimizer):
         for group in self.param_groups:
             group.setdefault('momentum', 0)
             group.setdefault('centered', False)
+            group.setdefault('foreach', False)
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -66,6 +75,10 @@ class RMSprop(Optimizer):
                 loss = closure()
 
         for group in self.param_groups:
+            if group['foreach']:
+                self._multi_tensor_step(group)
+                continue
+
             for p in group['params']:
                 if p.grad is None:
                     continue
@@ -108,3 +121,38 @@ class RMSprop(Optimizer):
                     p.addcdiv_(grad, avg, value=-group['lr'])
 
         return loss
+
+    def _multi_tensor_step(self, group):
+        params = [p for p in group['params'] if p.grad is not None]
+        for p in params:
+            if p.grad.is_sparse:
+                raise RuntimeError('RMSprop does not support sparse gradients')
+            state = self.state[p]
+            if len(state) == 0:
+                state['step'] = 0
+            state['step'] += 1
+
+        alpha = group['alpha']
+
+        for bucket in _group_by_device_and_dtype(params):
+            grad = _get_flat_grads(self, bucket)
+            if group['weight_decay'] != 0:
+                grad = grad.add(_get_flat_params(self, bucket), alpha=group['weight_decay'])
+
+            square_avg = _get_flat_state(self, bucket, 'square_avg')
+            square_avg.mul_(alpha).addcmul_(grad, grad, value=1 - alpha)
+
+            if group['centered']:
+                grad_avg = _get_flat_state(self, bucket, 'grad_avg')
+                grad_avg.mul_(alpha).add_(grad, alpha=1 - alpha)
+                avg = square_avg.addcmul(grad_avg, grad_avg, value=-1).sqrt_().add_(group['eps'])
+            else:
+                avg = square_avg.sqrt().add_(group['eps'])
+
+            if group['momentum'] > 0:
+                buf = _get_flat_state(self, bucket, 'momentum_buffer')
+                buf.mul_(group['momentum']).addcdiv_(grad, avg)
+                _update_params(self, bucket, lambda p, buf: p.add_(buf, alpha=-group['lr']), buf)
+            else:
+                _update_params(self, bucket, lambda p, grad, avg: p.addcdiv_(grad, avg, value=-group['lr']),
+                               grad, avg)
@@ -1,5 +1,7 @@
 import torch
 from .optimizer import Optimizer, required
+from ._multi_tensor import (_group_by_device_and_dtype, _get_flat_params, _get_flat_grads, _get_flat_state,
+                            _set_flat_state, _update_params)
 
 
 class SGD(Optimizer):
@@ -16,6 +18,11 @@ class SGD(Optimizer):
         weight_decay (float, optional): weight decay (L2 penalty) (default: 0)
         dampening (float, optional): dampening for momentum (default: 0)
         nesterov (bool, optional): enables Nesterov momentum (default: False)
+        foreach (bool, optional): whether to use the multi-tensor implementation,
+            which updates all parameters of a group that share a device and
+            dtype with a few operations on flattened buffers, instead of several
+            operations per parameter. Sparse gradients are still handled one by
+            one (default: False)
 
     Example:
         >>> optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
@@ -53,7 +60,7 @@ class SGD(Optimizer):
     """
 
     def __init__(self, params, lr=required, momentum=0, dampening=0,
-                 weight_decay=0, nesterov=False):
+                 weight_decay=0, nesterov=False, foreach=False):
         if lr is not required and lr < 0.0:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if momentum < 0.0:
@@ -62,7 +69,7 @@ class SGD(Optimizer):
             raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
 
         defaults = dict(lr=lr, momentum=momentum, dampening=dampening,
-                        weight_decay=weight_decay, nesterov=nesterov)
+                        weight_decay=weight_decay, nesterov=nesterov, foreach=foreach)
         if nesterov and (momentum <= 0 or dampening != 0):
             raise ValueError("Nesterov momentum requires a momentum and zero dampening")
         super(SGD, self).__init__(params, defaults)
@@ -71,6 +78,7 @@ class SGD(Optimizer):
         super(SGD, self).__setstate__(state)
         for group in self.param_groups:
             group.setdefault('nesterov', False)
+            group.setdefault('foreach', False)
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -94,6 +102,9 @@ class SGD(Optimizer):
             for p in group['params']:
                 if p.grad is None:
                     continue
+                if group['foreach'] and not p.grad.is_sparse:
+                    # dense gradients are handled by `_multi_tensor_step` below
+                    continue
                 d_p = p.grad
                 if weight_decay != 0:
                     d_p = d_p.add(p, alpha=weight_decay)
@@ -111,4 +122,38 @@ class SGD(Optimizer):
 
                 p.add_(d_p, alpha=-group['lr'])
 
+            if group['foreach']:
+                self._multi_tensor_step(group)
+
         return loss
+
+    def _multi_tensor_step(self, group):
+        weight_decay = group['weight_decay']
+        momentum = group['momentum']
+        dampening = group['dampening']
+        nesterov = group['nesterov']
+
+        params = [p for p in group['params'] if p.grad is not None and not p.grad.is_sparse]
+        # Momentum buffers are created from the first gradient, so parameters
+        # with and without one are updated separately.
+
+        def has_buffer(p):
+            return momentum != 0 and 'momentum_buffer' in self.state[p]
+
+        for bucket in _group_by_device_and_dtype(params, has_buffer):
+            d_p = _get_flat_grads(self, bucket)
+            if weight_decay != 0:
+                d_p = d_p.add(_get_flat_params(self, bucket), alpha=weight_decay)
+            if momentum != 0:
+                if not has_buffer(bucket[0]):
+                    buf = torch.clone(d_p).detach()
+                    _set_flat_state(self, bucket, 'momentum_buffer', buf)
+                else:
+                    buf = _get_flat_state(self, bucket, 'momentum_buffer')
+                    buf.mul_(momentum).add_(d_p, alpha=1 - dampening)
+                if nesterov:
+                    d_p = d_p.add(buf, alpha=momentum)
+                else:
+                    d_p = buf
+
+            _update_params(self, bucket, lambda p, d_p: p.add_(d_p, alpha=-group['lr']), d_p)
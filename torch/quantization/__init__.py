@@ -17,7 +17,7 @@ def default_eval_fn(model, calib_data):
 _all__ = [
     'QuantWrapper', 'QuantStub', 'DeQuantStub',
     # Top level API for eager mode quantization
-    'quantize',
+    'quantize', 'quantize_parallel',
     # Sub functions used by eager mode quantization
     'prepare', 'convert',
     # Sub functions for `prepare` and `swap_module`
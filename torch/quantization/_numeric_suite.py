@@ -1,5 +1,8 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import math
+import time
+
 import torch
 import torch.nn as nn
 import torch.nn.quantized as nnq
@@ -150,6 +153,29 @@ class OutputLogger(Logger):
         return x
 
 
+class SensitivityLogger(Logger):
+    r"""Class used in Shadow module to accumulate the power of the outputs of
+    the shadow module and of their difference from the outputs of the original
+    module, which are used to compute the SQNR of the original module, and the
+    time spent in both modules (see :func:`compare_model_sensitivity`).
+    """
+
+    def __init__(self):
+        super(SensitivityLogger, self).__init__()
+        self.stats["signal"] = 0.0
+        self.stats["noise"] = 0.0
+        self.stats["float_time"] = 0.0
+        self.stats["quantized_time"] = 0.0
+
+    def forward(self, x, y):
+        if x.is_quantized:
+            x = x.dequantize()
+        x = x.detach().to(torch.double)
+        y = y.detach().to(torch.double)
+        self.stats["signal"] += y.pow(2).sum().item()
+        self.stats["noise"] += (y - x).pow(2).sum().item()
+
+
 class Shadow(nn.Module):
     r"""Shadow module attaches the float module to its matching quantized module
     as the shadow. Then it uses Logger module to process the outputs of both
@@ -382,3 +408,150 @@ def compare_model_outputs(
     q_model(data)
     act_compare_dict = get_matching_activations(float_model, q_model, Logger)
     return act_compare_dict
+
+
+_FUNCTIONAL_METHODS = ["add", "add_scalar", "mul", "mul_scalar", "cat", "add_relu"]
+
+
+def _add_timing_hooks(module, stats, key):
+    r"""Adds the time spent in the forward calls of module, and in the calls of
+    the methods of FloatFunctional and QFunctional modules, which Shadow calls
+    instead of forward, to stats[key]."""
+    start_times = []
+
+    def pre_hook(mod, input):
+        start_times.append(time.perf_counter())
+
+    def hook(mod, input, output):
+        stats[key] += time.perf_counter() - start_times.pop()
+
+    module.register_forward_pre_hook(pre_hook)
+    module.register_forward_hook(hook)
+
+    def timed(method):
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            output = method(*args, **kwargs)
+            stats[key] += time.perf_counter() - start_time
+            return output
+        return wrapper
+
+    if isinstance(module, (nnq.FloatFunctional, nnq.QFunctional)):
+        for name in _FUNCTIONAL_METHODS:
+            # The instance attribute takes precedence over the method
+            setattr(module, name, timed(getattr(module, name)))
+
+
+def compare_model_sensitivity(
+    float_model, q_model, module_swap_list, data, Logger=SensitivityLogger
+):
+    r"""Measure the quantization error and the latency of each quantized module
+    in a model whose float module type is in module_swap_list, and of its
+    floating point counterpart. Return a dict with key corresponding to module
+    names and each entry being a dictionary with the keys 'sqnr', the signal to
+    quantization noise ratio of the outputs of the quantized module in dB,
+    'float_time' and 'quantized_time', the time spent in the float and
+    quantized module in seconds. This dict can be used to select the modules to
+    quantize (see :func:`select_qconfig_dict`).
+
+    This function calls prepare_model_with_stubs() to attach the float modules
+    as the shadow of the quantized modules, so that both get the same input,
+    and runs q_model on each input in data. Forward calls of the modules, and
+    the calls of FloatFunctional and QFunctional methods such as add, are
+    timed.
+
+    Example usage:
+        module_swap_list = [torchvision.models.quantization.resnet.QuantizableBasicBlock]
+        sensitivity_dict = compare_model_sensitivity(float_model, qmodel, module_swap_list, data)
+        for key in sensitivity_dict:
+            print(key, sensitivity_dict[key]['sqnr'], sensitivity_dict[key]['quantized_time'])
+
+    Args:
+        float_model: float model used to generate the q_model
+        q_model: model quantized from float_model, which is modified in-place
+        module_swap_list: list of float module types at which shadow modules will
+            be attached.
+        data: iterable of inputs of q_model, e.g. a list of tensors
+        Logger: type of logger to be used in shadow module, which needs to
+            accumulate the same stats as SensitivityLogger
+
+    Return:
+        sensitivity_dict: dict with key corresponding to module names and each
+        entry being a dictionary with keys 'sqnr', 'float_time' and
+        'quantized_time'
+    """
+    prepare_model_with_stubs(float_model, q_model, module_swap_list, Logger)
+    shadows = {}
+    for name, mod in q_model.named_modules():
+        if isinstance(mod, Shadow):
+            shadows[name] = mod
+            _add_timing_hooks(mod.orig_module, mod.logger.stats, "quantized_time")
+            _add_timing_hooks(mod.shadow_module, mod.logger.stats, "float_time")
+
+    with torch.no_grad():
+        for x in data:
+            q_model(x)
+
+    sensitivity_dict = {}
+    for name, mod in shadows.items():
+        stats = mod.logger.stats
+        if stats["noise"] == 0:
+            sqnr = float("inf")
+        elif stats["signal"] == 0:
+            sqnr = float("-inf")
+        else:
+            sqnr = 10 * math.log10(stats["signal"] / stats["noise"])
+        sensitivity_dict[name] = {
+            "sqnr": sqnr,
+            "float_time": stats["float_time"],
+            "quantized_time": stats["quantized_time"],
+        }
+    return sensitivity_dict
+
+
+def select_qconfig_dict(sensitivity_dict, qconfig, min_sqnr):
+    r"""Select the modules to quantize so that the time saved by quantizing
+    them is maximized, while the estimated SQNR of the model stays above
+    min_sqnr. Return a qconfig_dict that maps the names of the selected modules
+    to qconfig, and the names of the other modules to None, which can be
+    passed to propagate_qconfig_() before preparing the float model.
+
+    The noise to signal ratios of the quantized modules, as measured by
+    compare_model_sensitivity(), are assumed to add up. Modules are selected
+    greedily in the order of the time they save per noise they add, and are
+    skipped if they don't save time or would exceed the budget. Modules that
+    are kept in float and take quantized inputs need to be wrapped, e.g. by
+    add_quant_dequant().
+
+    Example usage:
+        sensitivity_dict = compare_model_sensitivity(float_model, qmodel, module_swap_list, data)
+        qconfig_dict = select_qconfig_dict(sensitivity_dict, qconfig, min_sqnr=30)
+        propagate_qconfig_(float_model, qconfig_dict)
+
+    Args:
+        sensitivity_dict: dict returned by compare_model_sensitivity()
+        qconfig: quantization configuration of the selected modules
+        min_sqnr: minimum estimated SQNR of the model in dB
+
+    Return:
+        qconfig_dict: dict with key corresponding to module names and each
+        entry being either qconfig or None
+    """
+    candidates = []
+    for name, v in sensitivity_dict.items():
+        saved_time = v["float_time"] - v["quantized_time"]
+        if saved_time <= 0:
+            continue
+        noise = 10 ** (-v["sqnr"] / 10)
+        priority = saved_time / noise if noise > 0 else float("inf")
+        candidates.append((priority, name, noise))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+
+    budget = 10 ** (-min_sqnr / 10)
+    total_noise = 0.0
+    qconfig_dict = {name: None for name in sensitivity_dict}
+    for _, name, noise in candidates:
+        if total_noise + noise <= budget:
+            total_noise += noise
+            qconfig_dict[name] = qconfig
+    return qconfig_dict
@@ -1,6 +1,5 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import math
 import warnings
 from abc import ABCMeta, abstractmethod
 from functools import partial
@@ -74,6 +73,26 @@ class ObserverBase(ABC, nn.Module):
     def get_qparams(self, **kwargs):
         pass
 
+    def merge_(self, other):
+        r"""Merges the statistics recorded by ``other``, an observer of the same
+        type and configuration, into this observer, as if this observer had
+        also observed the inputs of ``other``.
+
+        This allows to calibrate copies of a model on different parts of the
+        calibration data, e.g. in different processes, and to combine their
+        statistics afterwards (see :func:`~torch.quantization.quantize_parallel`).
+        Observers whose statistics can't be combined raise
+        ``NotImplementedError``.
+
+        Args:
+            other: observer whose statistics are merged
+
+        Return:
+            This observer.
+        """
+        raise NotImplementedError(
+            "{} does not support merging statistics".format(type(self).__name__))
+
     with_args = classmethod(_with_args)
 
 
@@ -299,6 +318,22 @@ class MinMaxObserver(_ObserverBase):
         self.max_val.copy_(max_val)
         return x_orig
 
+    def merge_(self, other):
+        r"""Merges the running minimum and maximum of ``other`` into this observer."""
+        if other.min_val.numel() == 0 or other.max_val.numel() == 0:
+            return self
+        if self.min_val.numel() == 0 or self.max_val.numel() == 0:
+            min_val = other.min_val
+            max_val = other.max_val
+        else:
+            min_val = torch.min(self.min_val, other.min_val)
+            max_val = torch.max(self.max_val, other.max_val)
+        self.min_val.resize_(min_val.shape)
+        self.max_val.resize_(max_val.shape)
+        self.min_val.copy_(min_val)
+        self.max_val.copy_(max_val)
+        return self
+
     @torch.jit.export
     def calculate_qparams(self):
         r"""Calculates the quantization parameters."""
@@ -393,6 +428,13 @@ class MovingAverageMinMaxObserver(MinMaxObserver):
         self.max_val.copy_(max_val)
         return x_orig
 
+    def merge_(self, other):
+        r"""Moving averages depend on the order of the inputs, so they can't be
+        merged."""
+        raise NotImplementedError(
+            "{} does not support merging statistics, as moving averages depend on "
+            "the order of the inputs".format(type(self).__name__))
+
 
 class MinMaxDynamicQuantObserver(MinMaxObserver):
     r"""Observer module for computing the quantization parameters based on the
@@ -588,6 +630,23 @@ class PerChannelMinMaxObserver(_ObserverBase):
         self.max_vals.copy_(max_vals)
         return x_orig
 
+    def merge_(self, other):
+        r"""Merges the running per channel minimums and maximums of ``other``
+        into this observer."""
+        if other.min_vals.numel() == 0 or other.max_vals.numel() == 0:
+            return self
+        if self.min_vals.numel() == 0 or self.max_vals.numel() == 0:
+            min_vals = other.min_vals
+            max_vals = other.max_vals
+        else:
+            min_vals = torch.min(self.min_vals, other.min_vals)
+            max_vals = torch.max(self.max_vals, other.max_vals)
+        self.min_vals.resize_(min_vals.shape)
+        self.max_vals.resize_(max_vals.shape)
+        self.min_vals.copy_(min_vals)
+        self.max_vals.copy_(max_vals)
+        return self
+
     @torch.jit.export
     def calculate_qparams(self):
         return self._calculate_qparams(self.min_vals, self.max_vals)
@@ -674,6 +733,35 @@ class MovingAveragePerChannelMinMaxObserver(PerChannelMinMaxObserver):
         self.max_vals.copy_(max_vals)
         return x_orig
 
+    def merge_(self, other):
+        r"""Moving averages depend on the order of the inputs, so they can't be
+        merged."""
+        raise NotImplementedError(
+            "{} does not support merging statistics, as moving averages depend on "
+            "the order of the inputs".format(type(self).__name__))
+
+_histogram_search_bounds_cache = {}
+
+
+def _histogram_search_bounds(stepsize):
+    r"""Returns the lower and upper bounds of the quantiles that
+    :meth:`HistogramObserver._non_linear_param_search` considers after any
+    number of steps of size ``stepsize``, as lists of Python floats
+    accumulated step by step, and the upper bounds as float and double
+    tensors, to search through them at once.
+    """
+    if stepsize not in _histogram_search_bounds_cache:
+        num_steps = int(1.0 / stepsize) + 2
+        alphas = [0.0]
+        betas = [1.0]
+        for _ in range(num_steps):
+            alphas.append(alphas[-1] + stepsize)
+            betas.append(betas[-1] - stepsize)
+        _histogram_search_bounds_cache[stepsize] = (
+            alphas, betas, torch.tensor(betas, dtype=torch.float), torch.tensor(betas, dtype=torch.double))
+    return _histogram_search_bounds_cache[stepsize]
+
+
 class HistogramObserver(_ObserverBase):
     r"""
     The module records the running histogram of tensor values along with
@@ -738,57 +826,43 @@ class HistogramObserver(_ObserverBase):
                 ) / 3
             return density * norm
 
+        src_bin = torch.arange(self.bins, dtype=torch.double, device=self.histogram.device)
+        src_bin_width = (self.max_val.item() - self.min_val.item()) / self.bins
+        density = self.histogram.to(torch.double) / src_bin_width
+
         def _compute_quantization_error(next_start_bin, next_end_bin, norm_type):
             r"""
             Compute the quantization error if we use start_bin to end_bin as the
             min and max to do the quantization.
-            """
-            bin_width = (self.max_val.item() - self.min_val.item()) / self.bins
 
-            norm = 0.0
-            dst_bin_width = bin_width * (next_end_bin - next_start_bin + 1) / self.dst_nbins
+            This is computed for all source bins at once.
+            """
+            dst_bin_width = src_bin_width * (next_end_bin - next_start_bin + 1) / self.dst_nbins
             if dst_bin_width == 0.0:
                 return 0.0
-            for src_bin in range(self.bins):
-                # distances from the beginning of first dst_bin to the beginning and
-                # end of src_bin
-                src_bin_begin = (src_bin - next_start_bin) * bin_width
-                src_bin_end = src_bin_begin + bin_width
-
-                # which dst_bins the beginning and end of src_bin belong to?
-                dst_bin_of_begin = min(
-                    self.dst_nbins - 1, max(0.0, math.floor(src_bin_begin / dst_bin_width))
-                )
-                dst_bin_of_end = min(
-                    self.dst_nbins - 1, max(0.0, math.floor(src_bin_end / dst_bin_width))
-                )
-                dst_bin_of_begin_center = (
-                    dst_bin_of_begin * dst_bin_width + dst_bin_width / 2
-                )
-
-                density = self.histogram[src_bin] / bin_width
-                if dst_bin_of_begin == dst_bin_of_end:
-                    # if src_bin is entirely within 1 dst_bin
-                    delta_begin = src_bin_begin - dst_bin_of_begin_center
-                    delta_end = src_bin_end - dst_bin_of_begin_center
-                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
-                else:
-                    delta_begin = src_bin_begin - dst_bin_of_begin_center
-                    delta_end = dst_bin_width / 2
-                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
-
-                    norm = norm + (dst_bin_of_end - dst_bin_of_begin - 1) * _get_norm(
-                        -dst_bin_width / 2, dst_bin_width / 2, density, norm_type
-                    )
-
-                    dst_bin_of_end_center = (
-                        dst_bin_of_end * dst_bin_width + dst_bin_width / 2
-                    )
-
-                    delta_begin = -dst_bin_width / 2
-                    delta_end = src_bin_end - dst_bin_of_end_center
-                    norm = norm + _get_norm(delta_begin, delta_end, density, norm_type)
-            return norm
+            # distances from the beginning of first dst_bin to the beginning and
+            # end of each src_bin
+            src_bin_begin = (src_bin - next_start_bin) * src_bin_width
+            src_bin_end = src_bin_begin + src_bin_width
+
+            # which dst_bins the beginning and end of each src_bin belong to?
+            dst_bin_of_begin = torch.clamp(torch.floor(src_bin_begin / dst_bin_width), 0, self.dst_nbins - 1)
+            dst_bin_of_end = torch.clamp(torch.floor(src_bin_end / dst_bin_width), 0, self.dst_nbins - 1)
+            dst_bin_of_begin_center = dst_bin_of_begin * dst_bin_width + dst_bin_width / 2
+            dst_bin_of_end_center = dst_bin_of_end * dst_bin_width + dst_bin_width / 2
+            # whether each src_bin is entirely within 1 dst_bin
+            within_one = dst_bin_of_begin == dst_bin_of_end
+
+            delta_begin = src_bin_begin - dst_bin_of_begin_center
+            delta_end = torch.where(within_one, src_bin_end - dst_bin_of_begin_center,
+                                    torch.full_like(src_bin_end, dst_bin_width / 2))
+            norm = _get_norm(delta_begin, delta_end, density, norm_type)
+
+            spanning_norm = (dst_bin_of_end - dst_bin_of_begin - 1) * _get_norm(
+                -dst_bin_width / 2, dst_bin_width / 2, density, norm_type
+            ) + _get_norm(-dst_bin_width / 2, src_bin_end - dst_bin_of_end_center, density, norm_type)
+            norm = norm + torch.where(within_one, torch.zeros_like(norm), spanning_norm)
+            return norm.sum().item()
 
         assert self.histogram.size()[0] == self.bins, "bins mistmatch"
         bin_width = (self.max_val - self.min_val) / self.bins
@@ -798,24 +872,24 @@ class HistogramObserver(_ObserverBase):
         cSum = torch.cumsum(self.histogram, dim=0)
 
         stepsize = 1e-5  # granularity
-        alpha = 0.0  # lower bound
-        beta = 1.0  # upper bound
+        # The lower and upper bounds after any number of steps
+        alphas, betas, betas_float, betas_double = _histogram_search_bounds(stepsize)
+        alpha_steps = 0
+        beta_steps = 0
         start_bin = 0
         end_bin = self.bins - 1
         norm_min = float("inf")
 
-        while alpha < beta:
+        while alphas[alpha_steps] < betas[beta_steps]:
             # Find the next step
-            next_alpha = alpha + stepsize
-            next_beta = beta - stepsize
+            next_alpha = alphas[alpha_steps + 1]
+            next_beta = betas[beta_steps + 1]
 
-            # find the left and right bins between the quantile bounds
-            l = start_bin
-            r = end_bin
-            while l < end_bin and cSum[l] < next_alpha * total:
-                l = l + 1
-            while r > start_bin and cSum[r] > next_beta * total:
-                r = r - 1
+            # find the left and right bins between the quantile bounds. cSum
+            # is non-decreasing, so these are the numbers of bins from
+            # start_bin and end_bin inwards that are beyond the bounds.
+            l = start_bin + int(torch.sum(cSum[start_bin:end_bin] < next_alpha * total))
+            r = end_bin - int(torch.sum(cSum[start_bin + 1:end_bin + 1] > next_beta * total))
 
             # decide the next move
             next_start_bin = start_bin
@@ -823,13 +897,22 @@ class HistogramObserver(_ObserverBase):
             if (l - start_bin) > (end_bin - r):
                 # move the start bin
                 next_start_bin = l
-                alpha = next_alpha
+                alpha_steps += 1
             else:
                 # move the end bin
                 next_end_bin = r
-                beta = next_beta
+                beta_steps += 1
 
             if next_start_bin == start_bin and next_end_bin == end_bin:
+                # Until the end bin moves, only the upper bound does, so skip
+                # to the step where the end bin moves or the bounds meet.
+                remaining_betas = betas_float[beta_steps + 1:]
+                if end_bin > start_bin:
+                    steps_until_move = int(torch.sum(remaining_betas * total.item() >= cSum[end_bin].item()))
+                else:
+                    steps_until_move = remaining_betas.numel()
+                steps_until_met = int(torch.sum(betas_double[beta_steps:] > alphas[alpha_steps]))
+                beta_steps += min(steps_until_move, steps_until_met)
                 continue
 
             # calculate the quantization error using next_start_bin and next_end_bin
@@ -866,24 +949,33 @@ class HistogramObserver(_ObserverBase):
     @torch.jit.ignore
     def _combine_histograms(self, orig_hist, new_hist, upsample_rate, downsample_rate, start_idx, Nbins):
         # type: (Tensor, Tensor, int, int, int, int) -> Tensor
-        # First up-sample the histogram with new data by a factor of L
-        # This creates an approximate probability density thats piecwise constant
-        upsampled_histogram = new_hist.repeat_interleave(upsample_rate)
-        # Now insert the upsampled histogram into the output
-        # histogram, which is initialized with zeros.
-        # The offset at which the histogram is introduced is determined
-        # by the start index as the output histogram can cover a wider range
-        histogram_with_output_range = torch.zeros((Nbins * downsample_rate), device=orig_hist.device)
-        histogram_with_output_range[start_idx:Nbins * upsample_rate + start_idx] = upsampled_histogram
-        # Compute integral histogram, double precision is needed to ensure
-        # that there are no overflows
-        integral_histogram = torch.cumsum(histogram_with_output_range, 0,
-                                          dtype=torch.double)[downsample_rate - 1 :: downsample_rate]
-        # Finally perform interpolation
-        shifted_integral_histogram = torch.zeros((Nbins), device=orig_hist.device)
-        shifted_integral_histogram[1:Nbins] = integral_histogram[0:-1]
+        # Up-sample the histogram with new data by a factor of L, which
+        # creates an approximate probability density thats piecwise constant,
+        # insert it into a histogram of the output range at start_idx, and
+        # down-sample that by a factor of downsample_rate. Instead of
+        # materializing the Nbins * downsample_rate up-sampled bins, this
+        # evaluates their integral histogram at the boundaries of the output
+        # bins only. Double precision is needed to ensure that there are no
+        # overflows
+        new_hist = new_hist.to(torch.double)
+        cumulative_hist = torch.zeros(Nbins + 1, dtype=torch.double, device=new_hist.device)
+        cumulative_hist[1:] = torch.cumsum(new_hist, 0)
+        padded_hist = torch.zeros(Nbins + 1, dtype=torch.double, device=new_hist.device)
+        padded_hist[:Nbins] = new_hist
+        # Boundaries of the output bins, as indices into the up-sampled
+        # histogram, of the up-sampled bin and the offset into the bin of
+        # new_hist it was up-sampled from
+        boundaries = torch.arange(1, Nbins + 1, dtype=torch.long, device=new_hist.device) * downsample_rate - start_idx
+        boundaries = torch.clamp(boundaries, 0, Nbins * upsample_rate)
+        src_bins = boundaries // upsample_rate
+        offsets = (boundaries - src_bins * upsample_rate).to(torch.double)
+        integral_histogram = cumulative_hist[src_bins] * upsample_rate + padded_hist[src_bins] * offsets
+        # Finally perform interpolation. The shifted integral histogram is
+        # rounded to float, as with the dense computation this replaces.
+        shifted_integral_histogram = torch.zeros(Nbins, dtype=torch.double, device=new_hist.device)
+        shifted_integral_histogram[1:Nbins] = integral_histogram[0:-1].to(torch.float)
         interpolated_histogram = (integral_histogram - shifted_integral_histogram) / upsample_rate
-        orig_hist = orig_hist + interpolated_histogram.to(torch.float)
+        orig_hist += interpolated_histogram.to(torch.float)
         return orig_hist
 
     def forward(self, x_orig):
@@ -905,29 +997,92 @@ class HistogramObserver(_ObserverBase):
             combined_min = torch.min(new_min, min_val)
             combined_max = torch.max(new_max, max_val)
             # combine the existing histogram and new histogram into 1 histogram
-            # We do this by first upsampling the histogram to a dense grid
-            # and then downsampling the histogram efficiently
+            # We do this by upsampling the existing histogram and then
+            # downsampling it to the bins of the combined range
             combined_min, combined_max, downsample_rate, start_idx = \
                 self._adjust_min_max(combined_min, combined_max, self.upsample_rate)
             combined_histogram = torch.histc(x, self.bins, min=combined_min, max=combined_max)
             if combined_min == min_val and combined_max == max_val:
-                combined_histogram += self.histogram
+                # Accumulate in place
+                self.histogram += combined_histogram
             else:
-                combined_histogram = self._combine_histograms(
+                self.histogram.copy_(self._combine_histograms(
                     combined_histogram,
                     self.histogram,
                     self.upsample_rate,
                     downsample_rate,
                     start_idx,
-                    self.bins)
+                    self.bins))
+                self.min_val.copy_(combined_min)
+                self.max_val.copy_(combined_max)
+        return x_orig
 
-            self.histogram.resize_(combined_histogram.shape)
-            self.histogram.copy_(combined_histogram)
-            self.min_val.resize_(combined_min.shape)
+    @torch.jit.ignore
+    def _rebin_histogram(self, hist, min_val, max_val, new_min, new_max):
+        # type: (Tensor, Tensor, Tensor, Tensor, Tensor) -> Tensor
+        # Redistributes the counts of hist, whose bins span [min_val, max_val],
+        # over self.bins bins spanning [new_min, new_max], which contains it,
+        # assuming that the values are distributed uniformly within each bin.
+        # This evaluates the integral histogram of hist, which is piecewise
+        # linear, at the boundaries of the new bins.
+        hist = hist.to(torch.double)
+        Nbins = hist.numel()
+        if max_val == min_val:
+            # All values are equal to min_val
+            new_bin_width = (new_max - new_min).to(torch.double) / self.bins
+            idx = 0
+            if new_bin_width > 0:
+                idx = min(int(((min_val - new_min) / new_bin_width).item()), self.bins - 1)
+            new_hist = torch.zeros(self.bins, dtype=torch.double, device=hist.device)
+            new_hist[idx] = hist.sum()
+            return new_hist.to(torch.float)
+        cumulative_hist = torch.zeros(Nbins + 1, dtype=torch.double, device=hist.device)
+        cumulative_hist[1:] = torch.cumsum(hist, 0)
+        steps = torch.arange(self.bins + 1, dtype=torch.double, device=hist.device) / self.bins
+        boundaries = new_min.to(torch.double) + (new_max - new_min).to(torch.double) * steps
+        positions = (boundaries - min_val.to(torch.double)) / (max_val - min_val).to(torch.double) * Nbins
+        positions = torch.clamp(positions, 0, Nbins)
+        src_bins = torch.clamp(positions.floor().to(torch.long), 0, Nbins - 1)
+        integral_histogram = cumulative_hist[src_bins] + hist[src_bins] * (positions - src_bins.to(torch.double))
+        return (integral_histogram[1:] - integral_histogram[:-1]).to(torch.float)
+
+    def merge_(self, other):
+        r"""Merges the histogram of ``other`` into this observer.
+
+        Both histograms are redistributed over the bins of their combined
+        range, unless it's the range of the histogram already, assuming that
+        the values are distributed uniformly within each bin. The result is thus
+        an approximation of the histogram of all inputs, like the one computed
+        when observing the inputs one after another.
+        """
+        assert self.bins == other.bins, (
+            "Can only merge histogram observers with the same number of bins"
+        )
+        if other.min_val.numel() == 0 or other.max_val.numel() == 0:
+            return self
+        if self.min_val.numel() == 0 or self.max_val.numel() == 0:
+            self.min_val.resize_(other.min_val.shape)
+            self.max_val.resize_(other.max_val.shape)
+            self.min_val.copy_(other.min_val)
+            self.max_val.copy_(other.max_val)
+            self.histogram.copy_(other.histogram)
+            return self
+        combined_min = torch.min(self.min_val, other.min_val)
+        combined_max = torch.max(self.max_val, other.max_val)
+        if other.min_val != combined_min or other.max_val != combined_max:
+            other_histogram = self._rebin_histogram(
+                other.histogram, other.min_val, other.max_val, combined_min, combined_max)
+        else:
+            other_histogram = other.histogram
+        if self.min_val == combined_min and self.max_val == combined_max:
+            # Accumulate in place
+            self.histogram += other_histogram
+        else:
+            self.histogram.copy_(self._rebin_histogram(
+                self.histogram, self.min_val, self.max_val, combined_min, combined_max) + other_histogram)
             self.min_val.copy_(combined_min)
-            self.max_val.resize_(combined_max.shape)
             self.max_val.copy_(combined_max)
-        return x_orig
+        return self
 
     @torch.jit.export
     def calculate_qparams(self):
@@ -984,6 +1139,11 @@ class RecordingObserver(_ObserverBase):
         self.tensor_val.append(x.clone())
         return x
 
+    def merge_(self, other):
+        r"""Appends the tensor values recorded by ``other``."""
+        self.tensor_val.extend(other.tensor_val)
+        return self
+
     @torch.jit.export
     def calculate_qparams(self):
         raise Exception("calculate_qparams should not be called for RecordingObserver")
@@ -1012,6 +1172,10 @@ class NoopObserver(ObserverBase):
     def forward(self, x):
         return x
 
+    def merge_(self, other):
+        r"""There are no statistics to merge."""
+        return self
+
     def calculate_qparams(self):
         raise Exception("calculate_qparams should not be called for NoopObserver")
 
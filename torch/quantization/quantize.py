@@ -189,6 +189,85 @@ def quantize(model, run_fn, run_args, mapping=None, inplace=False):
     _remove_qconfig(model)
     return model
 
+def _calibrate_shard(model, run_fn, calib_data, num_threads):
+    torch.set_num_threads(num_threads)
+    run_fn(model, calib_data)
+    observers = {}
+    get_observer_dict(model, observers)
+    return observers
+
+def quantize_parallel(model, run_fn, calib_data, num_workers, mapping=None,
+                      inplace=False, multiprocessing_context=None):
+    r"""Converts a float model to quantized model, calibrating it in several
+    processes.
+
+    Like :func:`~torch.quantization.quantize`, but `calib_data` is split into
+    `num_workers` contiguous shards, and `run_fn` is called with the prepared
+    model and one of the shards in each of `num_workers` worker processes.
+    The statistics recorded by the observers of the workers are then merged
+    (see :meth:`~torch.quantization.ObserverBase.merge_`) into the observers of
+    the prepared model, before `convert` is called.
+
+    The observers of the model must support merging. The merged min/max values
+    are the same as when calibrating in a single process, while merged
+    histograms are approximations, as are histograms that are recorded in a
+    single process.
+
+    Args:
+        model: input model
+        run_fn: a function for calibrating the prepared model, called as
+            ``run_fn(model, shard)``. It needs to be picklable (e.g. a module
+            level function) with the `spawn` start method
+        calib_data: a list or other indexable dataset of calibration data
+        num_workers: number of worker processes
+        mapping: correspondence between original module types and quantized counterparts
+        inplace: carry out model transformations in-place, the original module is mutated
+        multiprocessing_context: name of the start method of the worker
+            processes, or ``None`` for the default start method
+
+    Return:
+        Quantized model.
+    """
+    if num_workers < 1:
+        raise ValueError('num_workers should be a positive integer, but got '
+                         'num_workers={}'.format(num_workers))
+    if mapping is None:
+        mapping = DEFAULT_MODULE_MAPPING
+    if not inplace:
+        model = copy.deepcopy(model)
+    model.eval()
+    prepare(model, inplace=True)
+
+    num_samples = len(calib_data)
+    shards = []
+    for i in range(num_workers):
+        start = num_samples * i // num_workers
+        end = num_samples * (i + 1) // num_workers
+        if isinstance(calib_data, (list, tuple)):
+            shards.append(calib_data[start:end])
+        else:
+            shards.append(torch.utils.data.Subset(calib_data, range(start, end)))
+    # Share the cores among the workers
+    num_threads = max(1, torch.get_num_threads() // num_workers)
+    # The qconfigs aren't needed for calibration, and can't be pickled
+    calib_model = copy.deepcopy(model)
+    _remove_qconfig(calib_model)
+
+    ctx = torch.multiprocessing.get_context(multiprocessing_context)
+    with ctx.Pool(num_workers) as pool:
+        worker_observers = pool.starmap(
+            _calibrate_shard, [(calib_model, run_fn, shard, num_threads) for shard in shards])
+
+    observers = {}
+    get_observer_dict(model, observers)
+    for shard_observers in worker_observers:
+        for name, observer in shard_observers.items():
+            observers[name].merge_(observer)
+
+    convert(model, mapping, inplace=True)
+    _remove_qconfig(model)
+    return model
+
 def quantize_dynamic(model, qconfig_spec=None, dtype=torch.qint8,
                      mapping=None, inplace=False):
     r"""Converts a float model to dynamic (i.e. weights-only) quantized model.
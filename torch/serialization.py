@@ -1,4 +1,6 @@
+import ctypes
 import difflib
+import mmap
 import os
 import io
 import shutil
@@ -8,6 +10,9 @@ import torch
 import tarfile
 import tempfile
 import warnings
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing, contextmanager
 from ._utils import _import_dotted_name
 from ._six import string_classes as _string_classes
@@ -25,6 +30,7 @@ SHORT_SIZE = struct.Struct('=h').size
 MAGIC_NUMBER = 0x1950a86a20f9469cfc6c
 PROTOCOL_VERSION = 1001
 STORAGE_KEY_SEPARATOR = ','
+CHECKSUMS_RECORD = 'checksums'
 
 
 class SourceChangeWarning(Warning):
@@ -267,6 +273,87 @@ def _open_zipfile_writer(name_or_buffer):
     return container(name_or_buffer)
 
 
+def _get_record_offsets(f):
+    r"""Returns a dict mapping the name of each uncompressed record of the zip
+    file ``f`` (without the archive name prefix, as passed to
+    ``PyTorchFileReader.get_record``) to its offset and size in bytes."""
+    offsets = {}
+    with zipfile.ZipFile(f) as zip_file:
+        for info in zip_file.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                continue
+            # The data follows the fixed-size part of the local file header,
+            # the file name and an extra field whose length may differ from
+            # the one in the central directory.
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            name = info.filename.split('/', 1)[-1]
+            offsets[name] = (info.header_offset + 30 + name_len + extra_len, info.file_size)
+    return offsets
+
+
+_MMAP_NUMPY_DTYPES = {
+    torch.uint8: 'uint8',
+    torch.int8: 'int8',
+    torch.int16: 'int16',
+    torch.int32: 'int32',
+    torch.int64: 'int64',
+    torch.float16: 'float16',
+    torch.float32: 'float32',
+    torch.float64: 'float64',
+    torch.complex64: 'complex64',
+    torch.complex128: 'complex128',
+    torch.bool: 'bool',
+}
+
+
+class _open_mmap_records(_opener):
+    r"""Maps a zip file written by :func:`torch.save` into memory, and creates
+    storages that view its uncompressed records without copying them."""
+
+    def __init__(self, name_or_file):
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("torch.load(..., mmap=True) requires NumPy")
+        if _is_path(name_or_file):
+            file_like = open(name_or_file, 'rb')
+            self.owns_file = True
+        elif _should_read_directly(name_or_file):
+            file_like = name_or_file
+            self.owns_file = False
+        else:
+            raise RuntimeError("mmap can only be used with a file name or a file object backed by a "
+                               "real file, but got {}".format(type(name_or_file)))
+        super(_open_mmap_records, self).__init__(file_like)
+        self.np = np
+        self.records = _get_record_offsets(file_like)
+        # Private mapping: writes to the loaded storages are copy-on-write and
+        # never reach the file. The mapping stays valid after the file is
+        # closed, and is released once no storage views it anymore.
+        self.buffer = mmap.mmap(file_like.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def __exit__(self, *args):
+        if self.owns_file:
+            self.file_like.close()
+
+    def get_storage(self, name, storage_type, size):
+        r"""Returns a storage of type ``storage_type`` and ``size`` elements
+        viewing record ``name``, or ``None`` if it cannot be mapped."""
+        if name not in self.records or size == 0:
+            return None
+        dtype = _MMAP_NUMPY_DTYPES.get(storage_type(0).dtype)
+        if dtype is None:
+            return None
+        dtype = self.np.dtype(dtype)
+        offset, nbytes = self.records[name]
+        if nbytes != size * dtype.itemsize or offset % dtype.itemsize != 0:
+            return None
+        array = self.np.frombuffer(self.buffer, dtype=dtype, count=size, offset=offset)
+        return torch.from_numpy(array).storage()
+
+
 def _is_compressed_file(f):
     compress_modules = ['gzip']
     try:
@@ -437,6 +524,12 @@ def _legacy_save(obj, f, pickle_module, pickle_protocol):
 
 
 def _save(obj, zip_file, pickle_module, pickle_protocol):
+    data_value, serialized_storages = _pickle_with_storages(obj, pickle_module, pickle_protocol)
+    _write_records(zip_file, data_value,
+                   ((key, serialized_storages[key]) for key in sorted(serialized_storages.keys())))
+
+
+def _pickle_with_storages(obj, pickle_module, pickle_protocol):
     serialized_storages = {}
 
     def persistent_id(obj):
@@ -463,27 +556,135 @@ def _save(obj, zip_file, pickle_module, pickle_protocol):
     pickler = pickle_module.Pickler(data_buf, protocol=pickle_protocol)
     pickler.persistent_id = persistent_id
     pickler.dump(obj)
-    data_value = data_buf.getvalue()
+    return data_buf.getvalue(), serialized_storages
+
+
+def _write_records(zip_file, data_value, storages):
     zip_file.write_record('data.pkl', data_value, len(data_value))
+    checksums = [('data.pkl', zlib.crc32(data_value))]
 
     # Write each tensor to a file named tensor/the_tensor_key in the zip archive
-    for key in sorted(serialized_storages.keys()):
+    for key, storage in storages:
         name = 'data/{}'.format(key)
-        storage = serialized_storages[key]
         if storage.device.type == 'cpu':
             # If it's on the CPU we can directly copy it into the zip file
             num_bytes = storage.size() * storage.element_size()
-            buf = io.BytesIO()
             zip_file.write_record(name, storage.data_ptr(), num_bytes)
+            if num_bytes > 0:
+                checksum = zlib.crc32((ctypes.c_char * num_bytes).from_address(storage.data_ptr()))
+            else:
+                checksum = zlib.crc32(b'')
         else:
             # Copy to a buffer, then serialize that
             buf = io.BytesIO()
             storage._write_file(buf, _should_read_directly(buf))
             buf_value = buf.getvalue()
             zip_file.write_record(name, buf_value, len(buf_value))
+            checksum = zlib.crc32(buf_value)
+        checksums.append((name, checksum))
+
+    # The zip reader does not verify the CRC-32 of the zip format, so the
+    # checksums are written again as a record of their own that _load checks.
+    checksums_value = ''.join('{} {:08x}\n'.format(name, checksum)
+                              for name, checksum in checksums).encode('ascii')
+    zip_file.write_record(CHECKSUMS_RECORD, checksums_value, len(checksums_value))
+
+
+def _read_checksums(zip_file):
+    # Returns a dict from record names to their CRC-32, or None for files
+    # written without a checksums record.
+    if not any(record.split('/', 1)[-1] == CHECKSUMS_RECORD for record in zip_file.get_all_records()):
+        return None
+    checksums = {}
+    for line in zip_file.get_record(CHECKSUMS_RECORD).decode('ascii').splitlines():
+        name, checksum = line.rsplit(' ', 1)
+        checksums[name] = int(checksum, 16)
+    return checksums
+
+
+def _check_record(checksums, name, checksum):
+    if checksums is not None and name in checksums and checksums[name] != checksum:
+        raise RuntimeError("Checksum mismatch for record '{}' of the checkpoint, the file is corrupted"
+                           .format(name))
+
+
+def _snapshot_storage(storage):
+    # Returns a CPU copy of `storage` that later changes to it do not affect.
+    if storage.device.type == 'cpu':
+        return storage.clone()
+    if storage.device.type == 'cuda':
+        # Copies from the device to page-locked memory are faster
+        snapshot = normalize_storage_type(type(storage))(storage.size()).pin_memory()
+        snapshot.copy_(storage)
+        return snapshot
+    return storage.cpu()
+
+
+def async_save(obj, f, pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, num_threads=4):
+    """Saves an object to a disk file like :func:`torch.save` with
+    ``_use_new_zipfile_serialization=True``, but writes it in the background.
+
+    The call returns as soon as :attr:`obj` has been pickled and all storages
+    it references have been copied to host memory (page-locked memory for
+    CUDA storages) by a pool of :attr:`num_threads` threads, so :attr:`obj`
+    can be modified again right away, e.g., by the next training step. The
+    records are written to :attr:`f` by a background thread, which starts
+    with the first storages while the others are still being copied.
+
+    The CRC-32 of every record is written to a ``checksums`` record of the
+    file (as :func:`torch.save` does), which :func:`torch.load` verifies when
+    reading the records, unless they are memory-mapped.
+
+    .. note::
+        Until the write has finished, the copies of the storages are kept in
+        host memory, so this needs as much free host memory as the storages
+        take, and :attr:`f` must not be used otherwise if it is a file-like
+        object. Writes that are still in flight when Python exits are
+        completed first.
+
+    Args:
+        obj: saved object
+        f: a file-like object (has to implement write and flush) or a string
+           containing a file name
+        pickle_module: module used for pickling metadata and objects
+        pickle_protocol: can be specified to override the default protocol
+        num_threads: number of threads copying storages
 
+    Returns:
+        A :class:`concurrent.futures.Future` that completes once the file has
+        been written, or holds the exception that writing it raised.
 
-def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
+    Example:
+        >>> handle = torch.serialization.async_save(model.state_dict(), 'checkpoint.pt')
+        >>> # Continue training
+        >>> handle.result()  # wait for the checkpoint to be written
+    """
+    _check_dill_version(pickle_module)
+    if num_threads < 1:
+        raise ValueError("num_threads should be a positive integer, but got {}".format(num_threads))
+
+    data_value, serialized_storages = _pickle_with_storages(obj, pickle_module, pickle_protocol)
+    keys = sorted(serialized_storages.keys())
+    copy_pool = ThreadPoolExecutor(max_workers=num_threads)
+    snapshots = [copy_pool.submit(_snapshot_storage, serialized_storages[key]) for key in keys]
+    copy_pool.shutdown(wait=False)
+
+    def write():
+        with _open_zipfile_writer(f) as opened_file:
+            _write_records(opened_file, data_value,
+                           ((key, snapshot.result()) for key, snapshot in zip(keys, snapshots)))
+
+    writer = ThreadPoolExecutor(max_workers=1)
+    handle = writer.submit(write)
+    writer.shutdown(wait=False)
+
+    for snapshot in snapshots:
+        # Raises if a copy failed, in which case the write fails as well
+        snapshot.result()
+    return handle
+
+
+def load(f, map_location=None, pickle_module=pickle, mmap=False, **pickle_load_args):
     """Loads an object saved with :func:`torch.save` from a file.
 
     :func:`torch.load` uses Python's unpickling facilities but treats storages,
@@ -522,6 +723,10 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
             locations
         pickle_module: module used for unpickling metadata and objects (has to
             match the :attr:`pickle_module` used to serialize file)
+        mmap: if ``True``, memory-map the file instead of reading all storages
+            into memory. Only supported for files saved with
+            ``_use_new_zipfile_serialization=True`` and given by name or as a
+            real file object (default: ``False``)
         pickle_load_args: (Python 3 only) optional keyword arguments passed over to
             :func:`pickle_module.load` and :func:`pickle_module.Unpickler`, e.g.,
             :attr:`errors=...`.
@@ -537,6 +742,19 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
         will be loaded to GPU by default. You can call ``torch.load(.., map_location='cpu')``
         and then :meth:`load_state_dict` to avoid GPU RAM surge when loading a model checkpoint.
 
+    .. note::
+        With :attr:`mmap` set to ``True``, CPU storages are views into a private
+        (copy-on-write) memory map of the file, so loading is almost free and
+        pages are only read from disk when they are first accessed, and pages
+        that are never written to are shared with the page cache and with other
+        processes mapping the same file. Changes to the loaded tensors are never
+        written back to the file, but the file must not be modified or truncated
+        while they are alive. Storages of dtypes that cannot be mapped (e.g.
+        ``bfloat16``) are read into memory as usual, and storages that are
+        moved to another device by :attr:`map_location` are copied there from
+        the map. The checksums of mapped records are not verified, so that
+        they are only read when accessed.
+
     .. note::
         By default, we decode byte strings as ``utf-8``.  This is to avoid a common error
         case ``UnicodeDecodeError: 'ascii' codec can't decode byte 0x...``
@@ -562,6 +780,8 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
         >>> torch.load(buffer)
         # Load a module with 'ascii' encoding for unpickling
         >>> torch.load('module.pt', encoding='ascii')
+        # Memory-map the storages of a large checkpoint
+        >>> torch.load('checkpoint.pt', mmap=True)
     """
     _check_dill_version(pickle_module)
 
@@ -576,7 +796,15 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
                                   " dispatching to 'torch.jit.load' (call 'torch.jit.load' directly to"
                                   " silence this warning)", UserWarning)
                     return torch.jit.load(f)
+                if mmap:
+                    with _open_mmap_records(f) as mmap_records:
+                        return _load(opened_zipfile, map_location, pickle_module,
+                                     mmap_records=mmap_records, **pickle_load_args)
                 return _load(opened_zipfile, map_location, pickle_module, **pickle_load_args)
+        if mmap:
+            raise RuntimeError("mmap can only be used with files saved with "
+                               "`torch.save(_use_new_zipfile_serialization=True)`, "
+                               "please torch.save your checkpoint with this option in order to use mmap.")
         return _legacy_load(opened_file, map_location, pickle_module, **pickle_load_args)
 
 
@@ -805,16 +1033,24 @@ def _get_restore_location(map_location):
     return restore_location
 
 
-def _load(zip_file, map_location, pickle_module, **pickle_load_args):
+def _load(zip_file, map_location, pickle_module, mmap_records=None, **pickle_load_args):
     restore_location = _get_restore_location(map_location)
+    checksums = _read_checksums(zip_file)
 
     loaded_storages = {}
 
-    def load_tensor(obj, size, key, location):
-        loaded_storages[key] = restore_location(obj, location)
+    def load_tensor(data_type, size, key, location):
         name = 'data/{}'.format(key)
+        if mmap_records is not None:
+            storage = mmap_records.get_storage(name, data_type, size)
+            if storage is not None:
+                loaded_storages[key] = restore_location(storage, location)
+                return
+        loaded_storages[key] = restore_location(data_type(size), location)
+        record = zip_file.get_record(name)
+        _check_record(checksums, name, zlib.crc32(record))
         size_long = struct.pack("<Q", size)
-        tensor_file = io.BytesIO(size_long + zip_file.get_record(name))
+        tensor_file = io.BytesIO(size_long + record)
         offset = None
         is_real_file = False
         loaded_storages[key]._set_from_file(tensor_file, offset, is_real_file)
@@ -828,12 +1064,14 @@ def _load(zip_file, map_location, pickle_module, **pickle_load_args):
             "Unknown typename for persistent_load, expected 'storage' but got '{}'".format(typename)
         data_type, key, location, size = data
         if key not in loaded_storages:
-            load_tensor(data_type(size), size, key, _maybe_decode_ascii(location))
+            load_tensor(data_type, size, key, _maybe_decode_ascii(location))
         storage = loaded_storages[key]
         return storage
 
     # Load the data (which may in turn use `persistent_load` to load tensors)
-    data_file = io.BytesIO(zip_file.get_record('data.pkl'))
+    data_record = zip_file.get_record('data.pkl')
+    _check_record(checksums, 'data.pkl', zlib.crc32(data_record))
+    data_file = io.BytesIO(data_record)
     unpickler = pickle_module.Unpickler(data_file, **pickle_load_args)
     unpickler.persistent_load = persistent_load
     result = unpickler.load()
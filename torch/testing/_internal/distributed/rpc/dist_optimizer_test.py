@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import gc
 import threading
 
 import torch
@@ -7,6 +8,7 @@ import torch.distributed.autograd as dist_autograd
 import torch.distributed.rpc as rpc
 from torch import optim
 from torch.distributed.optim import DistributedOptimizer
+from torch.distributed.optim.optimizer import _LocalOptimizer
 from torch.testing._internal.dist_utils import dist_init
 from torch.testing._internal.distributed.rpc.rpc_agent_test_fixture import (
     RpcAgentTestFixture,
@@ -40,6 +42,15 @@ class FailingOptimizer(optim.Optimizer):
         raise ValueError("Error running optimizer.")
 
 
+class BarrierOptimizer(optim.Optimizer):
+    def __init__(self, params, barrier):
+        super().__init__(params, {})
+        self.barrier = barrier
+
+    def step(self, closure=None):
+        self.barrier.wait()
+
+
 class OptimizerFailingOnConstructor(optim.Optimizer):
     def __init__(self, params):
         super().__init__(params, {})
@@ -138,6 +149,57 @@ class DistOptimizerTest(RpcAgentTestFixture):
                 OptimizerFailingOnConstructor, [remote_param1, remote_param2]
             )
 
+    def _run_local_optimizer_steps(self, params_per_optimizer, barrier):
+        local_optims = [
+            _LocalOptimizer(BarrierOptimizer, [rpc.RRef(param) for param in params], barrier)
+            for params in params_per_optimizer]
+        errors = []
+
+        def step(local_optim, context_id):
+            try:
+                local_optim.step(context_id)
+            except threading.BrokenBarrierError as e:
+                errors.append(e)
+
+        with dist_autograd.context() as context_id:
+            threads = [
+                threading.Thread(target=step, args=(local_optim, context_id))
+                for local_optim in local_optims]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return errors
+
+    @dist_init()
+    def test_local_optim_concurrent_steps(self):
+        w1 = torch.rand((3, 3), requires_grad=True)
+        w2 = torch.rand((3, 3), requires_grad=True)
+
+        # Steps on disjoint parameters run concurrently, so both reach the
+        # barrier.
+        barrier = threading.Barrier(2, timeout=10)
+        errors = self._run_local_optimizer_steps([[w1], [w2]], barrier)
+        self.assertEqual(errors, [])
+
+        # Steps sharing a parameter are serialized, so the barrier times out.
+        barrier = threading.Barrier(2, timeout=1)
+        errors = self._run_local_optimizer_steps([[w1, w2], [w2]], barrier)
+        self.assertEqual(len(errors), 2)
+
+    @dist_init()
+    def test_local_optim_param_locks_freed(self):
+        w = torch.rand((3, 3), requires_grad=True)
+        w_id = id(w)
+        local_optim = _LocalOptimizer(optim.SGD, [rpc.RRef(w)], lr=0.05)
+        self.assertIn(w_id, _LocalOptimizer._param_locks)
+        # Another optimizer of the same parameter shares its lock
+        self.assertEqual(
+            _LocalOptimizer(optim.SGD, [rpc.RRef(w)], lr=0.05)._locks, local_optim._locks)
+        del local_optim, w
+        gc.collect()
+        self.assertNotIn(w_id, _LocalOptimizer._param_locks)
+
     @dist_init()
     def test_dist_optim(self):
         # local version
@@ -8,6 +8,7 @@ from unittest import mock
 
 import torch
 import torch.distributed as dist
+import torch.distributed.autograd as dist_autograd
 import torch.distributed.rpc as rpc
 import torch.testing._internal.dist_utils as dist_utils
 from torch.distributed.rpc import RRef, _get_debug_info, _rref_context_get_debug_info
@@ -1069,6 +1070,94 @@ class RpcTest(RpcAgentTestFixture):
         )
         self.assertEqual(ret, my_tensor_function(torch.ones(n, n), torch.ones(n, n)))
 
+    @dist_init
+    def test_py_udf_serialize_fast_path(self):
+        t1 = torch.ones(2, 2)
+        t2 = torch.zeros(3)
+        args = (t1, 1, 2.5, "abc", None, True, t2, -(1 << 40))
+        data, tensors = _internal_rpc_pickler.serialize(
+            PythonUDF(my_tensor_function, args, None)
+        )
+        self.assertTrue(data.startswith(b"\xffRPC"))
+        self.assertEqual(len(tensors), 2)
+        self.assertIs(tensors[0], t1)
+        self.assertIs(tensors[1], t2)
+        python_udf = _internal_rpc_pickler.deserialize(data, tensors)
+        self.assertIs(python_udf.func, my_tensor_function)
+        self.assertEqual(python_udf.args, args)
+        self.assertIsNone(python_udf.kwargs)
+
+        # Return values
+        for ret in [t1, 3, [t1, "x"], (t2, 1.5)]:
+            data, tensors = _internal_rpc_pickler.serialize(ret)
+            self.assertTrue(data.startswith(b"\xffRPC"))
+            self.assertEqual(_internal_rpc_pickler.deserialize(data, tensors), ret)
+
+        # Everything else falls back to pickle
+        for obj in [
+            PythonUDF(my_tensor_function, (t1, t2), {"a": 1}),
+            PythonUDF(MyClass(2).my_instance_method, (t1,), None),
+            (t1, (t2,)),
+            {"a": t1},
+            1 << 70,
+            # Lone surrogates cannot be encoded as UTF-8
+            (t1, "\ud800"),
+        ]:
+            data, tensors = _internal_rpc_pickler.serialize(obj)
+            self.assertFalse(data.startswith(b"\xffRPC"))
+            ret = _internal_rpc_pickler.deserialize(data, tensors)
+            if isinstance(obj, PythonUDF):
+                self.assertEqual(ret.args, obj.args)
+                self.assertEqual(ret.kwargs, obj.kwargs)
+            else:
+                self.assertEqual(ret, obj)
+
+    @dist_init
+    def test_rpc_async_batching(self):
+        dst = worker_name((self.rank + 1) % self.world_size)
+        rpc.enable_batching(max_batch_size=4, max_delay=0.05)
+        try:
+            futs = [
+                rpc.rpc_async(dst, my_tensor_function, args=(torch.ones(i, i), torch.ones(i, i)))
+                for i in range(1, 11)
+            ]
+            err_fut = rpc.rpc_async(dst, raise_func)
+            last_fut = rpc.rpc_async(dst, my_tensor_function, args=(1, 2))
+            # Not batched
+            self.assertEqual(rpc.rpc_sync(dst, min, args=(1, 2)), 1)
+        finally:
+            # Sends the last, incomplete batch
+            rpc.disable_batching()
+
+        for i, fut in enumerate(futs, 1):
+            self.assertEqual(fut.wait(), torch.ones(i, i) * 2)
+        with self.assertRaisesRegex(ValueError, "Expected error"):
+            err_fut.wait()
+        self.assertEqual(last_fut.wait(), 3)
+
+        with self.assertRaisesRegex(ValueError, "max_batch_size should be a positive integer"):
+            rpc.enable_batching(max_batch_size=0)
+
+    @dist_init
+    def test_rpc_async_batching_dist_autograd(self):
+        dst = worker_name((self.rank + 1) % self.world_size)
+        rpc.enable_batching(max_batch_size=4, max_delay=0.05)
+        try:
+            with dist_autograd.context() as context_id:
+                t1 = torch.ones(3, 3, requires_grad=True)
+                t2 = torch.ones(3, 3, requires_grad=True)
+                # Calls within a distributed autograd context are sent from
+                # the calling thread, so they are recorded on its context.
+                futs = [rpc.rpc_async(dst, my_tensor_function, args=(t1, t2)) for _ in range(6)]
+                loss = sum(fut.wait() for fut in futs).sum()
+                self.assertEqual(len(dist_autograd._current_context()._send_functions()), 6)
+                dist_autograd.backward(context_id, [loss])
+                grads = dist_autograd.get_gradients(context_id)
+                self.assertEqual(grads[t1], torch.ones(3, 3) * 6)
+                self.assertEqual(grads[t2], torch.ones(3, 3) * 6)
+        finally:
+            rpc.disable_batching()
+
     @dist_init
     def test_py_tensors_multi_async_call(self):
         futs = []
@@ -1,4 +1,5 @@
-from .sampler import Sampler, SequentialSampler, RandomSampler, SubsetRandomSampler, WeightedRandomSampler, BatchSampler
+from .sampler import Sampler, SequentialSampler, RandomSampler, SubsetRandomSampler, WeightedRandomSampler, \
+    DynamicWeightedRandomSampler, BatchSampler
 from .distributed import DistributedSampler
 from .dataset import Dataset, IterableDataset, TensorDataset, ConcatDataset, ChainDataset, Subset, random_split
 from .dataloader import DataLoader, _DatasetKind, get_worker_info
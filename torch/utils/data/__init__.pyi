@@ -1,5 +1,6 @@
 from .sampler import Sampler as Sampler, SequentialSampler as SequentialSampler, RandomSampler as RandomSampler, \
-    SubsetRandomSampler as SubsetRandomSampler, WeightedRandomSampler as WeightedRandomSampler, BatchSampler as BatchSampler
+    SubsetRandomSampler as SubsetRandomSampler, WeightedRandomSampler as WeightedRandomSampler, \
+    DynamicWeightedRandomSampler as DynamicWeightedRandomSampler, BatchSampler as BatchSampler
 from .distributed import DistributedSampler as DistributedSampler
 from .dataset import Dataset as Dataset, TensorDataset as TensorDataset, ConcatDataset as ConcatDataset, \
     Subset as Subset, random_split as random_split, IterableDataset as IterableDataset, \
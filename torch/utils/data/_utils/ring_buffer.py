@@ -0,0 +1,183 @@
+r"""Contains definitions of the shared-memory ring buffer that the
+_MultiProcessingDataLoaderIter workers can use to send batches to the main
+process without passing every tensor storage through the result queue.
+"""
+
+import ctypes
+import torch
+from torch._six import container_abcs, string_classes
+
+
+# Offsets of tensors in a slot are aligned to this many bytes, so that copies
+# in and out of the slot are aligned for any dtype and vectorized memcpy.
+_ALIGNMENT = 64
+
+_SLOT_FREE = 0
+_SLOT_WRITTEN = 1
+
+
+class _DoesNotFit(Exception):
+    pass
+
+
+class _TensorMeta(object):
+    r"""Placeholder of a tensor in a batch written to a ring buffer slot."""
+    __slots__ = ['offset', 'nbytes', 'size', 'dtype']
+
+    def __init__(self, offset, nbytes, size, dtype):
+        self.offset = offset
+        self.nbytes = nbytes
+        self.size = size
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.offset, self.nbytes, self.size, self.dtype)
+
+    def __setstate__(self, state):
+        self.offset, self.nbytes, self.size, self.dtype = state
+
+
+class _RingBufferBatch(object):
+    r"""What is sent through the result queue instead of a batch that has been
+    written to slot :attr:`slot` of the ring buffer of worker :attr:`worker_id`.
+    :attr:`data` is the batch structure, with every tensor replaced by a
+    :class:`_TensorMeta`."""
+    __slots__ = ['worker_id', 'slot', 'data']
+
+    def __init__(self, worker_id, slot, data):
+        self.worker_id = worker_id
+        self.slot = slot
+        self.data = data
+
+    def __getstate__(self):
+        return (self.worker_id, self.slot, self.data)
+
+    def __setstate__(self, state):
+        self.worker_id, self.slot, self.data = state
+
+
+def _map_structure(data, fn):
+    # Applies `fn` to every leaf of `data`, recursing into the same containers
+    # as `pin_memory` does.
+    if isinstance(data, (torch.Tensor, _TensorMeta)):
+        return fn(data)
+    elif isinstance(data, string_classes):
+        return data
+    elif isinstance(data, container_abcs.Mapping):
+        return {k: _map_structure(sample, fn) for k, sample in data.items()}
+    elif isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+        return type(data)(*(_map_structure(sample, fn) for sample in data))
+    elif isinstance(data, tuple):
+        return tuple(_map_structure(sample, fn) for sample in data)
+    elif isinstance(data, container_abcs.Sequence):
+        return [_map_structure(sample, fn) for sample in data]
+    else:
+        return data
+
+
+class SharedMemoryRingBuffer(object):
+    r"""A preallocated shared-memory buffer split into :attr:`num_slots` slots
+    of :attr:`slot_size` bytes each, owned by a single worker process.
+
+    The worker writes all tensors of a collated batch into a free slot with
+    :meth:`put`, and sends only the returned (small) metadata object through
+    the result queue. The main process copies the tensors out with
+    :meth:`get`, which also releases the slot for reuse. Thus, each batch costs
+    one memcpy on each side, but no per-storage shared memory allocation or
+    file descriptor passing.
+
+    A batch that does not fit into a slot, contains non-CPU or non-strided
+    tensors, or arrives while all slots are in use, is returned unchanged by
+    :meth:`put` and is sent through the result queue as usual.
+    """
+
+    def __init__(self, num_slots, slot_size):
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.buffer = torch.empty(num_slots * slot_size, dtype=torch.uint8).share_memory_()
+        # One flag per slot, set to `_SLOT_WRITTEN` by the worker once a batch
+        # is written, and back to `_SLOT_FREE` by the main process once the
+        # batch is copied out. Each transition is only done by one side.
+        self.slot_status = torch.zeros(num_slots, dtype=torch.int32).share_memory_()
+        self._next_slot = 0
+        self._flags = None
+
+    def __getstate__(self):
+        return (self.num_slots, self.slot_size, self.buffer, self.slot_status)
+
+    def __setstate__(self, state):
+        self.num_slots, self.slot_size, self.buffer, self.slot_status = state
+        self._next_slot = 0
+        self._flags = None
+
+    def _get_flags(self):
+        # Addresses differ across processes, so this is built lazily in each.
+        if self._flags is None:
+            self._flags = (ctypes.c_int32 * self.num_slots).from_address(self.slot_status.data_ptr())
+        return self._flags
+
+    def _acquire_slot(self):
+        flags = self._get_flags()
+        for i in range(self.num_slots):
+            slot = (self._next_slot + i) % self.num_slots
+            if flags[slot] == _SLOT_FREE:
+                self._next_slot = (slot + 1) % self.num_slots
+                return slot
+        return None
+
+    def put(self, data, worker_id):
+        r"""Writes the tensors of :attr:`data` into a free slot and returns the
+        :class:`_RingBufferBatch` describing it, or returns :attr:`data`
+        unchanged if it cannot be written."""
+        tensors = []
+        offset = [0]
+
+        def plan(tensor):
+            if tensor.layout != torch.strided or tensor.device.type != 'cpu' or \
+                    tensor.is_quantized or tensor.requires_grad:
+                raise _DoesNotFit()
+            tensor = tensor.contiguous()
+            nbytes = tensor.numel() * tensor.element_size()
+            meta = _TensorMeta(offset[0], nbytes, tensor.size(), tensor.dtype)
+            offset[0] += (nbytes + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+            if offset[0] > self.slot_size:
+                raise _DoesNotFit()
+            tensors.append(tensor)
+            return meta
+
+        try:
+            structure = _map_structure(data, plan)
+        except _DoesNotFit:
+            return data
+        if len(tensors) == 0:
+            return data
+        slot = self._acquire_slot()
+        if slot is None:
+            return data
+
+        base = self.buffer.data_ptr() + slot * self.slot_size
+        metas = []
+        _map_structure(structure, metas.append)
+        for tensor, meta in zip(tensors, metas):
+            ctypes.memmove(base + meta.offset, tensor.data_ptr(), meta.nbytes)
+        self._get_flags()[slot] = _SLOT_WRITTEN
+        return _RingBufferBatch(worker_id, slot, structure)
+
+    def get(self, batch, pin_memory=False):
+        r"""Copies the batch described by the :class:`_RingBufferBatch`
+        :attr:`batch` out of its slot into newly allocated (and optionally
+        pinned) tensors, and releases the slot."""
+        base = self.buffer.data_ptr() + batch.slot * self.slot_size
+
+        def copy_out(meta):
+            tensor = torch.empty(meta.size, dtype=meta.dtype, pin_memory=pin_memory)
+            ctypes.memmove(tensor.data_ptr(), base + meta.offset, meta.nbytes)
+            return tensor
+
+        data = _map_structure(batch.data, copy_out)
+        self.release(batch)
+        return data
+
+    def release(self, batch):
+        r"""Releases the slot of :attr:`batch` without reading it."""
+        self._get_flags()[batch.slot] = _SLOT_FREE
@@ -56,6 +56,11 @@ else:
 
 _worker_info = None
 
+# Whether `default_collate` should stack tensors directly into shared memory.
+# This is disabled when the worker sends batches through a
+# `SharedMemoryRingBuffer`, since they are copied into the ring buffer anyway.
+_collate_into_shared_memory = True
+
 
 class WorkerInfo(object):
     __initialized = False
@@ -103,10 +108,13 @@ def get_worker_info():
 r"""Dummy class used to signal the end of an IterableDataset"""
 _IterableDatasetStopIteration = namedtuple('_IterableDatasetStopIteration', ['worker_id'])
 
+r"""Dummy class used to resume the fetching when worker reuse is enabled"""
+_ResumeIteration = namedtuple('_ResumeIteration', [])
+
 
 def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                  auto_collation, collate_fn, drop_last, seed, init_fn, worker_id,
-                 num_workers):
+                 num_workers, ring_buffer=None):
     # See NOTE [ Data Loader Multiprocessing Shutdown Logic ] for details on the
     # logic of this function.
 
@@ -126,6 +134,10 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
         _worker_info = WorkerInfo(id=worker_id, num_workers=num_workers,
                                   seed=seed, dataset=dataset)
 
+        if ring_buffer is not None:
+            global _collate_into_shared_memory
+            _collate_into_shared_memory = False
+
         from torch.utils.data import _DatasetKind
 
         init_exception = None
@@ -160,7 +172,17 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                 r = index_queue.get(timeout=MP_STATUS_CHECK_INTERVAL)
             except queue.Empty:
                 continue
-            if r is None:
+            if isinstance(r, _ResumeIteration):
+                # A new epoch is starting on a persistent worker (see
+                # `persistent_workers` in `DataLoader`). Acknowledge it to the
+                # main process and recreate the fetcher so that an
+                # `IterableDataset` is iterated from its beginning again.
+                data_queue.put((r, None))
+                iteration_end = False
+                fetcher = _DatasetKind.create_fetcher(
+                    dataset_kind, dataset, auto_collation, collate_fn, drop_last)
+                continue
+            elif r is None:
                 # Received the final signal
                 assert done_event.is_set() or iteration_end
                 break
@@ -189,6 +211,11 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                         # See NOTE [ Python Traceback Reference Cycle Problem ]
                         data = ExceptionWrapper(
                             where="in DataLoader worker process {}".format(worker_id))
+                else:
+                    if ring_buffer is not None:
+                        # Only a small `_RingBufferBatch` goes through the queue
+                        # if the batch fits in a free slot.
+                        data = ring_buffer.put(data, worker_id)
             data_queue.put((idx, data))
             del data, idx, index, r  # save memory
     except KeyboardInterrupt:
@@ -100,6 +100,21 @@ class DataLoader(object):
         worker_init_fn (callable, optional): If not ``None``, this will be called on each
             worker subprocess with the worker id (an int in ``[0, num_workers - 1]``) as
             input, after seeding and before data loading. (default: ``None``)
+        prefetch_factor (int, optional, keyword-only arg): Number of batches loaded
+            in advance by each worker. ``2`` means there will be a total of
+            2 * num_workers batches prefetched across all workers. (default: ``2``)
+        persistent_workers (bool, optional): If ``True``, the data loader will not shutdown
+            the worker processes after a dataset has been consumed once. This allows to
+            maintain the workers' `Dataset` instances alive, e.g., to avoid re-running
+            expensive per-worker initialization at every epoch. (default: ``False``)
+        ring_buffer_slot_size (int, optional, keyword-only arg): If not ``None``,
+            each worker preallocates a shared-memory ring buffer of
+            :attr:`prefetch_factor` slots of this many bytes, and writes its
+            batches into it, so that only a small metadata object goes through
+            the inter-process queue instead of every tensor storage. Batches
+            that do not fit into a slot are sent through the queue as usual.
+            Useful for high-throughput loading of batches of small tensors.
+            (default: ``None``)
 
 
     .. warning:: If the ``spawn`` start method is used, :attr:`worker_init_fn`
@@ -122,7 +137,8 @@ class DataLoader(object):
     def __init__(self, dataset, batch_size=1, shuffle=False, sampler=None,
                  batch_sampler=None, num_workers=0, collate_fn=None,
                  pin_memory=False, drop_last=False, timeout=0,
-                 worker_init_fn=None, multiprocessing_context=None):
+                 worker_init_fn=None, multiprocessing_context=None, *,
+                 prefetch_factor=2, persistent_workers=False, ring_buffer_slot_size=None):
         torch._C._log_api_usage_once("python.data_loader")
 
         if num_workers < 0:
@@ -132,8 +148,25 @@ class DataLoader(object):
         if timeout < 0:
             raise ValueError('timeout option should be non-negative')
 
+        if num_workers == 0 and prefetch_factor != 2:
+            raise ValueError('prefetch_factor option could only be specified in multiprocessing. '
+                             'Let num_workers > 0 to enable multiprocessing.')
+        if prefetch_factor <= 0:
+            raise ValueError('prefetch_factor option should be positive')
+
+        if persistent_workers and num_workers == 0:
+            raise ValueError('persistent_workers option needs num_workers > 0')
+
+        if ring_buffer_slot_size is not None:
+            if num_workers == 0:
+                raise ValueError('ring_buffer_slot_size option needs num_workers > 0')
+            if ring_buffer_slot_size <= 0:
+                raise ValueError('ring_buffer_slot_size option should be positive')
+
         self.dataset = dataset
         self.num_workers = num_workers
+        self.prefetch_factor = prefetch_factor
+        self.ring_buffer_slot_size = ring_buffer_slot_size
         self.pin_memory = pin_memory
         self.timeout = timeout
         self.worker_init_fn = worker_init_fn
@@ -232,9 +265,13 @@ class DataLoader(object):
                 collate_fn = _utils.collate.default_convert
 
         self.collate_fn = collate_fn
+        self.persistent_workers = persistent_workers
+
         self.__initialized = True
         self._IterableDataset_len_called = None  # See NOTE [ IterableDataset and __len__ ]
 
+        self._iterator = None
+
     @property
     def multiprocessing_context(self):
         return self.__multiprocessing_context
@@ -268,18 +305,34 @@ class DataLoader(object):
         self.__multiprocessing_context = multiprocessing_context
 
     def __setattr__(self, attr, val):
-        if self.__initialized and attr in ('batch_size', 'batch_sampler', 'sampler', 'drop_last', 'dataset'):
+        if self.__initialized and attr in (
+                'batch_size', 'batch_sampler', 'sampler', 'drop_last', 'dataset', 'persistent_workers'):
             raise ValueError('{} attribute should not be set after {} is '
                              'initialized'.format(attr, self.__class__.__name__))
 
         super(DataLoader, self).__setattr__(attr, val)
 
-    def __iter__(self):
+    def _get_iterator(self):
         if self.num_workers == 0:
             return _SingleProcessDataLoaderIter(self)
         else:
             return _MultiProcessingDataLoaderIter(self)
 
+    def __iter__(self):
+        # With `persistent_workers`, the multi-process iterator is created only
+        # once in the lifetime of this `DataLoader`, and is reset at every
+        # subsequent call so that its worker processes (and their dataset
+        # replicas) are reused across epochs. Otherwise, a fresh iterator is
+        # created every time.
+        if self.persistent_workers and self.num_workers > 0:
+            if self._iterator is None:
+                self._iterator = self._get_iterator()
+            else:
+                self._iterator._reset(self)
+            return self._iterator
+        else:
+            return self._get_iterator()
+
     @property
     def _auto_collation(self):
         return self.batch_sampler is not None
@@ -332,11 +385,17 @@ class _BaseDataLoaderIter(object):
         self._collate_fn = loader.collate_fn
         self._sampler_iter = iter(self._index_sampler)
         self._base_seed = torch.empty((), dtype=torch.int64).random_().item()
+        self._persistent_workers = loader.persistent_workers
         self._num_yielded = 0
 
     def __iter__(self):
         return self
 
+    def _reset(self, loader, first_iter=False):
+        self._sampler_iter = iter(self._index_sampler)
+        self._num_yielded = 0
+        self._IterableDataset_len_called = loader._IterableDataset_len_called
+
     def _next_index(self):
         return next(self._sampler_iter)  # may raise StopIteration
 
@@ -681,36 +740,38 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         else:
             multiprocessing_context = loader.multiprocessing_context
 
+        self._prefetch_factor = loader.prefetch_factor
         self._worker_init_fn = loader.worker_init_fn
-        self._worker_queue_idx_cycle = itertools.cycle(range(self._num_workers))
         self._worker_result_queue = multiprocessing_context.Queue()
         self._worker_pids_set = False
         self._shutdown = False
-        self._send_idx = 0  # idx of the next task to be sent to workers
-        self._rcvd_idx = 0  # idx of the next task to be returned in __next__
-        # information about data not yet yielded, i.e., tasks w/ indices in range [rcvd_idx, send_idx).
-        # map: task idx => - (worker_id,)        if data isn't fetched (outstanding)
-        #                  \ (worker_id, data)   if data is already fetched (out-of-order)
-        self._task_info = {}
-        self._tasks_outstanding = 0  # always equal to count(v for v in task_info.values() if len(v) == 1)
         self._workers_done_event = multiprocessing_context.Event()
 
         self._index_queues = []
         self._workers = []
+        # Per-worker `SharedMemoryRingBuffer`s, if `ring_buffer_slot_size` is set.
+        self._ring_buffers = []
         # A list of booleans representing whether each worker still has work to
         # do, i.e., not having exhausted its iterable dataset object. It always
         # contains all `True`s if not using an iterable-style dataset
-        # (i.e., if kind != Iterable).
+        # (i.e., if kind != Iterable). It is reset at the start of every epoch
+        # in `_reset`.
         self._workers_status = []
         for i in range(self._num_workers):
             index_queue = multiprocessing_context.Queue()
             # index_queue.cancel_join_thread()
+            ring_buffer = None
+            if loader.ring_buffer_slot_size is not None:
+                ring_buffer = _utils.ring_buffer.SharedMemoryRingBuffer(
+                    self._prefetch_factor, loader.ring_buffer_slot_size)
+                self._ring_buffers.append(ring_buffer)
             w = multiprocessing_context.Process(
                 target=_utils.worker._worker_loop,
                 args=(self._dataset_kind, self._dataset, index_queue,
                       self._worker_result_queue, self._workers_done_event,
                       self._auto_collation, self._collate_fn, self._drop_last,
-                      self._base_seed + i, self._worker_init_fn, i, self._num_workers))
+                      self._base_seed + i, self._worker_init_fn, i, self._num_workers,
+                      ring_buffer))
             w.daemon = True
             # NB: Process.start() actually take some time as it needs to
             #     start a process and pass the arguments over via a pipe.
@@ -742,9 +803,37 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         _utils.signal_handling._set_worker_pids(id(self), tuple(w.pid for w in self._workers))
         _utils.signal_handling._set_SIGCHLD_handler()
         self._worker_pids_set = True
+        self._reset(loader, first_iter=True)
+
+    def _reset(self, loader, first_iter=False):
+        super(_MultiProcessingDataLoaderIter, self)._reset(loader, first_iter)
+        self._send_idx = 0  # idx of the next task to be sent to workers
+        self._rcvd_idx = 0  # idx of the next task to be returned in __next__
+        # information about data not yet yielded, i.e., tasks w/ indices in range [rcvd_idx, send_idx).
+        # map: task idx => - (worker_id,)        if data isn't fetched (outstanding)
+        #                  \ (worker_id, data)   if data is already fetched (out-of-order)
+        self._task_info = {}
+        self._tasks_outstanding = 0  # always equal to count(v for v in task_info.values() if len(v) == 1)
+        self._worker_queue_idx_cycle = itertools.cycle(range(self._num_workers))
+        self._workers_status = [True for _ in range(self._num_workers)]
+        if not first_iter:
+            # The workers are persistent (see `persistent_workers` in
+            # `DataLoader`). Ask each of them to start a new epoch and wait for
+            # all acknowledgements. Anything else received meanwhile is stale
+            # data from tasks of the previous, unfinished epoch, and is dropped.
+            for idx in range(self._num_workers):
+                self._index_queues[idx].put(_utils.worker._ResumeIteration())
+            resume_iteration_cnt = self._num_workers
+            while resume_iteration_cnt > 0:
+                return_idx, return_data = self._get_data()
+                if isinstance(return_idx, _utils.worker._ResumeIteration):
+                    assert return_data is None
+                    resume_iteration_cnt -= 1
+                elif isinstance(return_data, _utils.ring_buffer._RingBufferBatch):
+                    self._ring_buffers[return_data.worker_id].release(return_data)
 
         # prime the prefetch loop
-        for _ in range(2 * self._num_workers):
+        for _ in range(self._prefetch_factor * self._num_workers):
             self._try_put_index()
 
     def _try_get_data(self, timeout=_utils.MP_STATUS_CHECK_INTERVAL):
@@ -944,7 +1033,8 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 self._rcvd_idx += 1
             else:
                 # no valid `self._rcvd_idx` is found (i.e., didn't break)
-                self._shutdown_workers()
+                if not self._persistent_workers:
+                    self._shutdown_workers()
                 raise StopIteration
 
             # Now `self._rcvd_idx` is the batch index we want to fetch
@@ -958,10 +1048,20 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
             idx, data = self._get_data()
             self._tasks_outstanding -= 1
 
+            if isinstance(data, _utils.ring_buffer._RingBufferBatch):
+                # Copy the batch out right away, even if it arrived out of
+                # order, so that the worker can reuse the slot.
+                data = self._ring_buffers[data.worker_id].get(data, pin_memory=self._pin_memory)
+
             if self._dataset_kind == _DatasetKind.Iterable:
                 # Check for _IterableDatasetStopIteration
                 if isinstance(data, _utils.worker._IterableDatasetStopIteration):
-                    self._shutdown_worker(data.worker_id)
+                    if self._persistent_workers:
+                        # Keep the worker alive for the next epoch. It will
+                        # resume once it receives `_ResumeIteration`.
+                        self._workers_status[data.worker_id] = False
+                    else:
+                        self._shutdown_worker(data.worker_id)
                     self._try_put_index()
                     continue
 
@@ -973,7 +1073,7 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 return self._process_data(data)
 
     def _try_put_index(self):
-        assert self._tasks_outstanding < 2 * self._num_workers
+        assert self._tasks_outstanding < self._prefetch_factor * self._num_workers
         try:
             index = self._next_index()
         except StopIteration:
@@ -998,12 +1098,13 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
             data.reraise()
         return data
 
-    def _shutdown_worker(self, worker_id):
+    def _shutdown_worker(self, worker_id, shutdown=False):
         # Mark a worker as having finished its work and dead, e.g., due to
         # exhausting an `IterableDataset`. This should be used only when this
-        # `_MultiProcessingDataLoaderIter` is going to continue running.
+        # `_MultiProcessingDataLoaderIter` is going to continue running, or,
+        # with `shutdown=True`, from `_shutdown_workers`.
 
-        assert self._workers_status[worker_id]
+        assert self._workers_status[worker_id] or (self._persistent_workers and shutdown)
 
         # Signal termination to that specific worker.
         q = self._index_queues[worker_id]
@@ -1053,8 +1154,10 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     # Get number of workers from `len(self._workers)` instead of
                     # `self._num_workers` in case we error before starting all
                     # workers.
-                    if self._workers_status[worker_id]:
-                        self._shutdown_worker(worker_id)
+                    # Persistent workers whose `IterableDataset` replica is
+                    # exhausted are still alive and waiting for the final signal.
+                    if self._persistent_workers or self._workers_status[worker_id]:
+                        self._shutdown_worker(worker_id, shutdown=True)
                 for w in self._workers:
                     w.join()
                 for q in self._index_queues:
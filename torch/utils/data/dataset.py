@@ -1,6 +1,7 @@
 import bisect
 import warnings
 
+import torch
 from torch._utils import _accumulate
 from torch import randperm, default_generator
 
@@ -13,7 +14,12 @@ class Dataset(object):
     data sample for a given key. Subclasses could also optionally overwrite
     :meth:`__len__`, which is expected to return the size of the dataset by many
     :class:`~torch.utils.data.Sampler` implementations and the default options
-    of :class:`~torch.utils.data.DataLoader`.
+    of :class:`~torch.utils.data.DataLoader`. Subclasses could also optionally
+    implement :meth:`__getitems__`, which accepts a list of keys and returns the
+    list of corresponding samples, to speed up loading of batched samples (e.g.,
+    by a single vectorized read instead of one :meth:`__getitem__` call per
+    key). :class:`~torch.utils.data.DataLoader` prefers it over
+    :meth:`__getitem__` when automatic batching is enabled.
 
     .. note::
       :class:`~torch.utils.data.DataLoader` by default constructs a index
@@ -31,6 +37,44 @@ class Dataset(object):
     # See NOTE [ Lack of Default `__len__` in Python Abstract Base Classes ]
     # in pytorch/torch/utils/data/sampler.py
 
+    # No `def __getitems__(self, indices)` default either. `_MapDatasetFetcher`
+    # checks for its presence and falls back to calling `__getitem__` once per
+    # index, so a default here would only add a level of indirection.
+
+
+def _defining_class(cls, name):
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass
+    return None
+
+
+def _has_getitems(dataset):
+    r"""Returns whether ``dataset`` has a batched ``__getitems__`` that agrees
+    with its ``__getitem__``.
+
+    A ``__getitems__`` inherited from a class whose ``__getitem__`` has been
+    overridden by a subclass (e.g., a :class:`TensorDataset` subclass applying a
+    transform) would bypass the overriding ``__getitem__``, so it is only used
+    if it is defined on the class defining ``__getitem__`` or on a subclass of
+    it.
+    """
+    if not getattr(dataset, "__getitems__", None):
+        return False
+    getitems_cls = _defining_class(type(dataset), "__getitems__")
+    getitem_cls = _defining_class(type(dataset), "__getitem__")
+    if getitems_cls is None or getitem_cls is None:
+        return True
+    return issubclass(getitems_cls, getitem_cls)
+
+
+def _getitems(dataset, indices):
+    r"""Fetches the samples at ``indices`` from ``dataset``, using its
+    batched ``__getitems__`` if available."""
+    if _has_getitems(dataset):
+        return dataset.__getitems__(indices)
+    return [dataset[idx] for idx in indices]
+
 
 class IterableDataset(Dataset):
     r"""An iterable Dataset.
@@ -161,6 +205,13 @@ class TensorDataset(Dataset):
     def __getitem__(self, index):
         return tuple(tensor[index] for tensor in self.tensors)
 
+    def __getitems__(self, indices):
+        # Gather the whole batch from each tensor with one indexing op, then
+        # split it back into per-sample views for `collate_fn`.
+        index = torch.as_tensor(indices, dtype=torch.long)
+        batches = [tensor[index].unbind(0) for tensor in self.tensors]
+        return list(zip(*batches))
+
     def __len__(self):
         return self.tensors[0].size(0)
 
@@ -194,7 +245,7 @@ class ConcatDataset(Dataset):
     def __len__(self):
         return self.cumulative_sizes[-1]
 
-    def __getitem__(self, idx):
+    def _locate(self, idx):
         if idx < 0:
             if -idx > len(self):
                 raise ValueError("absolute value of index should not exceed dataset length")
@@ -204,8 +255,28 @@ class ConcatDataset(Dataset):
             sample_idx = idx
         else:
             sample_idx = idx - self.cumulative_sizes[dataset_idx - 1]
+        return dataset_idx, sample_idx
+
+    def __getitem__(self, idx):
+        dataset_idx, sample_idx = self._locate(idx)
         return self.datasets[dataset_idx][sample_idx]
 
+    def __getitems__(self, indices):
+        # Group the keys by the dataset they fall into so that each dataset is
+        # asked for its samples in one batched call, then restore the order.
+        positions = [[] for _ in self.datasets]
+        sample_indices = [[] for _ in self.datasets]
+        for pos, idx in enumerate(indices):
+            dataset_idx, sample_idx = self._locate(idx)
+            positions[dataset_idx].append(pos)
+            sample_indices[dataset_idx].append(sample_idx)
+        samples = [None] * len(indices)
+        for dataset, pos, idx in zip(self.datasets, positions, sample_indices):
+            if len(idx) > 0:
+                for p, sample in zip(pos, _getitems(dataset, idx)):
+                    samples[p] = sample
+        return samples
+
     @property
     def cummulative_sizes(self):
         warnings.warn("cummulative_sizes attribute is renamed to "
@@ -256,6 +327,9 @@ class Subset(Dataset):
     def __getitem__(self, idx):
         return self.dataset[self.indices[idx]]
 
+    def __getitems__(self, indices):
+        return _getitems(self.dataset, [self.indices[idx] for idx in indices])
+
     def __len__(self):
         return len(self.indices)
 
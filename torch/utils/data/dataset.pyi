@@ -16,12 +16,14 @@ class TensorDataset(Dataset[Tuple[Tensor, ...]]):
     tensors: List[Tensor]
 
     def __init__(self, *tensors: Tensor) -> None: ...
+    def __getitems__(self, indices: Sequence[int]) -> List[Tuple[Tensor, ...]]: ...
 
 class ConcatDataset(Dataset[T_co]):
     datasets: List[Dataset[T_co]]
     cumulative_sizes: List[int]
 
     def __init__(self, datasets: Iterable[Dataset]) -> None: ...
+    def __getitems__(self, indices: Sequence[int]) -> List[T_co]: ...
 
 class ChainDataset(Dataset[T_co]):
     def __init__(self, datasets: Iterable[Dataset]) -> None: ...
@@ -31,5 +33,6 @@ class Subset(Dataset[T_co]):
     indices: Sequence[int]
 
     def __init__(self, dataset: Dataset[T_co], indices: Sequence[int]) -> None: ...
+    def __getitems__(self, indices: Sequence[int]) -> List[T_co]: ...
 
 def random_split(dataset: Dataset[T], lengths: Sequence[int], generator: Optional[Generator]) -> List[Subset[T]]: ...
@@ -4,6 +4,53 @@ from . import Sampler
 import torch.distributed as dist
 
 
+# Number of indices of a replica generated at once by lazy shuffling
+_LAZY_CHUNK_SIZE = 65536
+
+
+class _RandomPermutation(object):
+    r"""A pseudo-random permutation of ``range(n)``, whose elements are
+    computed on demand. It is a Feistel network over the smallest even number
+    of bits that fit ``n - 1`` (at most 62), where values outside of
+    ``range(n)`` are encrypted again until they are within it ("cycle
+    walking"). Operating on tensors of positions, it only costs a few
+    elementwise operations per element and round."""
+
+    _NUM_ROUNDS = 6
+
+    def __init__(self, n, generator):
+        self.n = n
+        self.half_bits = (max(2, (n - 1).bit_length()) + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.keys = torch.randint(1 << 31, (self._NUM_ROUNDS,), generator=generator).tolist()
+
+    def _round(self, x, key):
+        # A keyed multiply-xorshift hash. Operands of multiplications are
+        # below 2 ** 31, so products don't overflow int64, and the high bits
+        # of products are folded into the low ones.
+        x = ((x ^ key) & 0x7FFFFFFF) * 0x2545F491
+        x = (x ^ (x >> 31)) & 0x7FFFFFFF
+        x = x * 0x5BD1E995
+        return (x ^ (x >> 31)) & self.mask
+
+    def _encrypt(self, x):
+        left = x >> self.half_bits
+        right = x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __call__(self, positions):
+        r"""Returns the elements at ``positions``, an int64 tensor with values
+        in ``range(n)``."""
+        x = self._encrypt(positions)
+        out_of_range = x >= self.n
+        while out_of_range.any():
+            x[out_of_range] = self._encrypt(x[out_of_range])
+            out_of_range = x >= self.n
+        return x
+
+
 class DistributedSampler(Sampler):
     """Sampler that restricts data loading to a subset of the dataset.
 
@@ -21,12 +68,27 @@ class DistributedSampler(Sampler):
             distributed training.
         rank (optional): Rank of the current process within num_replicas.
         shuffle (optional): If true (default), sampler will shuffle the indices
+        seed (optional): Random seed used to shuffle the sampler, which must
+            be the same on all processes. The permutation of each epoch is
+            determined by ``seed + epoch``. (default: ``0``)
+        lazy_shuffle (optional): If true, the indices of the current process
+            are generated on the fly, in chunks, from a pseudo-random
+            permutation that can be evaluated at any position, instead of
+            materializing a permutation of the whole dataset on every process
+            each epoch. This is a different permutation than the default one.
+            (default: ``False``)
 
     .. warning::
         In distributed mode, calling the ``set_epoch`` method is needed to
         make shuffling work; each process will use the same random seed
         otherwise.
 
+    .. note::
+        To resume training in the middle of an epoch, pass the number of
+        samples this process has already consumed as ``start_index`` to
+        ``set_epoch``. The remaining indices are the same as in an
+        uninterrupted epoch.
+
     Example::
 
         >>> sampler = DistributedSampler(dataset) if is_distributed else None
@@ -36,7 +98,7 @@ class DistributedSampler(Sampler):
         ...     if is_distributed:
     """
 
-    def __init__(self, dataset, num_replicas=None, rank=None, shuffle=True):
+    def __init__(self, dataset, num_replicas=None, rank=None, shuffle=True, seed=0, lazy_shuffle=False):
         if num_replicas is None:
             if not dist.is_available():
                 raise RuntimeError("Requires distributed package to be available")
@@ -52,16 +114,18 @@ class DistributedSampler(Sampler):
         self.num_samples = int(math.ceil(len(self.dataset) * 1.0 / self.num_replicas))
         self.total_size = self.num_samples * self.num_replicas
         self.shuffle = shuffle
+        self.seed = seed
+        self.lazy_shuffle = lazy_shuffle
+        self.start_index = 0
 
     def __iter__(self):
-        if self.shuffle:
-            # deterministically shuffle based on epoch
-            g = torch.Generator()
-            g.manual_seed(self.epoch)
-            indices = torch.randperm(len(self.dataset), generator=g).tolist()
-        else:
-            indices = list(range(len(self.dataset)))
+        if not self.shuffle or self.lazy_shuffle:
+            return self._iter_lazy()
 
+        # deterministically shuffle based on epoch
+        g = torch.Generator()
+        g.manual_seed(self.seed + self.epoch)
+        indices = torch.randperm(len(self.dataset), generator=g).tolist()
 
         # add extra samples to make it evenly divisible
         indices += indices[:(self.total_size - len(indices))]
@@ -71,10 +135,44 @@ class DistributedSampler(Sampler):
         indices = indices[self.rank:self.total_size:self.num_replicas]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        return iter(indices[self.start_index:])
 
-    def __len__(self):
-        return self.num_samples
+    def _iter_lazy(self):
+        # Yields the same indices as above, where position `i` of the padded
+        # list of all indices is `i % len(dataset)` of the permutation, but
+        # only computes those of this process.
+        n = len(self.dataset)
+        permutation = None
+        if self.shuffle:
+            g = torch.Generator()
+            g.manual_seed(self.seed + self.epoch)
+            permutation = _RandomPermutation(n, g)
+        start = self.rank + self.start_index * self.num_replicas
+        step = _LAZY_CHUNK_SIZE * self.num_replicas
+        for chunk_start in range(start, self.total_size, step):
+            chunk_end = min(chunk_start + step, self.total_size)
+            positions = torch.arange(chunk_start, chunk_end, self.num_replicas, dtype=torch.int64) % n
+            if permutation is not None:
+                positions = permutation(positions)
+            for index in positions.tolist():
+                yield index
 
-    def set_epoch(self, epoch):
+    def __len__(self):
+        return self.num_samples - self.start_index
+
+    def set_epoch(self, epoch, start_index=0):
+        r"""Sets the epoch of the next iteration, which determines the
+        permutation of the indices when shuffling.
+
+        Arguments:
+            epoch (int): Epoch number.
+            start_index (int, optional): Number of indices of this process to
+                skip at the beginning of the epoch, e.g., the number of
+                samples already consumed in it before resuming training.
+                (default: ``0``)
+        """
+        if not 0 <= start_index <= self.num_samples:
+            raise ValueError("start_index should be between 0 and num_samples={}, "
+                             "but got start_index={}".format(self.num_samples, start_index))
         self.epoch = epoch
+        self.start_index = start_index
@@ -3,7 +3,7 @@ from . import Sampler, Dataset
 
 T_co = TypeVar('T_co', covariant=True)
 class DistributedSampler(Sampler[T_co]):
-    def __init__(self, dataset: Dataset, num_replicas: Optional[int]=..., rank: Optional[int]=..., shuffle: bool=...): ...
+    def __init__(self, dataset: Dataset, num_replicas: Optional[int]=..., rank: Optional[int]=..., shuffle: bool=..., seed: int=..., lazy_shuffle: bool=...): ...
     def __iter__(self) -> Iterator[T_co]: ...
     def __len__(self) -> int: ...
-    def set_epoch(self, epoch: int) -> None: ...
+    def set_epoch(self, epoch: int, start_index: int=...) -> None: ...
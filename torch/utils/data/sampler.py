@@ -1,3 +1,4 @@
+import math
 import torch
 from torch._six import int_classes as _int_classes
 
@@ -163,6 +164,241 @@ class WeightedRandomSampler(Sampler):
         return self.num_samples
 
 
+class DynamicWeightedRandomSampler(Sampler):
+    r"""Samples elements from ``[0,..,len(weights)-1]`` with given probabilities
+    (weights), which can be updated at any time, e.g., for prioritized
+    experience replay or hard example mining.
+
+    Weights are kept in a sum tree (a binary tree whose nodes hold the sum of
+    the weights of their leaves), so updating ``k`` weights and drawing ``k``
+    indices both take ``O(k log n)`` time. Indices are generated lazily, in
+    chunks of :attr:`chunk_size`. The tree takes 12 bytes per weight: the
+    weights are stored in single precision, and the sums of its inner nodes in
+    double precision.
+
+    For distributed training, the population can be sharded across processes
+    like in :class:`~torch.utils.data.distributed.DistributedSampler`: the
+    process of rank :attr:`rank` only keeps the weights of, and samples
+    among, the indices ``rank, rank + num_replicas, rank + 2 * num_replicas,
+    ...``, and draws ``ceil(num_samples / num_replicas)`` of them per
+    iteration. Without replacement, samples of different processes are thus
+    distinct as well.
+
+    Args:
+        weights (sequence): a sequence of non-negative weights, not necessary
+            summing up to one
+        num_samples (int): number of samples to draw (on all processes)
+        replacement (bool): if ``True``, samples are drawn with replacement.
+            If not, they are drawn without replacement within each iteration.
+        num_replicas (int, optional): Number of processes sharing the
+            population. (default: ``1``)
+        rank (int, optional): Rank of the current process within
+            :attr:`num_replicas`. (default: ``0``)
+        seed (int, optional): Random seed, combined with the epoch given to
+            :meth:`set_epoch` and :attr:`rank`. (default: ``0``)
+        chunk_size (int, optional): Number of indices drawn at once.
+            (default: ``65536``)
+
+    Example:
+        >>> sampler = DynamicWeightedRandomSampler([0.1, 0.9, 0.4, 0.7, 3.0, 0.6], 5)
+        >>> indices = list(sampler)
+        >>> sampler.update_weights(indices, [0.5] * len(indices))
+
+    .. note::
+        Without replacement, weights updated during an iteration for indices
+        already drawn in it take effect at the end of the iteration.
+    """
+
+    def __init__(self, weights, num_samples, replacement=True, num_replicas=1, rank=0, seed=0,
+                 chunk_size=65536):
+        if not isinstance(num_samples, _int_classes) or isinstance(num_samples, bool) or \
+                num_samples <= 0:
+            raise ValueError("num_samples should be a positive integer "
+                             "value, but got num_samples={}".format(num_samples))
+        if not isinstance(replacement, bool):
+            raise ValueError("replacement should be a boolean value, but got "
+                             "replacement={}".format(replacement))
+        if not 0 <= rank < num_replicas:
+            raise ValueError("rank should be between 0 and num_replicas={}, but got "
+                             "rank={}".format(num_replicas, rank))
+        weights = torch.as_tensor(weights, dtype=torch.float)[rank::num_replicas]
+        self._check_weights(weights)
+        self.num_samples = num_samples
+        self.replacement = replacement
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.epoch = 0
+        self.num_local_samples = int(math.ceil(num_samples * 1.0 / num_replicas))
+
+        # The tree has the nodes `[1, 2 * n)` for `n` local weights, and node
+        # `i` has the children `2 * i` and `2 * i + 1`. The leaves `[n, 2 * n)`
+        # hold the weights (`self._weights[i - n]`), and the inner nodes
+        # `[1, n)` the sums of their children (`self._sums[i]`; `_sums[0]` is
+        # unused). Unless `n` is a power of two, leaves are on two levels.
+        self._num_weights = weights.numel()
+        self._weights = weights.clone()
+        self._sums = torch.zeros(max(1, self._num_weights), dtype=torch.double)
+        self._num_levels = max(0, self._num_weights - 1).bit_length()
+        for level in reversed(range(self._num_levels)):
+            node = torch.arange(1 << level, min(2 << level, self._num_weights))
+            self._update_sums(node)
+
+        # State of an iteration without replacement
+        self._drawn = None
+        self._deferred_weights = None
+
+    @staticmethod
+    def _check_weights(weights):
+        if not bool(torch.isfinite(weights).all()) or bool((weights < 0).any()):
+            raise ValueError("weights should be finite and non-negative")
+
+    def _node_sums(self, node):
+        # Returns the sums of the weights below the nodes `node`.
+        is_leaf = node >= self._num_weights
+        leaf_sums = self._weights[(node - self._num_weights).clamp(0, self._num_weights - 1)]
+        inner_sums = self._sums[node.clamp(max=self._sums.numel() - 1)]
+        return torch.where(is_leaf, leaf_sums.double(), inner_sums)
+
+    def _total(self):
+        if self._num_weights == 0:
+            return 0.
+        return float(self._node_sums(torch.ones(1, dtype=torch.long)))
+
+    def _update_sums(self, node):
+        self._sums[node] = self._node_sums(2 * node) + self._node_sums(2 * node + 1)
+
+    def _set_local_weights(self, local_indices, weights):
+        self._weights[local_indices] = weights
+        # Update the ancestors of the leaves level by level, from the bottom,
+        # so that each node is updated after its children.
+        dirty = torch.unique((local_indices + self._num_weights) // 2)
+        for level in reversed(range(self._num_levels)):
+            is_current = dirty >= (1 << level)
+            node, dirty = dirty[is_current], dirty[~is_current]
+            if node.numel() > 0:
+                self._update_sums(node)
+                dirty = torch.unique(torch.cat([dirty, node[node > 1] // 2]))
+
+    def update_weights(self, indices, weights):
+        r"""Sets the weights of the given indices.
+
+        Indices of other processes (with ``num_replicas > 1``) are ignored, so
+        all processes can be given the same updates.
+
+        Args:
+            indices (sequence of int): indices to update, without duplicates
+            weights (sequence of float): their new non-negative weights
+        """
+        indices = torch.as_tensor(indices, dtype=torch.long).reshape(-1)
+        weights = torch.as_tensor(weights, dtype=torch.float).reshape(-1)
+        self._check_weights(weights)
+        is_local = (indices % self.num_replicas) == self.rank
+        indices, weights = indices[is_local] // self.num_replicas, weights[is_local]
+        if indices.numel() > 0 and int(indices.max()) >= self._num_weights:
+            raise IndexError("index out of range for the weights of the sampler")
+        if self._drawn is not None:
+            drawn = self._drawn[indices]
+            for index, weight in zip(indices[drawn].tolist(), weights[drawn].tolist()):
+                self._deferred_weights[index] = weight
+            indices, weights = indices[~drawn], weights[~drawn]
+        if indices.numel() > 0:
+            self._set_local_weights(indices, weights)
+
+    def _sample(self, num_draws, generator):
+        # Draws `num_draws` local indices with replacement, by descending from
+        # the root to the leaf whose range of cumulative weights holds a
+        # uniformly drawn value.
+        local_indices = torch.empty(num_draws, dtype=torch.long)
+        todo = torch.arange(num_draws)
+        total = self._total()
+        while todo.numel() > 0:
+            value = torch.rand(todo.numel(), dtype=torch.double, generator=generator) * total
+            node = torch.ones(todo.numel(), dtype=torch.long)
+            # The leaves are at most `_num_levels` levels below the root
+            for _ in range(self._num_levels):
+                is_inner = node < self._num_weights
+                left = torch.where(is_inner, 2 * node, node)
+                left_sum = self._node_sums(left)
+                go_right = is_inner & (value >= left_sum)
+                value = torch.where(go_right, value - left_sum, value)
+                node = torch.where(is_inner, left + go_right.long(), node)
+            local_indices[todo] = node - self._num_weights
+            # Rounding errors can lead to a leaf of weight zero; draw again.
+            todo = todo[self._weights[node - self._num_weights] <= 0]
+        return local_indices
+
+    def _to_global(self, local_indices):
+        return (local_indices * self.num_replicas + self.rank).tolist()
+
+    def __iter__(self):
+        generator = torch.Generator()
+        generator.manual_seed((self.seed + self.epoch) * self.num_replicas + self.rank)
+        if self.replacement:
+            return self._iter_with_replacement(generator)
+        return self._iter_without_replacement(generator)
+
+    def _iter_with_replacement(self, generator):
+        for start in range(0, self.num_local_samples, self.chunk_size):
+            num_draws = min(self.chunk_size, self.num_local_samples - start)
+            if self._total() <= 0:
+                raise RuntimeError("cannot sample from weights that are all zero")
+            for index in self._to_global(self._sample(num_draws, generator)):
+                yield index
+
+    def _iter_without_replacement(self, generator):
+        if self._drawn is not None:
+            raise RuntimeError("only one iteration without replacement can be running at a time")
+        self._drawn = torch.zeros(self._num_weights, dtype=torch.bool)
+        self._deferred_weights = {}
+        drawn_indices = []
+        drawn_weights = []
+        try:
+            remaining = self.num_local_samples
+            while remaining > 0:
+                if self._total() <= 0:
+                    raise RuntimeError("not enough samples with non-zero weights to draw "
+                                       "{} samples without replacement".format(self.num_local_samples))
+                num_draws = min(self.chunk_size, remaining)
+                candidates = self._sample(num_draws, generator)
+                # Drawing with replacement and dropping repetitions is the same
+                # as drawing without replacement. Keep the first occurrence of
+                # each index, in the order of drawing.
+                unique, inverse = torch.unique(candidates, return_inverse=True)
+                keys, _ = torch.sort(inverse * num_draws + torch.arange(num_draws))
+                groups = keys // num_draws
+                is_first = torch.ones(num_draws, dtype=torch.bool)
+                is_first[1:] = groups[1:] != groups[:-1]
+                first_positions, _ = torch.sort(keys[is_first] % num_draws)
+                local_indices = candidates[first_positions]
+
+                drawn_indices.append(local_indices)
+                drawn_weights.append(self._weights[local_indices])
+                self._drawn[local_indices] = True
+                self._set_local_weights(local_indices, torch.zeros(local_indices.numel()))
+                remaining -= local_indices.numel()
+                for index in self._to_global(local_indices):
+                    yield index
+        finally:
+            if drawn_indices:
+                self._set_local_weights(torch.cat(drawn_indices), torch.cat(drawn_weights))
+            if self._deferred_weights:
+                self._set_local_weights(
+                    torch.tensor(list(self._deferred_weights.keys()), dtype=torch.long),
+                    torch.tensor(list(self._deferred_weights.values()), dtype=torch.float))
+            self._drawn = None
+            self._deferred_weights = None
+
+    def __len__(self):
+        return self.num_local_samples
+
+    def set_epoch(self, epoch):
+        r"""Sets the epoch of the next iteration, which determines the random
+        draws together with :attr:`seed` and :attr:`rank`."""
+        self.epoch = epoch
+
+
 class BatchSampler(Sampler):
     r"""Wraps another sampler to yield a mini-batch of indices.
 
@@ -30,6 +30,21 @@ class WeightedRandomSampler(Sampler[int]):
 
     def __init__(self, weights: Sequence[float], num_samples: int, replacement: bool=...) -> None: ...
 
+class DynamicWeightedRandomSampler(Sampler[int]):
+    num_samples: int
+    replacement: bool
+    num_replicas: int
+    rank: int
+    seed: int
+    chunk_size: int
+    epoch: int
+    num_local_samples: int
+
+    def __init__(self, weights: Sequence[float], num_samples: int, replacement: bool=..., num_replicas: int=...,
+                 rank: int=..., seed: int=..., chunk_size: int=...) -> None: ...
+    def update_weights(self, indices: Sequence[int], weights: Sequence[float]) -> None: ...
+    def set_epoch(self, epoch: int) -> None: ...
+
 class BatchSampler(Sampler[List[int]]):
     sampler: Sampler[int]
     batch_size: int
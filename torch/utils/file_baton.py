@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 import os
+import socket
 import sys
 import time
 
@@ -9,10 +10,21 @@ if sys.version < '3.3':
     FileExistsError = OSError
 
 
+def _pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, but belongs to another user
+        return True
+    return True
+
+
 class FileBaton:
     '''A primitive, file-based synchronization utility.'''
 
-    def __init__(self, lock_file_path, wait_seconds=0.1):
+    def __init__(self, lock_file_path, wait_seconds=0.1, stale_seconds=None):
         '''
         Creates a new :class:`FileBaton`.
 
@@ -20,9 +32,16 @@ class FileBaton:
             lock_file_path: The path to the file used for locking.
             wait_seconds: The seconds to periorically sleep (spin) when
                 calling ``wait()``.
+            stale_seconds: If not ``None``, ``wait()`` removes the file of a
+                baton whose holder has died, so that a killed process does
+                not make others wait forever. The holder's process ID is
+                checked if it runs on the same host. Otherwise (or on
+                Windows), the baton is considered stale once its file has
+                not been modified for ``stale_seconds`` seconds.
         '''
         self.lock_file_path = lock_file_path
         self.wait_seconds = wait_seconds
+        self.stale_seconds = stale_seconds
         self.fd = None
 
     def try_acquire(self):
@@ -33,10 +52,12 @@ class FileBaton:
             True if the file could be created, else False.
         '''
         try:
-            self.fd = os.open(self.lock_file_path, os.O_CREAT | os.O_EXCL)
-            return True
+            self.fd = os.open(self.lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
         except FileExistsError:
             return False
+        # Record the holder, for waiters to check whether it is still alive
+        os.write(self.fd, '{} {}'.format(socket.gethostname(), os.getpid()).encode('utf-8'))
+        return True
 
     def wait(self):
         '''
@@ -46,11 +67,52 @@ class FileBaton:
         passed to the constructor.
         '''
         while os.path.exists(self.lock_file_path):
+            if self.stale_seconds is not None and self._remove_if_stale():
+                break
             time.sleep(self.wait_seconds)
 
+    def _read_holder(self):
+        try:
+            with open(self.lock_file_path, 'rb') as f:
+                return f.read().decode('utf-8', 'replace')
+        except (IOError, OSError):
+            return None
+
+    def _is_stale(self, holder):
+        try:
+            host, pid = holder.rsplit(' ', 1)
+            pid = int(pid)
+        except ValueError:
+            # Written by an older version, or not written yet
+            host, pid = None, None
+        if host == socket.gethostname() and sys.platform != 'win32':
+            return not _pid_exists(pid)
+        try:
+            age = time.time() - os.path.getmtime(self.lock_file_path)
+        except (IOError, OSError):
+            return False
+        return age > self.stale_seconds
+
+    def _remove_if_stale(self):
+        holder = self._read_holder()
+        if holder is None or not self._is_stale(holder):
+            return False
+        # Make sure that the baton has not been acquired again in the meantime
+        if self._read_holder() != holder:
+            return False
+        try:
+            os.remove(self.lock_file_path)
+        except (IOError, OSError):
+            pass
+        return True
+
     def release(self):
         '''Releases the baton and removes its file.'''
         if self.fd is not None:
             os.close(self.fd)
 
-        os.remove(self.lock_file_path)
+        try:
+            os.remove(self.lock_file_path)
+        except FileNotFoundError:
+            # Removed by a waiter that took the baton to be stale
+            pass
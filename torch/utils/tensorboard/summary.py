@@ -4,8 +4,10 @@ from __future__ import print_function
 
 import json
 import logging
+import numbers
 import numpy as np
 import os
+import torch
 
 # pylint: disable=unused-import
 from six.moves import range
@@ -230,17 +232,155 @@ def histogram(name, values, bins, max_bins=None):
       A scalar `Tensor` of type `string`. The serialized `Summary` protocol
       buffer.
     """
+    if isinstance(values, torch.Tensor) and _is_torch_bins(bins):
+        return histograms({name: values}, bins, max_bins)
     values = make_np(values)
     hist = make_histogram(values.astype(float), bins, max_bins)
     return Summary(value=[Summary.Value(tag=name, histo=hist)])
 
 
+def histograms(tag_values_dict, bins, max_bins=None, percentiles=None):
+    """Outputs a `Summary` protocol buffer with a histogram for each of the
+    values in `tag_values_dict`.
+
+    The histograms of torch tensors, unless `bins` is a string, and their
+    statistics are computed with torch ops on the device of the tensors, and
+    only the bucket counts and statistics are copied to host, at once for all
+    tensors on a device.
+    Args:
+      tag_values_dict: A dict of names and real numeric `Tensor`s or numpy
+        arrays of any shape to build histograms of.
+      bins: The number of bins, the bin edges, or a string like 'auto', as for
+        `numpy.histogram`. Tensors are converted to numpy for strings.
+      max_bins: Optional maximum number of bins.
+      percentiles: Optional list of percentiles in [0, 100]. If given, the
+        summary also has scalars `name/min`, `name/max`, `name/mean`,
+        `name/std` and `name/p<percentile>` for each name.
+    Returns:
+      A scalar `Tensor` of type `string`. The serialized `Summary` protocol
+      buffer.
+    """
+    percentiles = [] if percentiles is None else list(percentiles)
+    results = {}
+    device_results = {}
+    for name, values in tag_values_dict.items():
+        if isinstance(values, torch.Tensor) and _is_torch_bins(bins):
+            if values.numel() == 0:
+                raise ValueError('The input has no element.')
+            packed, num_bins = _torch_histogram_stats(values, bins, percentiles)
+            device_results.setdefault(packed.device, []).append((name, packed, num_bins, values.numel()))
+        else:
+            values = make_np(values).astype(float).reshape(-1)
+            hist = make_histogram(values, bins, max_bins)
+            stats = []
+            if percentiles:
+                stats = [values.min(), values.max(), values.mean(), values.std()]
+                stats.extend(np.percentile(values, percentiles))
+            results[name] = (hist, stats)
+
+    for packed_results in device_results.values():
+        # One copy to host for all the tensors on a device
+        all_packed = torch.cat([packed for _, packed, _, _ in packed_results]).cpu().numpy()
+        offset = 0
+        for name, packed, num_bins, num in packed_results:
+            counts = all_packed[offset:offset + num_bins]
+            limits = all_packed[offset + num_bins:offset + 2 * num_bins + 1]
+            min_val, max_val, sum_val, sum_squares, std = \
+                all_packed[offset + 2 * num_bins + 1:offset + 2 * num_bins + 6]
+            offset += packed.numel()
+            hist = _make_histogram_proto(counts, limits, min_val, max_val, num, sum_val, sum_squares, max_bins)
+            stats = []
+            if percentiles:
+                stats = [min_val, max_val, sum_val / num, std]
+                stats.extend(all_packed[offset - len(percentiles):offset])
+            results[name] = (hist, stats)
+
+    summary_values = []
+    stat_names = ['min', 'max', 'mean', 'std'] + ['p{:g}'.format(q) for q in percentiles]
+    for name in tag_values_dict:
+        hist, stats = results[name]
+        summary_values.append(Summary.Value(tag=name, histo=hist))
+        for stat_name, stat in zip(stat_names, stats):
+            summary_values.append(Summary.Value(tag=name + '/' + stat_name, simple_value=float(stat)))
+    return Summary(value=summary_values)
+
+
+def _is_torch_bins(bins):
+    """Whether the histogram of a tensor with the given bins is computed with
+    torch ops, which is the case for a number of bins or bin edges."""
+    if isinstance(bins, bool):
+        return False
+    return isinstance(bins, (numbers.Integral, list, tuple, np.ndarray, torch.Tensor))
+
+
+def _torch_histogram_stats(values, bins, percentiles):
+    """Computes the bucket counts and limits of the histogram of the tensor
+    `values` like `numpy.histogram`, as well as the min, max, sum, sum of
+    squares, standard deviation and `percentiles` of `values`, with torch ops
+    on the device of `values`. Returns them packed in a double tensor on that
+    device, to copy them to host at once, and the number of bins."""
+    values = values.detach().reshape(-1)
+    if not values.is_floating_point() or values.dtype in (torch.half, torch.bfloat16):
+        values = values.to(torch.float)
+    min_val = values.min()
+    max_val = values.max()
+    if isinstance(bins, numbers.Integral):
+        num_bins = int(bins)
+        # Like numpy, use the range of the values, widened if it's empty
+        empty_range = (min_val == max_val).to(torch.double)
+        lower = min_val.to(torch.double) - 0.5 * empty_range
+        upper = max_val.to(torch.double) + 0.5 * empty_range
+        steps = torch.arange(num_bins + 1, dtype=torch.double, device=values.device)
+        limits = lower + (upper - lower) * steps / num_bins
+        bin_indices = ((values - lower.to(values.dtype)) * (num_bins / (upper - lower)).to(values.dtype))
+        bin_indices = torch.clamp(bin_indices.floor().to(torch.long), 0, num_bins - 1)
+    else:
+        limits = torch.as_tensor(bins, dtype=torch.double).to(values.device)
+        num_bins = limits.numel() - 1
+        boundaries = limits.to(values.dtype)
+        bin_indices = torch.bucketize(values, boundaries, right=True) - 1
+        # The last bin includes its upper limit, and values out of range are
+        # counted in an extra bin, which is discarded
+        bin_indices.masked_fill_(values == boundaries[-1], num_bins - 1)
+        bin_indices.masked_fill_((bin_indices < 0) | (bin_indices >= num_bins), num_bins)
+    ones = torch.ones((), dtype=torch.double, device=values.device).expand(bin_indices.shape)
+    counts = torch.zeros(num_bins + 1, dtype=torch.double, device=values.device)
+    counts.scatter_add_(0, bin_indices, ones)
+
+    stats = torch.stack([
+        min_val.to(torch.double),
+        max_val.to(torch.double),
+        values.sum(dtype=torch.double),
+        values.pow(2).sum(dtype=torch.double),
+        values.std(unbiased=False).to(torch.double),
+    ])
+    packed = [counts[:num_bins], limits, stats]
+    if percentiles:
+        # Linear interpolation between the closest ranks, like numpy
+        sorted_values = values.sort()[0].to(torch.double)
+        positions = torch.tensor(percentiles, dtype=torch.double) / 100 * (values.numel() - 1)
+        lower_indices = positions.floor().to(torch.long)
+        upper_indices = positions.ceil().to(torch.long)
+        fractions = (positions - lower_indices.to(torch.double)).to(values.device)
+        lower_values = sorted_values[lower_indices.to(values.device)]
+        upper_values = sorted_values[upper_indices.to(values.device)]
+        packed.append(lower_values + (upper_values - lower_values) * fractions)
+    return torch.cat(packed), num_bins
+
+
 def make_histogram(values, bins, max_bins=None):
     """Convert values into a histogram proto using logic from histogram.cc."""
     if values.size == 0:
         raise ValueError('The input has no element.')
     values = values.reshape(-1)
     counts, limits = np.histogram(values, bins=bins)
+    return _make_histogram_proto(counts, limits, values.min(), values.max(), len(values),
+                                 values.sum(), values.dot(values), max_bins)
+
+
+def _make_histogram_proto(counts, limits, min, max, num, sum, sum_squares, max_bins=None):
+    """Makes a histogram proto from the bucket counts and limits, as returned
+    by `numpy.histogram`, and the statistics of the values."""
     num_bins = len(counts)
     if max_bins is not None and num_bins > max_bins:
         subsampling = num_bins // max_bins
@@ -271,12 +411,11 @@ def make_histogram(values, bins, max_bins=None):
     if counts.size == 0 or limits.size == 0:
         raise ValueError('The histogram is empty, please file a bug report.')
 
-    sum_sq = values.dot(values)
-    return HistogramProto(min=values.min(),
-                          max=values.max(),
-                          num=len(values),
-                          sum=values.sum(),
-                          sum_squares=sum_sq,
+    return HistogramProto(min=min,
+                          max=max,
+                          num=num,
+                          sum=sum,
+                          sum_squares=sum_squares,
                           bucket_limit=limits.tolist(),
                           bucket=counts.tolist())
 
@@ -505,6 +644,7 @@ def pr_curve_raw(tag, tp, fp, tn, fn, precision, recall, num_thresholds=127, wei
 def pr_curve(tag, labels, predictions, num_thresholds=127, weights=None):
     # weird, value > 127 breaks protobuf
     num_thresholds = min(num_thresholds, 127)
+    labels, predictions = make_np(labels), make_np(predictions)
     data = compute_curve(labels, predictions,
                          num_thresholds=num_thresholds, weights=weights)
     pr_curve_plugin_data = PrCurvePluginData(
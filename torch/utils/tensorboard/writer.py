@@ -6,8 +6,13 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import queue
 import six
+import threading
 import time
+import warnings
+
+import numpy as np
 import torch
 
 from tensorboard.compat import tf
@@ -25,7 +30,7 @@ from ._onnx_graph import load_onnx_graph
 from ._pytorch_graph import graph
 from ._utils import figure_to_image
 from .summary import (
-    scalar, histogram, histogram_raw, image, audio, text,
+    scalar, histogram, histograms, histogram_raw, image, audio, text,
     pr_curve, pr_curve_raw, video, custom_scalars, image_boxes, mesh, hparams
 )
 
@@ -151,6 +156,98 @@ class FileWriter(object):
         self.event_writer.reopen()
 
 
+def _snapshot(value):
+    """Returns a copy of a tensor or numpy array, or of a dict of them, that
+    won't change if the original is modified in-place, leaving tensors on their
+    device."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().clone()
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _snapshot(v) for k, v in value.items()}
+    return value
+
+
+def _cuda_devices(values):
+    """Returns the set of CUDA devices of the tensors in values, which may be
+    in dicts."""
+    devices = set()
+    for value in values:
+        if isinstance(value, dict):
+            devices.update(_cuda_devices(value.values()))
+        elif isinstance(value, torch.Tensor) and value.is_cuda:
+            devices.add(value.device)
+    return devices
+
+
+class _SummaryWorker(object):
+    """Builds summaries from snapshots of their data and adds them to their
+    `FileWriter` in a background thread, for a `SummaryWriter` with
+    ``async_summaries=True``.
+
+    At most `max_pending` summaries are queued. When the queue is full, `put`
+    blocks until there is room if `queue_full_policy` is ``'block'``, or drops
+    the summary if it is ``'drop'``. An exception raised while building a
+    summary is raised again by the next call of `put`, `join` or `close`.
+    """
+
+    def __init__(self, max_pending, queue_full_policy):
+        self._queue = queue.Queue(max_pending)
+        self._queue_full_policy = queue_full_policy
+        self._exception = None
+        self.num_dropped = 0
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                file_writer, summary_fn, args, kwargs, events, global_step, walltime = item
+                # Wait for the snapshots of CUDA tensors to be taken
+                for event in events:
+                    event.synchronize()
+                file_writer.add_summary(summary_fn(*args, **kwargs), global_step, walltime)
+            except Exception as e:
+                if self._exception is None:
+                    self._exception = e
+            finally:
+                self._queue.task_done()
+
+    def _check_exception(self):
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+
+    def put(self, item):
+        self._check_exception()
+        if self._queue_full_policy == 'block':
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.num_dropped == 0:
+                warnings.warn('Dropping summaries, as {} summaries are pending. Increase '
+                              'max_pending_summaries to avoid this.'.format(self._queue.maxsize))
+            self.num_dropped += 1
+
+    def join(self):
+        """Waits until all queued summaries have been added."""
+        self._queue.join()
+        self._check_exception()
+
+    def close(self):
+        """Adds all queued summaries and stops the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._check_exception()
+
+
 class SummaryWriter(object):
     """Writes entries directly to event files in the log_dir to be
     consumed by TensorBoard.
@@ -163,7 +260,8 @@ class SummaryWriter(object):
     """
 
     def __init__(self, log_dir=None, comment='', purge_step=None, max_queue=10,
-                 flush_secs=120, filename_suffix=''):
+                 flush_secs=120, filename_suffix='', async_summaries=False,
+                 max_pending_summaries=100, queue_full_policy='block'):
         """Creates a `SummaryWriter` that will write out events and summaries
         to the event file.
 
@@ -188,6 +286,20 @@ class SummaryWriter(object):
             filename_suffix (string): Suffix added to all event filenames in
               the log_dir directory. More details on filename construction in
               tensorboard.summary.writer.event_file_writer.EventFileWriter.
+            async_summaries (bool): If ``True``, the ``add_*`` methods that take
+              tensors or arrays (e.g. ``add_scalar``, ``add_histogram``,
+              ``add_image``) only take a snapshot of them, on their device, and
+              the conversion to numpy, histogram bucketing, image encoding and
+              serialization are done in a background thread. Errors are then
+              raised by a later call of an ``add_*`` method, ``flush`` or
+              ``close``. Default is ``False``.
+            max_pending_summaries (int): Maximum number of summaries queued for
+              the background thread with ``async_summaries``, which bounds the
+              memory used by snapshots. Default is 100.
+            queue_full_policy (string): What the ``add_*`` methods do when
+              ``max_pending_summaries`` summaries are queued with
+              ``async_summaries``: ``'block'`` waits until one is done, and
+              ``'drop'`` drops the new summary. Default is ``'block'``.
 
         Examples::
 
@@ -205,6 +317,9 @@ class SummaryWriter(object):
             writer = SummaryWriter(comment="LR_0.1_BATCH_16")
             # folder location: runs/May04_22-14-54_s-MacBook-Pro.localLR_0.1_BATCH_16/
 
+            # create a summary writer that builds summaries in the background.
+            writer = SummaryWriter(async_summaries=True)
+
         """
         torch._C._log_api_usage_once("tensorboard.create.summarywriter")
         if not log_dir:
@@ -218,6 +333,13 @@ class SummaryWriter(object):
         self.max_queue = max_queue
         self.flush_secs = flush_secs
         self.filename_suffix = filename_suffix
+        if queue_full_policy not in ('block', 'drop'):
+            raise ValueError("queue_full_policy should be 'block' or 'drop', but got "
+                             "queue_full_policy={}".format(queue_full_policy))
+        self.async_summaries = async_summaries
+        self.max_pending_summaries = max_pending_summaries
+        self.queue_full_policy = queue_full_policy
+        self._summary_worker = None
 
         # Initialize the file writers, but they can be cleared out on close
         # and recreated later as needed.
@@ -264,6 +386,42 @@ class SummaryWriter(object):
                 self.purge_step = None
         return self.file_writer
 
+    def _add_summary(self, summary_fn, args, kwargs=None, global_step=None,
+                     walltime=None, file_writer=None):
+        """Adds the summary returned by ``summary_fn(*args, **kwargs)`` to
+        file_writer, or the default FileWriter. With async_summaries, the
+        summary is built in the background from snapshots of the tensor and
+        array arguments.
+        """
+        if kwargs is None:
+            kwargs = {}
+        if file_writer is None:
+            file_writer = self._get_file_writer()
+        if not self.async_summaries:
+            file_writer.add_summary(summary_fn(*args, **kwargs), global_step, walltime)
+            return
+
+        args = tuple(_snapshot(arg) for arg in args)
+        kwargs = {k: _snapshot(v) for k, v in kwargs.items()}
+        events = []
+        for device in _cuda_devices(list(args) + list(kwargs.values())):
+            event = torch.cuda.Event()
+            event.record(torch.cuda.current_stream(device))
+            events.append(event)
+        walltime = time.time() if walltime is None else walltime
+        if self._summary_worker is None:
+            self._summary_worker = _SummaryWorker(self.max_pending_summaries, self.queue_full_policy)
+        self._summary_worker.put((file_writer, summary_fn, args, kwargs, events, global_step, walltime))
+
+    @property
+    def num_dropped_summaries(self):
+        """Number of summaries dropped since the last `close` because
+        max_pending_summaries summaries were queued, with
+        ``async_summaries=True`` and ``queue_full_policy='drop'``."""
+        if self._summary_worker is None:
+            return 0
+        return self._summary_worker.num_dropped
+
     def get_logdir(self):
         """Returns the directory where event files will be written."""
         return self.log_dir
@@ -340,8 +498,7 @@ class SummaryWriter(object):
         torch._C._log_api_usage_once("tensorboard.logging.add_scalar")
         if self._check_caffe2_blob(scalar_value):
             scalar_value = workspace.FetchBlob(scalar_value)
-        self._get_file_writer().add_summary(
-            scalar(tag, scalar_value), global_step, walltime)
+        self._add_summary(scalar, (tag, scalar_value), global_step=global_step, walltime=walltime)
 
     def add_scalars(self, main_tag, tag_scalar_dict, global_step=None, walltime=None):
         """Adds many scalar data to summary.
@@ -385,12 +542,16 @@ class SummaryWriter(object):
                 self.all_writers[fw_tag] = fw
             if self._check_caffe2_blob(scalar_value):
                 scalar_value = workspace.FetchBlob(scalar_value)
-            fw.add_summary(scalar(main_tag, scalar_value),
-                           global_step, walltime)
+            self._add_summary(scalar, (main_tag, scalar_value), global_step=global_step,
+                              walltime=walltime, file_writer=fw)
 
     def add_histogram(self, tag, values, global_step=None, bins='tensorflow', walltime=None, max_bins=None):
         """Add histogram to summary.
 
+        The histogram of a tensor is computed with torch ops on its device,
+        unless ``bins`` is a string other than ``'tensorflow'``, so that only the
+        bucket counts are copied to host.
+
         Args:
             tag (string): Data identifier
             values (torch.Tensor, numpy.array, or string/blobname): Values to build histogram
@@ -421,8 +582,48 @@ class SummaryWriter(object):
             values = workspace.FetchBlob(values)
         if isinstance(bins, six.string_types) and bins == 'tensorflow':
             bins = self.default_bins
-        self._get_file_writer().add_summary(
-            histogram(tag, values, bins, max_bins=max_bins), global_step, walltime)
+        self._add_summary(histogram, (tag, values, bins), {'max_bins': max_bins},
+                          global_step, walltime)
+
+    def add_histograms(self, tag_values_dict, global_step=None, bins='tensorflow', walltime=None,
+                       max_bins=None, percentiles=None):
+        """Add histograms of many values to summary.
+
+        The histograms of tensors, as well as their statistics, are computed
+        on the device of the tensors, as with ``add_histogram``, and only the
+        bucket counts and statistics of all the tensors on a device are copied
+        to host, at once.
+
+        Args:
+            tag_values_dict (dict): Key-value pair storing the tag and
+              corresponding values (torch.Tensor, numpy.array, or string/blobname)
+            global_step (int): Global step value to record
+            bins (string): Same as for ``add_histogram``
+            walltime (float): Optional override default walltime (time.time())
+              seconds after epoch of event
+            max_bins (int): Optional maximum number of bins
+            percentiles (list of float): If given, also add scalars with the
+              tags ``tag/min``, ``tag/max``, ``tag/mean``, ``tag/std`` and
+              ``tag/p<percentile>`` (e.g. ``tag/p99``) for each tag, for the
+              given percentiles in [0, 100]
+
+        Examples::
+
+            from torch.utils.tensorboard import SummaryWriter
+            writer = SummaryWriter()
+            for i in range(10):
+                writer.add_histograms({name: param for name, param in model.named_parameters()},
+                                      i, percentiles=[1, 50, 99])
+            writer.close()
+        """
+        torch._C._log_api_usage_once("tensorboard.logging.add_histograms")
+        tag_values_dict = {tag: workspace.FetchBlob(values) if self._check_caffe2_blob(values) else values
+                           for tag, values in tag_values_dict.items()}
+        if isinstance(bins, six.string_types) and bins == 'tensorflow':
+            bins = self.default_bins
+        self._add_summary(histograms, (tag_values_dict, bins),
+                          {'max_bins': max_bins, 'percentiles': percentiles},
+                          global_step, walltime)
 
     def add_histogram_raw(self, tag, min, max, num, sum, sum_squares,
                           bucket_limits, bucket_counts, global_step=None,
@@ -479,17 +680,18 @@ class SummaryWriter(object):
         torch._C._log_api_usage_once("tensorboard.logging.add_histogram_raw")
         if len(bucket_limits) != len(bucket_counts):
             raise ValueError('len(bucket_limits) != len(bucket_counts), see the document.')
-        self._get_file_writer().add_summary(
-            histogram_raw(tag,
-                          min,
-                          max,
-                          num,
-                          sum,
-                          sum_squares,
-                          bucket_limits,
-                          bucket_counts),
-            global_step,
-            walltime)
+        self._add_summary(
+            histogram_raw,
+            (tag,
+             min,
+             max,
+             num,
+             sum,
+             sum_squares,
+             bucket_limits,
+             bucket_counts),
+            global_step=global_step,
+            walltime=walltime)
 
     def add_image(self, tag, img_tensor, global_step=None, walltime=None, dataformats='CHW'):
         """Add image data to summary.
@@ -536,8 +738,8 @@ class SummaryWriter(object):
         torch._C._log_api_usage_once("tensorboard.logging.add_image")
         if self._check_caffe2_blob(img_tensor):
             img_tensor = workspace.FetchBlob(img_tensor)
-        self._get_file_writer().add_summary(
-            image(tag, img_tensor, dataformats=dataformats), global_step, walltime)
+        self._add_summary(image, (tag, img_tensor), {'dataformats': dataformats},
+                          global_step, walltime)
 
     def add_images(self, tag, img_tensor, global_step=None, walltime=None, dataformats='NCHW'):
         """Add batched image data to summary.
@@ -579,8 +781,8 @@ class SummaryWriter(object):
         torch._C._log_api_usage_once("tensorboard.logging.add_images")
         if self._check_caffe2_blob(img_tensor):
             img_tensor = workspace.FetchBlob(img_tensor)
-        self._get_file_writer().add_summary(
-            image(tag, img_tensor, dataformats=dataformats), global_step, walltime)
+        self._add_summary(image, (tag, img_tensor), {'dataformats': dataformats},
+                          global_step, walltime)
 
     def add_image_with_boxes(self, tag, img_tensor, box_tensor, global_step=None,
                              walltime=None, rescale=1, dataformats='CHW', labels=None):
@@ -615,8 +817,9 @@ class SummaryWriter(object):
                 labels = [labels]
             if len(labels) != box_tensor.shape[0]:
                 labels = None
-        self._get_file_writer().add_summary(image_boxes(
-            tag, img_tensor, box_tensor, rescale=rescale, dataformats=dataformats, labels=labels), global_step, walltime)
+        self._add_summary(image_boxes, (tag, img_tensor, box_tensor),
+                          {'rescale': rescale, 'dataformats': dataformats, 'labels': labels},
+                          global_step, walltime)
 
     def add_figure(self, tag, figure, global_step=None, close=True, walltime=None):
         """Render matplotlib figure into an image and add it to summary.
@@ -653,8 +856,7 @@ class SummaryWriter(object):
             vid_tensor: :math:`(N, T, C, H, W)`. The values should lie in [0, 255] for type `uint8` or [0, 1] for type `float`.
         """
         torch._C._log_api_usage_once("tensorboard.logging.add_video")
-        self._get_file_writer().add_summary(
-            video(tag, vid_tensor, fps), global_step, walltime)
+        self._add_summary(video, (tag, vid_tensor, fps), global_step=global_step, walltime=walltime)
 
     def add_audio(self, tag, snd_tensor, global_step=None, sample_rate=44100, walltime=None):
         """Add audio data to summary.
@@ -672,8 +874,8 @@ class SummaryWriter(object):
         torch._C._log_api_usage_once("tensorboard.logging.add_audio")
         if self._check_caffe2_blob(snd_tensor):
             snd_tensor = workspace.FetchBlob(snd_tensor)
-        self._get_file_writer().add_summary(
-            audio(tag, snd_tensor, sample_rate=sample_rate), global_step, walltime)
+        self._add_summary(audio, (tag, snd_tensor), {'sample_rate': sample_rate},
+                          global_step, walltime)
 
     def add_text(self, tag, text_string, global_step=None, walltime=None):
         """Add text data to summary.
@@ -690,8 +892,7 @@ class SummaryWriter(object):
             writer.add_text('rnn', 'This is an rnn', 10)
         """
         torch._C._log_api_usage_once("tensorboard.logging.add_text")
-        self._get_file_writer().add_summary(
-            text(tag, text_string), global_step, walltime)
+        self._add_summary(text, (tag, text_string), global_step=global_step, walltime=walltime)
 
     def add_onnx_graph(self, prototxt):
         torch._C._log_api_usage_once("tensorboard.logging.add_onnx_graph")
@@ -854,10 +1055,8 @@ class SummaryWriter(object):
 
         """
         torch._C._log_api_usage_once("tensorboard.logging.add_pr_curve")
-        labels, predictions = make_np(labels), make_np(predictions)
-        self._get_file_writer().add_summary(
-            pr_curve(tag, labels, predictions, num_thresholds, weights),
-            global_step, walltime)
+        self._add_summary(pr_curve, (tag, labels, predictions, num_thresholds, weights),
+                          global_step=global_step, walltime=walltime)
 
     def add_pr_curve_raw(self, tag, true_positive_counts,
                          false_positive_counts,
@@ -886,18 +1085,19 @@ class SummaryWriter(object):
             see: https://github.com/tensorflow/tensorboard/blob/master/tensorboard/plugins/pr_curve/README.md
         """
         torch._C._log_api_usage_once("tensorboard.logging.add_pr_curve_raw")
-        self._get_file_writer().add_summary(
-            pr_curve_raw(tag,
-                         true_positive_counts,
-                         false_positive_counts,
-                         true_negative_counts,
-                         false_negative_counts,
-                         precision,
-                         recall,
-                         num_thresholds,
-                         weights),
-            global_step,
-            walltime)
+        self._add_summary(
+            pr_curve_raw,
+            (tag,
+             true_positive_counts,
+             false_positive_counts,
+             true_negative_counts,
+             false_negative_counts,
+             precision,
+             recall,
+             num_thresholds,
+             weights),
+            global_step=global_step,
+            walltime=walltime)
 
     def add_custom_scalars_multilinechart(self, tags, category='default', title='untitled'):
         """Shorthand for creating multilinechart. Similar to ``add_custom_scalars()``, but the only necessary argument
@@ -1004,7 +1204,8 @@ class SummaryWriter(object):
             writer.close()
         """
         torch._C._log_api_usage_once("tensorboard.logging.add_mesh")
-        self._get_file_writer().add_summary(mesh(tag, vertices, colors, faces, config_dict), global_step, walltime)
+        self._add_summary(mesh, (tag, vertices, colors, faces, config_dict),
+                          global_step=global_step, walltime=walltime)
 
     def flush(self):
         """Flushes the event file to disk.
@@ -1013,16 +1214,23 @@ class SummaryWriter(object):
         """
         if self.all_writers is None:
             return
+        if self._summary_worker is not None:
+            self._summary_worker.join()
         for writer in self.all_writers.values():
             writer.flush()
 
     def close(self):
         if self.all_writers is None:
             return  # ignore double close
-        for writer in self.all_writers.values():
-            writer.flush()
-            writer.close()
-        self.file_writer = self.all_writers = None
+        try:
+            if self._summary_worker is not None:
+                self._summary_worker.close()
+        finally:
+            self._summary_worker = None
+            for writer in self.all_writers.values():
+                writer.flush()
+                writer.close()
+            self.file_writer = self.all_writers = None
 
     def __enter__(self):
         return self
@@ -1,6 +1,15 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import io
+import json
+import os
+import queue
+import random
+import threading
+import time
+
 import torch._C
+from torch._utils import ExceptionWrapper
 
 def format_time(time_us=None, time_ms=None, time_s=None):
     '''Defines how to format time'''
@@ -59,6 +68,196 @@ class ExecutionStats(object):
         ])
 
 
+# Interval (in seconds) to check whether the benchmark processes are still
+# alive while waiting for their results.
+_STATUS_CHECK_INTERVAL = 5.0
+
+
+def _percentile(sorted_values, percent):
+    '''Linearly interpolated percentile of a sorted non-empty list'''
+    rank = (len(sorted_values) - 1) * percent / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class LatencyStats(object):
+    '''
+    Per-request statistics of a :meth:`ThroughputBenchmark.benchmark_processes`
+    run: latency percentiles and histogram, and throughput over time.
+    '''
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    def __init__(self, requests, config):
+        # (start time in seconds since the epoch, latency in ms) per request
+        self._requests = sorted(requests)
+        self._latencies_ms = sorted(latency for _, latency in self._requests)
+        self.config = config
+
+    @property
+    def num_iters(self):
+        return len(self._requests)
+
+    @property
+    def latency_avg_ms(self):
+        return sum(self._latencies_ms) / self.num_iters
+
+    def latency_percentile_ms(self, percent):
+        '''
+        Returns the latency in ms that ``percent`` percent of the requests did
+        not exceed
+        '''
+        return _percentile(self._latencies_ms, percent)
+
+    @property
+    def latency_percentiles_ms(self):
+        return {str(p): self.latency_percentile_ms(p) for p in self.PERCENTILES}
+
+    @property
+    def total_time_seconds(self):
+        '''
+        Wall time from the start of the first request to the end of the last one
+        '''
+        first_start = self._requests[0][0]
+        last_end = max(start + latency / 1000.0 for start, latency in self._requests)
+        return last_end - first_start
+
+    @property
+    def iters_per_second(self):
+        '''
+        Returns total number of iterations per second across all calling
+        threads and processes
+        '''
+        return self.num_iters / self.total_time_seconds
+
+    def latency_histogram(self, num_bins=20):
+        '''
+        Returns the edges of ``num_bins`` equal-width latency bins in ms
+        (``num_bins + 1`` values) and the number of requests in each bin
+        '''
+        low, high = self._latencies_ms[0], self._latencies_ms[-1]
+        width = (high - low) / num_bins or 1.0
+        counts = [0] * num_bins
+        for latency in self._latencies_ms:
+            counts[min(int((latency - low) / width), num_bins - 1)] += 1
+        return [low + i * width for i in range(num_bins + 1)], counts
+
+    def iters_per_second_over_time(self, interval_seconds=1.0):
+        '''
+        Returns the number of requests started per second in each consecutive
+        interval of ``interval_seconds`` since the start of the benchmark
+        '''
+        first_start = self._requests[0][0]
+        counts = [0] * (int(self.total_time_seconds / interval_seconds) + 1)
+        for start, _ in self._requests:
+            counts[min(int((start - first_start) / interval_seconds), len(counts) - 1)] += 1
+        return [count / interval_seconds for count in counts]
+
+    def to_dict(self, num_bins=20, interval_seconds=1.0):
+        edges, counts = self.latency_histogram(num_bins)
+        return {
+            'torch_version': torch.__version__,
+            'git_version': getattr(torch.version, 'git_version', None),
+            'config': self.config,
+            'num_iters': self.num_iters,
+            'total_time_seconds': self.total_time_seconds,
+            'iters_per_second': self.iters_per_second,
+            'latency_avg_ms': self.latency_avg_ms,
+            'latency_percentiles_ms': self.latency_percentiles_ms,
+            'latency_histogram_ms': {'bin_edges': edges, 'counts': counts},
+            'iters_per_second_over_time': {
+                'interval_seconds': interval_seconds,
+                'values': self.iters_per_second_over_time(interval_seconds),
+            },
+        }
+
+    def save_report(self, path, num_bins=20, interval_seconds=1.0):
+        '''
+        Writes :meth:`to_dict` as JSON to ``path``, with sorted keys and one
+        value per line so that reports of different builds can be diffed
+        '''
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(num_bins, interval_seconds), f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def __str__(self):
+        return '\n'.join([
+            "Average latency per example: " + format_time(time_ms=self.latency_avg_ms),
+        ] + [
+            "P{} latency per example: {}".format(p, format_time(time_ms=self.latency_percentile_ms(p)))
+            for p in self.PERCENTILES
+        ] + [
+            "Total number of iterations: {}".format(self.num_iters),
+            "Total number of iterations per second (across all threads and processes): {:.2f}".format(
+                self.iters_per_second),
+            "Total time: " + format_time(time_s=self.total_time_seconds)
+        ])
+
+
+def _run_calling_threads(module, inputs, num_calling_threads, num_warmup_iters, num_iters, seed):
+    '''
+    Runs ``module`` on random ``inputs`` from ``num_calling_threads`` threads
+    until ``num_iters`` iterations are done across them, and returns the start
+    time and latency of each iteration.
+    '''
+    lock = threading.Lock()
+    remaining_iters = [num_iters]
+    barrier = threading.Barrier(num_calling_threads)
+    requests = [[] for _ in range(num_calling_threads)]
+    errors = []
+
+    def run(thread_id):
+        rng = random.Random(seed * num_calling_threads + thread_id)
+        try:
+            for _ in range(num_warmup_iters):
+                args, kwargs = rng.choice(inputs)
+                module(*args, **kwargs)
+        except Exception:
+            errors.append(ExceptionWrapper(where="in calling thread {}".format(thread_id)))
+            barrier.abort()
+            return
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            return
+        try:
+            while True:
+                with lock:
+                    if remaining_iters[0] == 0:
+                        break
+                    remaining_iters[0] -= 1
+                args, kwargs = rng.choice(inputs)
+                start_time = time.time()
+                start = time.perf_counter()
+                module(*args, **kwargs)
+                requests[thread_id].append((start_time, (time.perf_counter() - start) * 1000.0))
+        except Exception:
+            errors.append(ExceptionWrapper(where="in calling thread {}".format(thread_id)))
+
+    threads = [threading.Thread(target=run, args=(thread_id,)) for thread_id in range(num_calling_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        errors[0].reraise()
+    return [request for thread_requests in requests for request in thread_requests]
+
+
+def _benchmark_process_loop(process_id, module, is_script_module, inputs, num_calling_threads,
+                            num_warmup_iters, num_iters, cpus, result_queue):
+    try:
+        if cpus is not None:
+            os.sched_setaffinity(0, cpus)
+        if is_script_module:
+            module = torch.jit.load(io.BytesIO(module))
+        requests = _run_calling_threads(
+            module, inputs, num_calling_threads, num_warmup_iters, num_iters, process_id)
+        result_queue.put((process_id, requests))
+    except Exception:
+        result_queue.put((process_id, ExceptionWrapper(where="in benchmark process {}".format(process_id))))
+
+
 class ThroughputBenchmark(object):
     '''
     This class is a wrapper around a c++ component throughput_benchmark::ThroughputBenchmark
@@ -94,6 +293,8 @@ class ThroughputBenchmark(object):
     '''
 
     def __init__(self, module):
+        self._module = module
+        self._inputs = []
         if isinstance(module, torch.jit.ScriptModule):
             self._benchmark = torch._C.ThroughputBenchmark(module._c)
         else:
@@ -116,6 +317,8 @@ class ThroughputBenchmark(object):
         this function.
         '''
         self._benchmark.add_input(*args, **kwargs)
+        # Kept for benchmark_processes, which runs the module from Python
+        self._inputs.append((args, kwargs))
 
     def benchmark(
             self,
@@ -155,3 +358,113 @@ class ThroughputBenchmark(object):
         config.profiler_output_path = profiler_output_path
         c_stats = self._benchmark.benchmark(config)
         return ExecutionStats(c_stats, config)
+
+    def benchmark_processes(
+            self,
+            num_processes=1,
+            num_calling_threads=1,
+            num_warmup_iters=10,
+            num_iters=100,
+            cpu_affinity=None,
+            start_method='spawn'):
+        '''
+        Runs the benchmark from ``num_processes`` processes with
+        ``num_calling_threads`` calling threads each, and measures the latency
+        of every request. Comparing e.g. ``num_processes=4`` with
+        ``num_processes=1, num_calling_threads=4`` shows how process-level
+        parallelism compares to thread-level parallelism for the module.
+
+        Unlike :meth:`benchmark`, the module is called from Python, so the
+        numbers include the overhead of the Python driver loop (a few
+        microseconds per request).
+
+        Args:
+            num_processes (int): Number of processes running the module. Each
+                gets its own copy of the module and the inputs.
+
+            num_calling_threads (int): Number of threads calling the module in
+                each process.
+
+            num_warmup_iters (int): Number of warmup iterations of each calling
+                thread, which are not measured.
+
+            num_iters (int): Total number of measured iterations, split evenly
+                across the processes and shared by the threads of each.
+
+            cpu_affinity (list of lists of int, optional): If given, the CPUs
+                each process is pinned to, e.g., the cores of one NUMA node per
+                process. Only supported on Linux.
+
+            start_method (string): Multiprocessing start method of the
+                processes.
+
+        Returns:
+            A :class:`LatencyStats` object, which can also write a JSON report
+            with :meth:`LatencyStats.save_report`.
+        '''
+        if len(self._inputs) == 0:
+            raise RuntimeError("Please provide benchmark inputs. Did you forget to call add_input()?")
+        if num_processes < 1 or num_calling_threads < 1:
+            raise ValueError("num_processes and num_calling_threads should be positive integers")
+        if num_iters < num_processes:
+            raise ValueError("num_iters should be at least num_processes, but got {}".format(num_iters))
+        if cpu_affinity is not None and len(cpu_affinity) != num_processes:
+            raise ValueError("cpu_affinity should have one entry per process, but got {} for {} "
+                             "processes".format(len(cpu_affinity), num_processes))
+
+        module = self._module
+        is_script_module = isinstance(module, torch.jit.ScriptModule)
+        if is_script_module:
+            # ScriptModules cannot be pickled, so they are sent serialized
+            buffer = io.BytesIO()
+            torch.jit.save(module, buffer)
+            module = buffer.getvalue()
+
+        # Imported here since torch.utils (and hence this module) is imported
+        # while torch itself is still being initialized
+        import torch.multiprocessing as multiprocessing
+        context = multiprocessing.get_context(start_method)
+        result_queue = context.Queue()
+        processes = []
+        for process_id in range(num_processes):
+            process_iters = num_iters // num_processes + (process_id < num_iters % num_processes)
+            cpus = cpu_affinity[process_id] if cpu_affinity is not None else None
+            p = context.Process(
+                target=_benchmark_process_loop,
+                args=(process_id, module, is_script_module, self._inputs, num_calling_threads,
+                      num_warmup_iters, process_iters, cpus, result_queue))
+            p.daemon = True
+            p.start()
+            processes.append(p)
+
+        requests = []
+        error = None
+        num_results = 0
+        while num_results < num_processes:
+            try:
+                process_id, result = result_queue.get(timeout=_STATUS_CHECK_INTERVAL)
+            except queue.Empty:
+                failed = [str(p.pid) for p in processes if p.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError("Benchmark process(es) (pid(s) {}) exited unexpectedly".format(
+                        ', '.join(failed)))
+                continue
+            num_results += 1
+            if isinstance(result, ExceptionWrapper):
+                error = error or result
+            else:
+                requests.extend(result)
+        for p in processes:
+            p.join()
+        if error is not None:
+            error.reraise()
+
+        config = {
+            'num_processes': num_processes,
+            'num_calling_threads': num_calling_threads,
+            'num_warmup_iters': num_warmup_iters,
+            'num_iters': num_iters,
+            'cpu_affinity': cpu_affinity,
+            'start_method': start_method,
+        }
+        return LatencyStats(requests, config)